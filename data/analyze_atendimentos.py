@@ -3,92 +3,101 @@
 Script para analisar a planilha de atendimentos 2025-2026
 """
 
-import pandas as pd
-from datetime import datetime
-import json
-
-# Carregar planilha
-print("=" * 60)
-print("ANÁLISE DA PLANILHA DE ATENDIMENTOS 2025-2026")
-print("=" * 60)
-
-# Tentar ler o arquivo Excel
-try:
-    # Primeiro, ver todas as abas
-    xl = pd.ExcelFile('/home/ubuntu/consultorio_poc/data/atendimentos2025-2026.xlsx')
-    print(f"\n📋 ABAS ENCONTRADAS: {xl.sheet_names}")
-    
-    # Ler cada aba
-    for sheet_name in xl.sheet_names:
+import argparse
+
+from profiling import (
+    profile_workbooks, save_profile, sample_frame, sheet_label, render_summary,
+    fmt_unicos, fmt_contagem,
+)
+
+INPUT_FILE = '/home/ubuntu/consultorio_poc/data/atendimentos2025-2026.xlsx'
+PROFILE_FILE = '/home/ubuntu/consultorio_poc/data/perfil_atendimentos2025-2026.json'
+
+
+def render(profile):
+    print(f"\n📋 ABAS ENCONTRADAS: {[sheet_label(sheet, profile) for sheet in profile['abas']]}")
+
+    for sheet in profile['abas']:
         print(f"\n{'=' * 60}")
-        print(f"📊 ABA: {sheet_name}")
+        print(f"📊 ABA: {sheet_label(sheet, profile)}")
         print("=" * 60)
-        
-        df = pd.read_excel(xl, sheet_name=sheet_name)
-        
-        print(f"\n📈 DIMENSÕES: {len(df)} linhas x {len(df.columns)} colunas")
-        
+
+        print(f"\n📈 DIMENSÕES: {sheet['linhas']} linhas x {len(sheet['colunas'])} colunas")
+
         print(f"\n📝 COLUNAS ENCONTRADAS:")
-        for i, col in enumerate(df.columns):
-            dtype = df[col].dtype
-            non_null = df[col].notna().sum()
-            pct = (non_null / len(df)) * 100 if len(df) > 0 else 0
-            print(f"  {i+1}. {col} ({dtype}) - {non_null} preenchidos ({pct:.1f}%)")
-        
-        print(f"\n🔍 AMOSTRA (primeiras 5 linhas):")
-        print(df.head().to_string())
-        
-        print(f"\n🔍 AMOSTRA (últimas 5 linhas):")
-        print(df.tail().to_string())
-        
+        for i, col in enumerate(sheet['colunas']):
+            print(f"  {i+1}. {col['coluna']} ({col['tipo']}) - {col['preenchidos']} preenchidos ({col['taxa_preenchimento']:.1f}%)")
+
+        if sheet.get('amostra_aleatoria'):
+            print(f"\n🔍 AMOSTRA (5 linhas aleatórias):")
+            print(sample_frame(sheet['amostra_inicio']).to_string())
+        else:
+            print(f"\n🔍 AMOSTRA (primeiras 5 linhas):")
+            print(sample_frame(sheet['amostra_inicio']).to_string())
+
+            print(f"\n🔍 AMOSTRA (últimas 5 linhas):")
+            print(sample_frame(sheet['amostra_fim']).to_string())
+
         # Análise de valores únicos para colunas categóricas
         print(f"\n📊 VALORES ÚNICOS POR COLUNA:")
-        for col in df.columns:
-            unique_count = df[col].nunique()
+        for col in sheet['colunas']:
+            unique_count = col['unicos']
             if unique_count <= 50:  # Mostrar valores se houver poucos
-                unique_vals = df[col].dropna().unique()
-                print(f"\n  {col}: {unique_count} valores únicos")
+                print(f"\n  {col['coluna']}: {fmt_unicos(col)} valores únicos")
                 if unique_count <= 20:
                     # Mostrar contagem
-                    value_counts = df[col].value_counts().head(20)
-                    for val, count in value_counts.items():
-                        print(f"    - {val}: {count}")
+                    for val, count in col['top'][:20]:
+                        print(f"    - {val}: {fmt_contagem(col, count)}")
             else:
-                print(f"\n  {col}: {unique_count} valores únicos (muitos para listar)")
-        
-        # Análise de datas se houver colunas de data
-        date_cols = df.select_dtypes(include=['datetime64']).columns.tolist()
-        for col in df.columns:
-            if 'data' in col.lower() or 'date' in col.lower():
-                if col not in date_cols:
-                    date_cols.append(col)
-        
+                print(f"\n  {col['coluna']}: {fmt_unicos(col)} valores únicos (muitos para listar)")
+
+        # Análise de datas (colunas datetime ou com 'data' no nome)
+        date_cols = [col for col in sheet['colunas'] if col['datas']]
         if date_cols:
             print(f"\n📅 ANÁLISE DE DATAS:")
             for col in date_cols:
-                try:
-                    dates = pd.to_datetime(df[col], errors='coerce')
-                    valid_dates = dates.dropna()
-                    if len(valid_dates) > 0:
-                        print(f"\n  {col}:")
-                        print(f"    - Primeira data: {valid_dates.min()}")
-                        print(f"    - Última data: {valid_dates.max()}")
-                        print(f"    - Datas válidas: {len(valid_dates)} ({len(valid_dates)/len(df)*100:.1f}%)")
-                        
-                        # Distribuição por ano/mês
-                        if len(valid_dates) > 0:
-                            year_month = valid_dates.dt.to_period('M').value_counts().sort_index()
-                            print(f"    - Distribuição por mês:")
-                            for period, count in year_month.items():
-                                print(f"      {period}: {count} atendimentos")
-                except Exception as e:
-                    print(f"  Erro ao analisar {col}: {e}")
-
-except Exception as e:
-    print(f"❌ ERRO: {e}")
-    import traceback
-    traceback.print_exc()
-
-print("\n" + "=" * 60)
-print("FIM DA ANÁLISE")
-print("=" * 60)
+                datas = col['datas']
+                print(f"\n  {col['coluna']}:")
+                print(f"    - Primeira data: {datas['min']}")
+                print(f"    - Última data: {datas['max']}")
+                print(f"    - Datas válidas: {datas['validas']} ({datas['validas']/sheet['linhas']*100:.1f}%)")
+
+                # Distribuição por ano/mês
+                print(f"    - Distribuição por mês:")
+                for period, count in datas['por_mes'].items():
+                    print(f"      {period}: {count} atendimentos")
+
+    render_summary(profile)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Análise da planilha de atendimentos')
+    parser.add_argument('arquivos', nargs='*', default=[INPUT_FILE],
+                        help='Planilhas ou pastas com planilhas (default: atendimentos 2025-2026)')
+    parser.add_argument('--aproximado', action='store_true',
+                        help='Perfil aproximado em streaming (memória constante)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Processos paralelos, uma aba por processo (default: número de CPUs)')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("ANÁLISE DA PLANILHA DE ATENDIMENTOS 2025-2026")
+    print("=" * 60)
+
+    try:
+        profile = profile_workbooks(args.arquivos, workers=args.workers, aproximado=args.aproximado)
+        save_profile(profile, PROFILE_FILE)
+        render(profile)
+        print(f"\n📄 Perfil salvo em: {PROFILE_FILE}")
+    except Exception as e:
+        print(f"❌ ERRO: {e}")
+        import traceback
+        traceback.print_exc()
+
+    print("\n" + "=" * 60)
+    print("FIM DA ANÁLISE")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,490 @@
+"""
+Motor de perfilamento de planilhas usado pelos scripts data/analyze_*.py.
+
+Cada aba é lida uma única vez e cada coluna é percorrida uma única vez
+(value_counts): a partir das contagens por valor distinto saem taxa de
+preenchimento, número de valores únicos, top-K, duplicatas, mínimo/máximo e o
+histograma mensal de datas. O resultado é um perfil estruturado (JSON) do qual
+os resumos de console são renderizados.
+
+Várias planilhas/pastas (profile_workbooks): cada par (arquivo, aba) é
+perfilado em um processo separado e os perfis são reunidos em um único
+relatório, de modo que o tempo total é o da aba mais lenta.
+
+Modo aproximado (profile_workbook_approx): percorre a planilha em streaming
+(openpyxl read-only) com memória constante por coluna — HyperLogLog para
+distintos, Space-Saving para top-K e amostragem por reservatório para as linhas
+de amostra — e registra os limites de erro ao lado de cada número.
+"""
+
+import os
+import sys
+import glob
+import json
+import math
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, date
+from functools import lru_cache
+
+import pandas as pd
+
+from sketches import HyperLogLog, SpaceSaving, Reservoir
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
+from workbook_cache import read_excel_cached, sheet_names
+
+TOP_K = 20
+SAMPLE_ROWS = 5
+
+# Contadores do Space-Saving por coluna (múltiplo do top-K reportado)
+SPACE_SAVING_FACTOR = 5
+# Precisão do HyperLogLog (2^12 registradores: erro padrão ~1,6%)
+HLL_PRECISION = 12
+
+# Textos tratados como vazios pelo pandas.read_excel (na_values padrão)
+NA_STRINGS = frozenset({
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+})
+
+
+def _jsonable(value):
+    """Converte valores do pandas/numpy para tipos serializáveis em JSON."""
+    if value is None:
+        return None
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        try:
+            return value.item()
+        except (ValueError, AttributeError):
+            pass
+    if isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _first_values(series, n=3):
+    """Primeiros n valores não nulos (para amostra), parando assim que encontrados."""
+    values = []
+    for value in series:
+        if pd.notna(value):
+            values.append(_jsonable(value))
+            if len(values) >= n:
+                break
+    return values
+
+
+def is_date_column(name, series):
+    """Coluna de data: tipo datetime ou nome contendo 'data'/'date'."""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return True
+    lowered = str(name).lower()
+    return 'data' in lowered or 'date' in lowered
+
+
+def _date_profile(counts):
+    """Perfil de datas a partir das contagens por valor distinto."""
+    with warnings.catch_warnings():
+        # Formatos mistos: o pandas avisa que vai interpretar elemento a elemento
+        warnings.simplefilter('ignore', UserWarning)
+        dates = pd.to_datetime(pd.Series(counts.index, dtype=object), errors='coerce')
+    valid = dates.notna().to_numpy()
+    if not valid.any():
+        return None
+
+    valid_dates = pd.DatetimeIndex(dates[valid])
+    valid_counts = counts.to_numpy()[valid]
+    histograma = (
+        pd.Series(valid_counts, index=valid_dates.to_period('M'))
+        .groupby(level=0).sum()
+        .sort_index()
+    )
+
+    return {
+        'validas': int(valid_counts.sum()),
+        'min': valid_dates.min().isoformat(),
+        'max': valid_dates.max().isoformat(),
+        'por_mes': {str(period): int(count) for period, count in histograma.items()},
+    }
+
+
+def profile_column(name, series, top_k=TOP_K):
+    """Perfil de uma coluna em uma única passada (value_counts)."""
+    counts = series.value_counts(dropna=True)
+
+    total = len(series)
+    preenchidos = int(counts.sum())
+    unicos = len(counts)
+
+    perfil = {
+        'coluna': str(name),
+        'tipo': str(series.dtype),
+        'total': total,
+        'preenchidos': preenchidos,
+        'vazios': total - preenchidos,
+        'taxa_preenchimento': (preenchidos / total) * 100 if total > 0 else 0,
+        'unicos': unicos,
+        'duplicatas': preenchidos - unicos,
+        'top': [[_jsonable(v), int(c)] for v, c in counts.head(top_k).items()],
+        'amostra': _first_values(series),
+        'min': None,
+        'max': None,
+        'datas': None,
+    }
+
+    if unicos:
+        try:
+            perfil['min'] = _jsonable(counts.index.min())
+            perfil['max'] = _jsonable(counts.index.max())
+        except TypeError:
+            # Tipos mistos não ordenáveis
+            pass
+
+        if is_date_column(name, series):
+            perfil['datas'] = _date_profile(counts)
+
+    return perfil
+
+
+def profile_sheet(df, sheet_name, top_k=TOP_K, required_column=None):
+    """Perfil de uma aba já carregada.
+
+    required_column: considera apenas linhas com esta coluna preenchida
+    (ex.: 'ID paciente' para descartar linhas vazias da planilha).
+    """
+    total_linhas = len(df)
+    if required_column and required_column in df.columns:
+        df = df[df[required_column].notna()]
+
+    return {
+        'aba': sheet_name,
+        'linhas_planilha': total_linhas,
+        'linhas': len(df),
+        'colunas': [profile_column(col, df[col], top_k) for col in df.columns],
+        'amostra_inicio': json.loads(df.head(SAMPLE_ROWS).to_json(orient='records', date_format='iso')),
+        'amostra_fim': json.loads(df.tail(SAMPLE_ROWS).to_json(orient='records', date_format='iso')),
+    }
+
+
+def profile_workbook(path, top_k=TOP_K, nrows=None, required_column=None, sheet_name=None):
+    """Lê as abas de uma planilha uma única vez e gera o perfil de cada uma.
+
+    sheet_name: None para todas as abas, ou o nome/índice de uma aba.
+    A leitura passa pelo cache colunar (scripts/workbook_cache.py).
+    """
+    sheets = read_excel_cached(path, sheet_name=sheet_name, nrows=nrows)
+    if isinstance(sheets, pd.DataFrame):
+        sheets = {sheet_name: sheets}
+    return {
+        'arquivo': path,
+        'gerado_em': datetime.now().isoformat(),
+        'abas': [
+            profile_sheet(df, sheet_name, top_k, required_column)
+            for sheet_name, df in sheets.items()
+        ],
+    }
+
+
+@lru_cache(maxsize=4096)
+def _parse_date_text(text):
+    """Interpreta datas textuais comuns (ISO, DD/MM/AAAA); None se não for data."""
+    text = text.strip()
+    for fmt in ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d', '%d/%m/%Y'):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    return None
+
+
+class ColumnSketch:
+    """Perfil aproximado de uma coluna com memória constante."""
+
+    def __init__(self, name, top_k=TOP_K):
+        self.name = name
+        self.top_k = top_k
+        self.date_by_name = any(x in name.lower() for x in ('data', 'date'))
+        self.total = 0
+        self.preenchidos = 0
+        self.hll = HyperLogLog(HLL_PRECISION)
+        self.top = SpaceSaving(top_k * SPACE_SAVING_FACTOR)
+        self.tipos = {}
+        self.amostra = []
+        self.min = None
+        self.max = None
+        self.ordenavel = True
+        self.datas_validas = 0
+        self.datas_min = None
+        self.datas_max = None
+        self.por_mes = {}
+
+    def add(self, value):
+        self.total += 1
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return
+        if isinstance(value, str) and value in NA_STRINGS:
+            return
+
+        self.preenchidos += 1
+        self.hll.add(value)
+        self.top.add(value)
+        tipo = type(value).__name__
+        self.tipos[tipo] = self.tipos.get(tipo, 0) + 1
+
+        if len(self.amostra) < 3:
+            self.amostra.append(_jsonable(value))
+
+        if self.ordenavel:
+            try:
+                if self.min is None or value < self.min:
+                    self.min = value
+                if self.max is None or value > self.max:
+                    self.max = value
+            except TypeError:
+                self.ordenavel = False
+                self.min = self.max = None
+
+        momento = None
+        if isinstance(value, (datetime, date)):
+            momento = value
+        elif self.date_by_name and isinstance(value, str):
+            momento = _parse_date_text(value)
+        if momento is not None:
+            self.datas_validas += 1
+            if self.datas_min is None or momento < self.datas_min:
+                self.datas_min = momento
+            if self.datas_max is None or momento > self.datas_max:
+                self.datas_max = momento
+            mes = f"{momento.year:04d}-{momento.month:02d}"
+            self.por_mes[mes] = self.por_mes.get(mes, 0) + 1
+
+    def profile(self):
+        exato = not self.top.saturated
+        if exato:
+            unicos = len(self.top.counts)
+            erro_unicos = 0.0
+        else:
+            unicos = max(self.hll.estimate(), len(self.top.counts))
+            erro_unicos = self.hll.relative_error * 100
+
+        datas = None
+        if self.datas_validas:
+            datas = {
+                'validas': self.datas_validas,
+                'min': self.datas_min.isoformat(),
+                'max': self.datas_max.isoformat(),
+                'por_mes': dict(sorted(self.por_mes.items())),
+            }
+
+        tipo = max(self.tipos, key=self.tipos.get) if self.tipos else 'vazio'
+
+        return {
+            'coluna': self.name,
+            'tipo': tipo,
+            'total': self.total,
+            'preenchidos': self.preenchidos,
+            'vazios': self.total - self.preenchidos,
+            'taxa_preenchimento': (self.preenchidos / self.total) * 100 if self.total > 0 else 0,
+            'unicos': unicos,
+            'duplicatas': max(self.preenchidos - unicos, 0),
+            'top': [[_jsonable(v), c] for v, c in self.top.top(self.top_k)],
+            'amostra': self.amostra,
+            'min': _jsonable(self.min),
+            'max': _jsonable(self.max),
+            'datas': datas,
+            'aproximado': not exato,
+            # Erro padrão relativo (%) de 'unicos' e 'duplicatas' (≈ ±1σ)
+            'unicos_erro_pct': erro_unicos,
+            # Cada contagem do top pode estar superestimada em até este valor
+            'top_erro_max': self.top.max_error(),
+        }
+
+
+def profile_workbook_approx(path, top_k=TOP_K, nrows=None, required_column=None,
+                            sheet_name=None, sample_rows=SAMPLE_ROWS, seed=0):
+    """Perfil aproximado em streaming, com memória constante por coluna.
+
+    Mesmos campos de profile_workbook; a amostra de linhas vem de uma
+    amostragem por reservatório (amostra_inicio) em vez de head()/tail().
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheet_name is None:
+            nomes = wb.sheetnames
+        elif isinstance(sheet_name, int):
+            nomes = [wb.sheetnames[sheet_name]]
+        else:
+            nomes = [sheet_name]
+
+        abas = []
+        for nome in nomes:
+            rows = wb[nome].iter_rows(values_only=True)
+            header = next(rows, None) or ()
+            columns = [str(h) if h is not None else f'Unnamed: {i}' for i, h in enumerate(header)]
+            sketches = [ColumnSketch(col, top_k) for col in columns]
+            reservoir = Reservoir(sample_rows, seed)
+            required_idx = columns.index(required_column) if required_column in columns else None
+
+            total_linhas = 0
+            for row in rows:
+                if nrows is not None and total_linhas >= nrows:
+                    break
+                if all(v is None for v in row):
+                    continue
+                total_linhas += 1
+                if required_idx is not None and (required_idx >= len(row) or row[required_idx] is None):
+                    continue
+                for i, sketch in enumerate(sketches):
+                    sketch.add(row[i] if i < len(row) else None)
+                reservoir.add(row)
+
+            # Colunas sem cabeçalho e sem dados são descartadas (como no pandas)
+            keep = [i for i, sketch in enumerate(sketches) if header[i] is not None or sketch.preenchidos]
+
+            abas.append({
+                'aba': nome,
+                'linhas_planilha': total_linhas,
+                'linhas': reservoir.seen,
+                'colunas': [sketches[i].profile() for i in keep],
+                'amostra_inicio': [
+                    {columns[i]: _jsonable(row[i]) for i in keep if i < len(row)} for row in reservoir.items
+                ],
+                'amostra_fim': [],
+                'amostra_aleatoria': True,
+            })
+    finally:
+        wb.close()
+
+    return {
+        'arquivo': path,
+        'gerado_em': datetime.now().isoformat(),
+        'aproximado': True,
+        'abas': abas,
+    }
+
+
+def expand_paths(paths):
+    """Lista de planilhas a partir de arquivos e pastas (*.xlsx, sem arquivos de lock '~$')."""
+    arquivos = []
+    for path in paths:
+        if os.path.isdir(path):
+            encontrados = sorted(glob.glob(os.path.join(path, '*.xlsx')))
+            arquivos.extend(f for f in encontrados if not os.path.basename(f).startswith('~$'))
+        else:
+            arquivos.append(path)
+    # Remove repetidos mantendo a ordem
+    return list(dict.fromkeys(arquivos))
+
+
+def _profile_task(task):
+    """Perfil de uma aba (executado em um processo do pool)."""
+    path, sheet_name, aproximado, top_k, nrows, required_column = task
+    inicio = time.perf_counter()
+    if aproximado:
+        sheet = profile_workbook_approx(path, top_k, nrows, required_column, sheet_name)['abas'][0]
+    else:
+        df = read_excel_cached(path, sheet_name=sheet_name, nrows=nrows)
+        sheet = profile_sheet(df, sheet_name, top_k, required_column)
+    sheet['arquivo'] = path
+    sheet['duracao_s'] = round(time.perf_counter() - inicio, 3)
+    return sheet
+
+
+def profile_workbooks(paths, workers=None, aproximado=False, top_k=TOP_K, nrows=None,
+                      required_column=None, sheet_name=None):
+    """Perfil de várias planilhas/pastas, uma aba por processo, em um único relatório.
+
+    sheet_name: None para todas as abas de cada planilha, ou o nome/índice de uma aba.
+    workers: número de processos (default: número de CPUs; 1 executa sem pool).
+    """
+    inicio = time.perf_counter()
+    arquivos = expand_paths(paths)
+
+    tasks = []
+    for path in arquivos:
+        nomes = sheet_names(path)
+        if sheet_name is not None:
+            nomes = [nomes[sheet_name]] if isinstance(sheet_name, int) else [sheet_name]
+        tasks.extend((path, nome, aproximado, top_k, nrows, required_column) for nome in nomes)
+
+    workers = min(workers or os.cpu_count() or 1, len(tasks)) or 1
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            abas = list(executor.map(_profile_task, tasks))
+    else:
+        abas = [_profile_task(task) for task in tasks]
+
+    profile = {
+        'arquivos': arquivos,
+        'gerado_em': datetime.now().isoformat(),
+        'processos': workers,
+        'duracao_s': round(time.perf_counter() - inicio, 3),
+        'resumo': {
+            'arquivos': len(arquivos),
+            'abas': len(abas),
+            'linhas': sum(sheet['linhas'] for sheet in abas),
+            'aba_mais_lenta_s': max((sheet['duracao_s'] for sheet in abas), default=0),
+        },
+        'abas': abas,
+    }
+    if aproximado:
+        profile['aproximado'] = True
+    return profile
+
+
+def sheet_label(sheet, profile):
+    """Nome da aba, prefixado pelo arquivo quando o relatório tem vários arquivos."""
+    if len(profile.get('arquivos', ())) > 1:
+        return f"{os.path.basename(sheet['arquivo'])} › {sheet['aba']}"
+    return str(sheet['aba'])
+
+
+def render_summary(profile):
+    """Resumo consolidado de um relatório de várias planilhas."""
+    resumo = profile['resumo']
+    print(f"\n📦 {resumo['arquivos']} arquivo(s), {resumo['abas']} aba(s), {resumo['linhas']:,} linhas")
+    print(f"   ⏱️  {profile['duracao_s']:.1f}s em {profile['processos']} processo(s) "
+          f"(aba mais lenta: {resumo['aba_mais_lenta_s']:.1f}s)")
+
+
+def fmt_unicos(col):
+    """Número de únicos com a margem de erro quando aproximado."""
+    if col.get('aproximado'):
+        return f"~{col['unicos']:,} (±{col['unicos_erro_pct']:.1f}%)"
+    return f"{col['unicos']:,}"
+
+
+def fmt_duplicatas(col):
+    if col.get('aproximado'):
+        return f"~{col['duplicatas']:,} (±{col['unicos'] * col['unicos_erro_pct'] / 100:,.0f})"
+    return f"{col['duplicatas']:,}"
+
+
+def fmt_contagem(col, count):
+    """Contagem do top-K com o limite de superestimação quando aproximado."""
+    if col.get('aproximado') and col.get('top_erro_max'):
+        return f"{count:,} (erro ≤ {col['top_erro_max']:,})"
+    return f"{count:,}"
+
+
+def save_profile(profile, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, ensure_ascii=False, indent=2, default=str)
+
+
+def column(sheet, name):
+    """Perfil de uma coluna pelo nome (ou None)."""
+    for col in sheet['colunas']:
+        if col['coluna'] == name:
+            return col
+    return None
+
+
+def sample_frame(records):
+    """Reconstrói a amostra de linhas para exibição."""
+    return pd.DataFrame.from_records(records)
@@ -0,0 +1,105 @@
+"""
+Estruturas de memória constante para o perfilamento aproximado (profiling.py).
+
+- HyperLogLog: estimativa de valores distintos (erro padrão 1.04/sqrt(2^p))
+- SpaceSaving: top-K por frequência (cada contagem superestima no máximo
+  o menor contador, limitado por N/k)
+- Reservoir: amostra aleatória uniforme de tamanho fixo (algoritmo R)
+"""
+
+import math
+import random
+import hashlib
+
+
+def _hash64(value):
+    """Hash estável de 64 bits; tipo faz parte da chave (1 != '1', como no pandas)."""
+    data = f"{type(value).__name__}:{value}".encode('utf-8', 'surrogatepass')
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """Contador aproximado de distintos com 2^p registradores."""
+
+    def __init__(self, p=12):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value):
+        x = _hash64(value)
+        idx = x >> (64 - self.p)
+        rest = x & ((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - rest.bit_length() + 1
+        if rank > self.registers[idx]:
+            self.registers[idx] = rank
+
+    def estimate(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Correção para cardinalidades pequenas (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self):
+        """Erro padrão relativo da estimativa."""
+        return 1.04 / math.sqrt(self.m)
+
+
+class SpaceSaving:
+    """Top-K aproximado com k contadores (algoritmo Space-Saving)."""
+
+    def __init__(self, k):
+        self.k = k
+        self.counts = {}
+        self.errors = {}
+
+    def add(self, item):
+        counts = self.counts
+        if item in counts:
+            counts[item] += 1
+        elif len(counts) < self.k:
+            counts[item] = 1
+            self.errors[item] = 0
+        else:
+            victim = min(counts, key=counts.get)
+            floor = counts.pop(victim)
+            del self.errors[victim]
+            counts[item] = floor + 1
+            self.errors[item] = floor
+
+    @property
+    def saturated(self):
+        """True se algum item já foi descartado (contagens deixam de ser exatas)."""
+        return any(self.errors.values())
+
+    def max_error(self):
+        """Superestimação máxima de qualquer contagem reportada."""
+        return max(self.errors.values()) if self.errors else 0
+
+    def top(self, n):
+        """[(item, contagem)] em ordem decrescente de contagem."""
+        return sorted(self.counts.items(), key=lambda kv: kv[1], reverse=True)[:n]
+
+
+class Reservoir:
+    """Amostra uniforme de tamanho fixo de um fluxo."""
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.seen = 0
+        self.items = []
+        self.random = random.Random(seed)
+
+    def add(self, item):
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            return
+        j = self.random.randrange(self.seen)
+        if j < self.size:
+            self.items[j] = item
@@ -0,0 +1,4 @@
+ALTER TABLE `pacientes` ADD `nome_normalizado` varchar(255);--> statement-breakpoint
+ALTER TABLE `pacientes` ADD `nome_fonetico` varchar(255);--> statement-breakpoint
+CREATE INDEX `idx_pacientes_tenant_nome_normalizado` ON `pacientes` (`tenant_id`,`nome_normalizado`);--> statement-breakpoint
+CREATE INDEX `idx_pacientes_tenant_nome_fonetico` ON `pacientes` (`tenant_id`,`nome_fonetico`);
\ No newline at end of file
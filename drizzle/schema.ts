@@ -167,6 +167,8 @@ export const pacientes = mysqlTable("pacientes", {
   dataInclusao: date("data_inclusao"),
   pastaPaciente: varchar("pasta_paciente", { length: 255 }),
   nome: varchar("nome", { length: 255 }).notNull(),
+  nomeNormalizado: varchar("nome_normalizado", { length: 255 }), // Sem acentos/pontuação (backfill via scripts/backfill_nome_normalizado.py)
+  nomeFonetico: varchar("nome_fonetico", { length: 255 }), // Chave fonética (português) para busca aproximada
   dataNascimento: date("data_nascimento"),
   sexo: mysqlEnum("sexo", ["M", "F", "Outro"]),
   cpf: text("cpf"), // Criptografado AES-256-GCM
@@ -225,6 +227,8 @@ export const pacientes = mysqlTable("pacientes", {
   tenantIdx: index("idx_pacientes_tenant").on(table.tenantId),
   tenantIdPacienteIdx: index("idx_pacientes_tenant_id_paciente").on(table.tenantId, table.idPaciente),
   tenantNomeIdx: index("idx_pacientes_tenant_nome").on(table.tenantId, table.nome),
+  tenantNomeNormalizadoIdx: index("idx_pacientes_tenant_nome_normalizado").on(table.tenantId, table.nomeNormalizado),
+  tenantNomeFoneticoIdx: index("idx_pacientes_tenant_nome_fonetico").on(table.tenantId, table.nomeFonetico),
   tenantCpfIdx: index("idx_pacientes_tenant_cpf").on(table.tenantId, table.cpf),
   tenantCpfHashIdx: index("idx_pacientes_tenant_cpf_hash").on(table.tenantId, table.cpfHash),
   tenantEmailHashIdx: index("idx_pacientes_tenant_email_hash").on(table.tenantId, table.emailHash),
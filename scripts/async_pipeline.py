@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Pipeline assíncrono leitura → transformação → escrita (--pipeline)
+
+Sem o pipeline, os scripts de migração leem um bloco, transformam, gravam e
+só então leem o próximo: o tempo total é a soma das etapas. Aqui cada etapa
+roda ao mesmo tempo que as outras, ligadas por filas limitadas (asyncio.Queue),
+e o tempo total se aproxima do da etapa mais lenta:
+
+  leitura        o iterador de origem avança em uma thread própria
+  transformação  transform(item) em processos (ProcessPoolExecutor), com até
+                 transform_workers itens em andamento; os resultados saem na
+                 ordem de leitura
+  roteamento     route(resultado, item) no laço de eventos, em ordem (estado
+                 sequencial, como IDs já vistos); produz (chave, unidade).
+                 Recebe também o item lido, que não volta dos processos
+                 (ex.: linhas originais para a quarentena)
+  escrita        writers escritores, cada um com sua conexão, gravam unidades
+                 em paralelo; unidades com a mesma chave vão sempre para o
+                 mesmo escritor (ex.: verificação de duplicado), chave None
+                 vai para a fila mais curta
+
+As filas limitadas seguram a leitura quando a escrita não acompanha, e a
+memória fica em poucos blocos. As escritas usam o mysql.connector (extensão
+C, que libera o GIL durante a E/S) em threads, com a mesma configuração e
+TLS de db.py; não há dependência de driver assíncrono.
+
+Uso:
+    resumo = run(source, transform, route, write, writers=2, metrics=metrics)
+    print_summary(resumo)
+
+transform precisa ser uma função de módulo (é enviada aos processos);
+write(indice_escritor, unidade) roda em uma thread e usa a conexão do
+escritor indicado; on_written(unidade, resultado) roda no laço de eventos.
+"""
+
+import time
+import asyncio
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+QUEUE_SIZE = 4
+WRITERS = 2
+TRANSFORM_WORKERS = 1
+
+_DONE = object()
+
+
+def _timed(fn, item):
+    """Executa fn(item) no processo de transformação e mede o tempo gasto."""
+    inicio = time.perf_counter()
+    resultado = fn(item)
+    return resultado, time.perf_counter() - inicio
+
+
+async def run_pipeline(source, transform, route, write, writers=WRITERS, transform_workers=TRANSFORM_WORKERS,
+                       queue_size=QUEUE_SIZE, count=len, unit_count=len, metrics=None, on_written=None,
+                       processes=True):
+    """Executa o pipeline até esgotar source. Retorna o resumo por estágio.
+
+    count(item) dá os registros de um item lido; unit_count(unidade), os de
+    uma unidade escrita. metrics (RunMetrics) recebe as etapas 'leitura' e
+    'transformacao' (as de escrita são registradas pelo próprio write).
+    """
+    loop = asyncio.get_running_loop()
+    lidos = asyncio.Queue(queue_size)
+    filas = [asyncio.Queue(queue_size) for _ in range(writers)]
+    ocupado = Counter()
+    espera = Counter()
+    unidades = Counter()
+    registros = Counter()
+
+    def add(estagio, segundos, n):
+        ocupado[estagio] += segundos
+        unidades[estagio] += 1
+        registros[estagio] += n
+        if metrics is not None and estagio in ('leitura', 'transformacao'):
+            metrics.add(estagio, segundos, n)
+
+    async def put(fila, item, estagio):
+        inicio = time.perf_counter()
+        await fila.put(item)
+        espera[estagio] += time.perf_counter() - inicio
+
+    async def get(fila, estagio):
+        inicio = time.perf_counter()
+        item = await fila.get()
+        espera[estagio] += time.perf_counter() - inicio
+        return item
+
+    reader_pool = ThreadPoolExecutor(1, thread_name_prefix='gorgen-leitura')
+    transform_pool = (ProcessPoolExecutor(transform_workers) if processes
+                      else ThreadPoolExecutor(transform_workers, thread_name_prefix='gorgen-transformacao'))
+    writer_pool = ThreadPoolExecutor(writers, thread_name_prefix='gorgen-escrita')
+
+    async def reader():
+        iterator = iter(source)
+        while True:
+            inicio = time.perf_counter()
+            item = await loop.run_in_executor(reader_pool, next, iterator, _DONE)
+            if item is _DONE:
+                break
+            add('leitura', time.perf_counter() - inicio, count(item))
+            await put(lidos, item, 'leitura')
+        await lidos.put(_DONE)
+
+    async def transformer():
+        pendentes = deque()
+        fim = False
+        while not fim or pendentes:
+            # Mantém até transform_workers itens em andamento
+            while not fim and len(pendentes) < transform_workers:
+                item = await get(lidos, 'transformacao')
+                if item is _DONE:
+                    fim = True
+                    break
+                pendentes.append((loop.run_in_executor(transform_pool, _timed, transform, item), item))
+            if not pendentes:
+                break
+            futuro, item = pendentes.popleft()
+            resultado, segundos = await futuro
+            add('transformacao', segundos, count(item))
+
+            inicio = time.perf_counter()
+            saidas = list(route(resultado, item))
+            add('roteamento', time.perf_counter() - inicio, 0)
+            for chave, unidade in saidas:
+                if chave is None:
+                    fila = min(filas, key=lambda f: f.qsize())
+                else:
+                    fila = filas[hash(chave) % writers]
+                await put(fila, unidade, 'transformacao')
+        for fila in filas:
+            await fila.put(_DONE)
+
+    async def writer(indice):
+        while True:
+            unidade = await get(filas[indice], 'escrita')
+            if unidade is _DONE:
+                return
+            inicio = time.perf_counter()
+            resultado = await loop.run_in_executor(writer_pool, write, indice, unidade)
+            add('escrita', time.perf_counter() - inicio, unit_count(unidade))
+            if on_written:
+                on_written(unidade, resultado)
+
+    inicio = time.perf_counter()
+    tarefas = [asyncio.create_task(reader()), asyncio.create_task(transformer())]
+    tarefas += [asyncio.create_task(writer(i)) for i in range(writers)]
+    try:
+        done, _ = await asyncio.wait(tarefas, return_when=asyncio.FIRST_EXCEPTION)
+        for tarefa in done:
+            if tarefa.exception():
+                raise tarefa.exception()
+    finally:
+        # Um estágio que falha derruba os demais (que estariam presos nas filas)
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+        for pool in (reader_pool, transform_pool, writer_pool):
+            pool.shutdown(wait=True, cancel_futures=True)
+    duracao = time.perf_counter() - inicio
+
+    capacidade = {'leitura': 1, 'transformacao': transform_workers, 'roteamento': 1, 'escrita': writers}
+    estagios = {}
+    for nome, paralelos in capacidade.items():
+        estagios[nome] = {
+            'paralelos': paralelos,
+            'ocupado_s': round(ocupado[nome], 3),
+            'espera_s': round(espera[nome], 3),
+            'unidades': unidades[nome],
+            'registros': registros[nome],
+            'utilizacao': round(ocupado[nome] / (paralelos * duracao), 3) if duracao > 0 else None,
+        }
+    gargalo = max(estagios, key=lambda nome: estagios[nome]['utilizacao'] or 0)
+    return {
+        'duracao_s': round(duracao, 3),
+        'soma_estagios_s': round(sum(ocupado[n] / capacidade[n] for n in capacidade), 3),
+        'gargalo': gargalo,
+        'escritores': writers,
+        'processos_transformacao': transform_workers if processes else 0,
+        'estagios': estagios,
+    }
+
+
+def run(*args, **kwargs):
+    """Executa run_pipeline em um laço de eventos novo (scripts síncronos)."""
+    return asyncio.run(run_pipeline(*args, **kwargs))
+
+
+def print_summary(resumo):
+    print(f"🔀 PIPELINE: {resumo['duracao_s']:.2f}s de parede para {resumo['soma_estagios_s']:.2f}s "
+          f"de estágios em sequência | gargalo: {resumo['gargalo']}")
+    for nome, estagio in resumo['estagios'].items():
+        if not estagio['unidades']:
+            continue
+        print(f"   {nome:<14} x{estagio['paralelos']:<3} ocupado {estagio['ocupado_s']:>8.2f}s "
+              f"({(estagio['utilizacao'] or 0) * 100:>5.1f}%) | esperando {estagio['espera_s']:>8.2f}s | "
+              f"{estagio['unidades']:,} unidade(s)")
+    print()
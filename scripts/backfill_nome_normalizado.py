@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Backfill das colunas pacientes.nome_normalizado e pacientes.nome_fonetico.
+
+Calcula, para cada paciente, o nome sem acentos/pontuação (name_normalizer.normalize_name)
+e a chave fonética em português (name_normalizer.phonetic_key), gravando em lotes
+(UPDATE ... SET col = CASE id ... END WHERE id IN (...)). As colunas são indexadas
+por (tenant_id, coluna), então buscas exatas/fonéticas viram seeks de índice.
+
+Execuções seguintes processam apenas pacientes alterados desde a última marca
+d'água (updated_at, id), guardada em um arquivo JSON local. O UPDATE preserva
+updated_at (updated_at = updated_at) para não disparar o ON UPDATE.
+
+A marca d'água guarda a versão das regras fonéticas
+(name_normalizer.PHONETIC_VERSION); quando as regras mudam, a execução
+seguinte recalcula todos os pacientes do tenant, como com --full.
+
+Uso:
+    python3 scripts/backfill_nome_normalizado.py [--tenant ID] [--chunk=N] [--full] [--dry-run]
+
+Opções:
+    --tenant ID   Processa apenas este tenant_id
+    --chunk=N     Pacientes por lote (default: 1000)
+    --full        Ignora a marca d'água e recalcula todos os pacientes
+    --dry-run     Calcula e conta as alterações sem gravar
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+from db import connect
+from name_normalizer import normalize_name, phonetic_key, PHONETIC_VERSION
+
+WATERMARK_FILE = '/home/ubuntu/consultorio_poc/data/backfill_nome_normalizado.json'
+
+
+def load_watermarks(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_watermarks(path, watermarks):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(watermarks, f, indent=2)
+
+
+def update_chunk(cursor, rows):
+    """Grava nome_normalizado/nome_fonetico de um lote em um único UPDATE."""
+    ids = [row[0] for row in rows]
+    case = ' '.join(['WHEN %s THEN %s'] * len(rows))
+    in_clause = ', '.join(['%s'] * len(rows))
+
+    params = []
+    for paciente_id, normalizado, _ in rows:
+        params.extend([paciente_id, normalizado])
+    for paciente_id, _, fonetico in rows:
+        params.extend([paciente_id, fonetico])
+    params.extend(ids)
+
+    cursor.execute(
+        f"UPDATE pacientes SET "
+        f"nome_normalizado = CASE id {case} END, "
+        f"nome_fonetico = CASE id {case} END, "
+        f"updated_at = updated_at "
+        f"WHERE id IN ({in_clause})",
+        params
+    )
+
+
+def backfill_tenant(conn, tenant_id, watermark, chunk_size=1000, dry_run=False):
+    """Processa os pacientes de um tenant a partir da marca d'água.
+
+    Retorna (lidos, atualizados, nova marca d'água).
+    """
+    cursor = conn.cursor()
+    updated_at, ultimo_id = watermark
+    lidos = 0
+    atualizados = 0
+
+    try:
+        while True:
+            cursor.execute("""
+                SELECT id, nome, nome_normalizado, nome_fonetico, updated_at
+                FROM pacientes
+                WHERE tenant_id = %s
+                  AND (updated_at > %s OR (updated_at = %s AND id > %s))
+                ORDER BY updated_at, id
+                LIMIT %s
+            """, (tenant_id, updated_at, updated_at, ultimo_id, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            alterados = []
+            for paciente_id, nome, atual_norm, atual_fon, _ in rows:
+                normalizado = normalize_name(nome)[:255] or None
+                fonetico = phonetic_key(nome)[:255] or None
+                if (normalizado, fonetico) != (atual_norm, atual_fon):
+                    alterados.append((paciente_id, normalizado, fonetico))
+
+            if alterados and not dry_run:
+                update_chunk(cursor, alterados)
+                conn.commit()
+
+            lidos += len(rows)
+            atualizados += len(alterados)
+            updated_at, ultimo_id = rows[-1][4], rows[-1][0]
+            print(f"\r   Tenant {tenant_id}: {lidos:,} lidos, {atualizados:,} atualizados", end='')
+
+            if len(rows) < chunk_size:
+                break
+    finally:
+        cursor.close()
+
+    print()
+    return lidos, atualizados, (updated_at, ultimo_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill de nome_normalizado / nome_fonetico')
+    parser.add_argument('--tenant', type=int, help='Processa apenas este tenant_id')
+    parser.add_argument('--chunk', type=int, default=1000, help='Pacientes por lote')
+    parser.add_argument('--full', action='store_true', help="Ignora a marca d'água")
+    parser.add_argument('--dry-run', action='store_true', help='Não grava no banco')
+    parser.add_argument('--watermark-file', type=str, default=WATERMARK_FILE)
+    args = parser.parse_args()
+
+    print('=' * 60)
+    print('BACKFILL DE NOME NORMALIZADO / FONÉTICO')
+    print('=' * 60)
+    print(f"Modo: {'SIMULAÇÃO (dry-run)' if args.dry_run else 'PRODUÇÃO'}")
+    print()
+
+    watermarks = load_watermarks(args.watermark_file)
+    conn = connect()
+
+    try:
+        if args.tenant is not None:
+            tenants = [args.tenant]
+        else:
+            cursor = conn.cursor()
+            cursor.execute("SELECT DISTINCT tenant_id FROM pacientes ORDER BY tenant_id")
+            tenants = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+
+        for tenant_id in tenants:
+            salvo = None if args.full else watermarks.get(str(tenant_id))
+            if salvo and salvo.get('versao_fonetica') != PHONETIC_VERSION:
+                print(f"   Tenant {tenant_id}: regras fonéticas mudaram (versão {PHONETIC_VERSION}), recalculando todos")
+                salvo = None
+            if salvo:
+                watermark = (datetime.fromisoformat(salvo['updated_at']), salvo['ultimo_id'])
+            else:
+                watermark = (datetime(1970, 1, 1), 0)
+
+            lidos, atualizados, (updated_at, ultimo_id) = backfill_tenant(
+                conn, tenant_id, watermark, args.chunk, args.dry_run
+            )
+
+            if lidos and not args.dry_run:
+                watermarks[str(tenant_id)] = {
+                    'updated_at': updated_at.isoformat(),
+                    'ultimo_id': ultimo_id,
+                    'versao_fonetica': PHONETIC_VERSION,
+                }
+                save_watermarks(args.watermark_file, watermarks)
+    finally:
+        conn.close()
+
+    print()
+    print('✅ Backfill concluído!')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
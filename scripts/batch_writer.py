@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Gravação em lotes adaptativos com retentativa (MySQL/TiDB)
+
+AdaptiveBatchWriter grava um DataFrame em lotes, cada lote em uma transação
+(execução + commit), e ajusta o tamanho do lote pela latência medida:
+
+  - latência acima de 1,5x a meta: lote cai pela metade
+  - latência abaixo de 0,5x a meta: lote cresce 50%
+  - o lote nunca passa de max_bytes de payload estimado, bem abaixo do
+    limite de transação do TiDB (txn-total-size-limit, 100 MB por padrão) e
+    do max_allowed_packet
+
+Erros transitórios (conexão perdida, deadlock, timeout de lock, conflito de
+escrita e indisponibilidade de região/TiKV/PD no TiDB) são repetidos com
+backoff exponencial com jitter, após rollback (e reconexão, se a conexão
+caiu). Um erro no commit com a conexão perdida deixa o lote em dúvida: só é
+repetido quando a escrita é idempotente (upsert).
+
+Erros de dado de uma linha (ROW_ERRORS: chave duplicada, nulo em coluna
+obrigatória, valor inválido, longo ou fora da faixa, chave estrangeira) não
+derrubam a carga: o lote é dividido ao meio até isolar as linhas com
+problema, que ficam em rejeitados com o erro (e o errno, em 'codigo').
+Os demais (coluna ou tabela inexistente, permissão negada, sintaxe) valem
+para todas as linhas: são repassados e a migração é interrompida, em vez de
+mandar a carga inteira para a quarentena.
+
+Uso:
+    writer = AdaptiveBatchWriter(conn, lambda cur, lote: insert_batch(cur, lote), initial=500)
+    inseridos = writer.write(df)
+    relatorio['lotes'] = writer.report()
+"""
+
+import time
+import random
+from contextlib import nullcontext
+
+from mysql.connector import Error
+
+# Erros transitórios do MySQL/TiDB
+TRANSIENT_ERRORS = {
+    1205: 'timeout de lock',
+    1213: 'deadlock',
+    2006: 'servidor indisponível',
+    2013: 'conexão perdida',
+    8022: 'transação TiDB repetível',
+    8028: 'schema alterado durante a transação',
+    9001: 'timeout do PD',
+    9002: 'timeout do TiKV',
+    9005: 'região indisponível',
+    9007: 'conflito de escrita',
+}
+CONNECTION_ERRORS = {2006, 2013}
+
+# Erros de dado de uma linha: o lote é dividido para isolar as linhas
+ROW_ERRORS = {
+    1048: 'coluna obrigatória nula',
+    1062: 'chave duplicada',
+    1264: 'valor fora da faixa',
+    1265: 'dado truncado',
+    1292: 'valor de data/número inválido',
+    1366: 'valor inválido para a coluna',
+    1406: 'dado longo demais para a coluna',
+    1452: 'chave estrangeira inexistente',
+    3819: 'restrição CHECK violada',
+}
+
+MIN_BATCH = 50
+MAX_BATCH = 10000
+TARGET_LATENCY = 1.0
+MAX_BATCH_BYTES = 16 * 1024 * 1024
+MAX_RETRIES = 6
+BASE_DELAY = 0.5
+MAX_DELAY = 30.0
+GROW_FACTOR = 1.5
+SHRINK_FACTOR = 0.5
+SAMPLE_ROWS = 200
+
+
+class TransientWriteError(Exception):
+    """Erro transitório que persistiu após todas as retentativas."""
+
+
+def error_code(exc):
+    return getattr(exc, 'errno', None)
+
+
+def is_transient(exc):
+    return error_code(exc) in TRANSIENT_ERRORS
+
+
+def is_row_error(exc):
+    return error_code(exc) in ROW_ERRORS
+
+
+def estimate_row_bytes(df, sample=SAMPLE_ROWS):
+    """Bytes médios por linha no INSERT (amostra de até sample linhas)."""
+    if df.empty:
+        return 1
+    amostra = df.head(sample) if len(df) <= sample else df.sample(sample, random_state=0)
+    total = 0
+    for row in amostra.itertuples(index=False):
+        # Cada valor vai como literal: conteúdo + aspas/vírgula
+        total += sum(len(str(v)) + 3 for v in row)
+    return max(1, total // len(amostra))
+
+
+class AdaptiveBatchWriter:
+    """Grava DataFrames em lotes de tamanho adaptativo, com retentativa e isolamento de linhas inválidas."""
+
+    def __init__(self, conn, write_batch, initial=500, min_size=MIN_BATCH, max_size=MAX_BATCH,
+                 target_latency=TARGET_LATENCY, max_bytes=MAX_BATCH_BYTES, adaptive=True,
+                 max_retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY,
+                 idempotent=False, metrics=None, on_batch=None, db_errors=(Error,), sleep=time.sleep):
+        """
+        write_batch(cursor, df_lote) executa o INSERT do lote e retorna as linhas gravadas.
+        on_batch(writer) é chamado após cada lote gravado (progresso).
+        """
+        self.conn = conn
+        self.write_batch = write_batch
+        self.size = initial
+        self.min_size = min(min_size, initial)
+        self.max_size = max(max_size, initial)
+        self.target_latency = target_latency
+        self.max_bytes = max_bytes
+        self.adaptive = adaptive
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.idempotent = idempotent
+        self.metrics = metrics
+        self.on_batch = on_batch
+        self.db_errors = db_errors
+        self.sleep = sleep
+
+        self.lotes = 0
+        self.gravados = 0
+        self.retentativas = 0
+        self.reconexoes = 0
+        self.erros_transitorios = {}
+        self.rejeitados = []
+        self.tamanhos = []
+        self.ajustes = [{'lote': 0, 'tamanho': initial, 'motivo': 'inicial'}]
+        self.row_bytes = None
+
+    # ------------------------------------------------------------------
+    # Transação de um lote
+    # ------------------------------------------------------------------
+
+    def _rollback(self):
+        try:
+            self.conn.rollback()
+        except self.db_errors:
+            pass
+
+    def _reconnect(self):
+        self.reconexoes += 1
+        self.conn.reconnect(attempts=3, delay=1)
+
+    def _stage(self, nome, registros=0):
+        if self.metrics is None:
+            return nullcontext()
+        return self.metrics.stage(nome, registros)
+
+    def _commit_batch(self, batch):
+        """Executa e commita um lote, repetindo erros transitórios. Retorna as linhas gravadas."""
+        tentativa = 0
+        while True:
+            fase = 'execucao'
+            try:
+                cursor = self.conn.cursor()
+                try:
+                    with self._stage('insercao', 0 if tentativa else len(batch)):
+                        gravados = self.write_batch(cursor, batch)
+                    fase = 'commit'
+                    with self._stage('commit'):
+                        self.conn.commit()
+                finally:
+                    try:
+                        cursor.close()
+                    except self.db_errors:
+                        pass
+                return gravados
+            except self.db_errors as e:
+                codigo = error_code(e)
+                conexao_perdida = codigo in CONNECTION_ERRORS
+                em_duvida = fase == 'commit' and conexao_perdida and not self.idempotent
+                if not is_transient(e) or em_duvida or tentativa >= self.max_retries:
+                    if is_transient(e):
+                        motivo = 'commit em dúvida' if em_duvida else f'{tentativa} retentativas'
+                        raise TransientWriteError(f"{TRANSIENT_ERRORS[codigo]} ({motivo}): {e}") from e
+                    raise
+                tentativa += 1
+                self.retentativas += 1
+                self.erros_transitorios[codigo] = self.erros_transitorios.get(codigo, 0) + 1
+                if conexao_perdida:
+                    self._reconnect()
+                else:
+                    self._rollback()
+                # Backoff exponencial com jitter total
+                self.sleep(random.uniform(0, min(self.max_delay, self.base_delay * 2 ** tentativa)))
+
+    def _write_isolating(self, batch):
+        """Grava o lote; em erro de dado (ROW_ERRORS), divide ao meio até isolar as linhas inválidas."""
+        try:
+            return self._commit_batch(batch)
+        except TransientWriteError:
+            raise
+        except self.db_errors as e:
+            self._rollback()
+            if not is_row_error(e):
+                raise
+            if len(batch) == 1:
+                self.rejeitados.append({'indice': batch.index[0], 'codigo': error_code(e), 'erro': str(e)})
+                return 0
+            meio = len(batch) // 2
+            return self._write_isolating(batch.iloc[:meio]) + self._write_isolating(batch.iloc[meio:])
+
+    # ------------------------------------------------------------------
+    # Ajuste do tamanho do lote
+    # ------------------------------------------------------------------
+
+    def _byte_cap(self):
+        return max(self.min_size, self.max_bytes // self.row_bytes)
+
+    def _set_size(self, tamanho, motivo):
+        tamanho = max(self.min_size, min(self.max_size, self._byte_cap(), int(tamanho)))
+        if tamanho != self.size:
+            self.size = tamanho
+            self.ajustes.append({'lote': self.lotes, 'tamanho': tamanho, 'motivo': motivo})
+
+    def _adapt(self, latencia, retentativas):
+        if not self.adaptive:
+            return
+        if retentativas:
+            self._set_size(self.size * SHRINK_FACTOR, 'erro transitório')
+        elif latencia > self.target_latency * 1.5:
+            self._set_size(self.size * SHRINK_FACTOR, f'latência {latencia:.2f}s')
+        elif latencia < self.target_latency * 0.5:
+            self._set_size(self.size * GROW_FACTOR, f'latência {latencia:.2f}s')
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def write(self, df):
+        """Grava o DataFrame inteiro em lotes. Retorna as linhas gravadas."""
+        if df.empty:
+            return 0
+        self.row_bytes = estimate_row_bytes(df)
+        if self.adaptive:
+            self._set_size(self.size, 'limite de bytes')
+
+        gravados = 0
+        pos = 0
+        while pos < len(df):
+            batch = df.iloc[pos:pos + self.size]
+            pos += len(batch)
+            retentativas_antes = self.retentativas
+            inicio = time.perf_counter()
+            n = self._write_isolating(batch)
+            latencia = time.perf_counter() - inicio
+
+            self.lotes += 1
+            gravados += n
+            self.gravados += n
+            self.tamanhos.append(len(batch))
+            if self.metrics is not None:
+                self.metrics.latency('lote', latencia)
+            self._adapt(latencia, self.retentativas - retentativas_antes)
+            if self.on_batch:
+                self.on_batch(self)
+        return gravados
+
+    def report(self):
+        tamanhos = self.tamanhos or [self.size]
+        return {
+            'adaptativo': self.adaptive,
+            'lotes': self.lotes,
+            'gravados': self.gravados,
+            'tamanho_inicial': self.ajustes[0]['tamanho'],
+            'tamanho_final': self.size,
+            'tamanho_min': min(tamanhos),
+            'tamanho_max': max(tamanhos),
+            'tamanho_medio': round(sum(tamanhos) / len(tamanhos), 1),
+            'bytes_por_linha': self.row_bytes,
+            'retentativas': self.retentativas,
+            'reconexoes': self.reconexoes,
+            'erros_transitorios': {str(k): v for k, v in self.erros_transitorios.items()},
+            'rejeitados': len(self.rejeitados),
+            'ajustes': self.ajustes,
+        }
+
+    def print_summary(self, max_ajustes=10):
+        r = self.report()
+        modo = 'adaptativo' if r['adaptativo'] else 'fixo'
+        print(f"📦 Lotes ({modo}): {r['lotes']:,} | tamanho {r['tamanho_inicial']} → {r['tamanho_final']} "
+              f"(mín {r['tamanho_min']}, máx {r['tamanho_max']}, médio {r['tamanho_medio']:.0f}) | "
+              f"~{r['bytes_por_linha'] or 0:,} bytes/linha")
+        if r['retentativas']:
+            erros = ', '.join(f"{TRANSIENT_ERRORS.get(int(k), k)}: {v}" for k, v in r['erros_transitorios'].items())
+            print(f"   Retentativas: {r['retentativas']} ({erros}) | reconexões: {r['reconexoes']}")
+        if r['rejeitados']:
+            print(f"   Linhas rejeitadas: {r['rejeitados']}")
+        ajustes = r['ajustes'][1:]
+        if ajustes:
+            mostrados = ajustes if len(ajustes) <= max_ajustes else ajustes[:max_ajustes // 2] + ajustes[-max_ajustes // 2:]
+            print(f"   Ajustes ({len(ajustes)}):")
+            for i, a in enumerate(mostrados):
+                if len(ajustes) > max_ajustes and i == max_ajustes // 2:
+                    print("      ...")
+                print(f"      após lote {a['lote']:>6,}: {a['tamanho']:>6,} ({a['motivo']})")
+
@@ -0,0 +1,457 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Benchmarks dos scripts de migração e deduplicação
+
+Mede, sobre dados sintéticos (benchmark_data.py), as etapas que dominam o
+tempo das cargas:
+
+  transform    migrate_patients.transform_dataframe
+  insert       migrate_patients.insert_batch em lotes de 500 + commit
+  lookup       migrate_atendimentos.find_paciente_by_name (PreparedStatements)
+  duplicates   find_duplicates.group_sequential (e group_parallel com --workers)
+  fix_ids      fix_atendimento_ids.fix_ids
+
+Cada benchmark roda em um processo novo (spawn), de modo que o pico de
+memória (ru_maxrss) é só dele; a preparação (gerar/carregar dados, popular o
+banco) não entra no tempo medido. Os dados gerados ficam em cache no
+diretório temporário por (linhas, semente).
+
+Banco: SQLite (sqlite_standin.py, padrão) ou MySQL/TiDB local com --mysql
+(DATABASE_URL/DB_*; as linhas usam o tenant BENCH_TENANT e são apagadas ao
+final; fix_ids percorre todos os atendimentos e por isso só roda no SQLite).
+
+Os resultados são acrescentados a data/benchmark_history.jsonl com o commit
+atual, e cada medição é comparada com a última de outro commit.
+
+Os benchmarks com banco contam as consultas por forma de SQL
+(query_budget.py) e falham quando excedem o orçamento de consultas por
+registro (BUDGETS, ou --orcamento para todos): um padrão N+1 novo faz o
+benchmark sair com código 1.
+
+Uso:
+    python3 scripts/benchmark.py [--linhas 20000,200000] [--bench transform,insert]
+                                 [--workers N] [--consultas N] [--semente S] [--mysql]
+                                 [--orcamento 'por_registro=2,por_forma=1']
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import warnings
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from datetime import datetime
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+HISTORY_FILE = os.path.join(REPO_DIR, 'data', 'benchmark_history.jsonl')
+
+BENCHMARKS = ('transform', 'insert', 'lookup', 'duplicates', 'fix_ids')
+DEFAULT_SIZES = (20000,)
+BATCH_SIZE = 500
+LOOKUPS = 2000
+BENCH_TENANT = 990001
+
+# Orçamento de consultas por benchmark (QueryBudget.parse). Reflete o
+# padrão atual: reduzir quando uma otimização baixar o número de consultas.
+BUDGETS = {
+    'insert': 'por_registro=0.01',
+    'lookup': 'por_registro=2,por_forma=1',
+    'fix_ids': 'por_registro=2.1,por_forma=1.05',
+}
+
+# Consultas do benchmark em execução (processo filho)
+QUERY_LOG = None
+
+
+# ============================================
+# DADOS
+# ============================================
+
+def dataset_dir(linhas, semente):
+    return os.path.join(tempfile.gettempdir(), f"gorgen-bench-{linhas}-{semente}")
+
+
+def prepare_dataset(linhas, semente):
+    """Gera (ou reaproveita) pacientes e atendimentos sintéticos. Retorna o diretório."""
+    from benchmark_data import generate_pacientes, generate_atendimentos
+
+    dir_ = dataset_dir(linhas, semente)
+    if os.path.exists(os.path.join(dir_, 'atendimentos.pkl')):
+        return dir_
+
+    os.makedirs(dir_, exist_ok=True)
+    inicio = time.perf_counter()
+    pacientes = generate_pacientes(linhas, semente)
+    atendimentos = generate_atendimentos(linhas, pacientes, semente)
+    for nome, df in (('pacientes', pacientes), ('atendimentos', atendimentos)):
+        df.to_pickle(os.path.join(dir_, f'{nome}.pkl'))
+    print(f"   Dados sintéticos: {linhas:,} linhas em {time.perf_counter() - inicio:.1f}s ({dir_})")
+    return dir_
+
+
+def _load(dir_, nome):
+    import pandas as pd
+    return pd.read_pickle(os.path.join(dir_, f'{nome}.pkl'))
+
+
+def _transformed(dir_):
+    import migrate_patients
+    df, _ = migrate_patients.transform_dataframe(_load(dir_, 'pacientes'))
+    return df
+
+
+# ============================================
+# BANCO
+# ============================================
+
+def _open_db(opts):
+    """Conexão do benchmark (SQLite em arquivo temporário ou MySQL), com as consultas contadas."""
+    from run_metrics import CountingConnection
+
+    path = None
+    if opts['mysql']:
+        from db import connect
+        conn = connect()
+    else:
+        from sqlite_standin import connect
+        fd, path = tempfile.mkstemp(prefix='gorgen-bench-', suffix='.sqlite')
+        os.close(fd)
+        conn = connect(path)
+    conn = CountingConnection(conn, queries=QUERY_LOG)
+    conn.bench_path = path
+    return conn
+
+
+def _close_db(conn, opts):
+    if opts['mysql']:
+        cursor = conn.cursor()
+        for tabela in ('atendimentos', 'pacientes'):
+            cursor.execute(f"DELETE FROM {tabela} WHERE tenant_id = %s", (BENCH_TENANT,))
+        conn.commit()
+        cursor.close()
+    conn.close()
+    path = getattr(conn, 'bench_path', None)
+    if path:
+        for sufixo in ('', '-wal', '-shm'):
+            if os.path.exists(path + sufixo):
+                os.unlink(path + sufixo)
+
+
+def _insert_all(conn, df):
+    from migrate_patients import insert_batch
+    cursor = conn.cursor()
+    for i in range(0, len(df), BATCH_SIZE):
+        insert_batch(cursor, df.iloc[i:i + BATCH_SIZE])
+        conn.commit()
+    cursor.close()
+
+
+def _tenant(df):
+    df = df.copy()
+    df['tenant_id'] = BENCH_TENANT
+    return df
+
+
+# ============================================
+# BENCHMARKS
+# ============================================
+# Cada função recebe (dir_, opts), prepara o que precisa e devolve
+# (função medida, número de registros, extras para o histórico).
+
+def bench_transform(dir_, opts):
+    import migrate_patients
+    df = _load(dir_, 'pacientes')
+    return (lambda: migrate_patients.transform_dataframe(df)), len(df), {}
+
+
+def bench_insert(dir_, opts):
+    df = _tenant(_transformed(dir_))
+    conn = _open_db(opts)
+
+    def run():
+        try:
+            _insert_all(conn, df)
+        finally:
+            _close_db(conn, opts)
+    return run, len(df), {'lote': BATCH_SIZE}
+
+
+def bench_lookup(dir_, opts):
+    from migrate_atendimentos import find_paciente_by_name
+    from db import PreparedStatements
+
+    conn = _open_db(opts)
+    _insert_all(conn, _tenant(_transformed(dir_)))
+    nomes = _load(dir_, 'atendimentos')['Nome'].head(opts['consultas']).tolist()
+    resultado = {}
+
+    def run():
+        stmts = PreparedStatements(conn, dictionary=True)
+        try:
+            resultado['encontrados'] = sum(
+                1 for nome in nomes if find_paciente_by_name(stmts, nome, BENCH_TENANT)
+            )
+        finally:
+            stmts.close()
+            _close_db(conn, opts)
+    return run, len(nomes), resultado
+
+
+def bench_duplicates(dir_, opts):
+    import find_duplicates
+
+    df = _transformed(dir_)
+    pacientes = [
+        {'id': i, 'id_paciente': row.id_paciente, 'nome': row.nome, 'cpf': row.cpf,
+         'data_nascimento': row.data_nascimento}
+        for i, row in enumerate(df.itertuples(index=False), start=1)
+    ]
+    resultado = {'workers': opts['workers']}
+
+    def run():
+        if opts['workers'] > 1:
+            dup_cpf, dup_nasc = find_duplicates.group_parallel(pacientes, opts['workers'])
+        else:
+            dup_cpf, dup_nasc = find_duplicates.group_sequential(pacientes)
+        resultado['grupos_cpf'] = len(dup_cpf)
+        resultado['grupos_nascimento'] = len(dup_nasc)
+    return run, len(pacientes), resultado
+
+
+def bench_fix_ids(dir_, opts):
+    from fix_atendimento_ids import fix_ids
+
+    if opts['mysql']:
+        raise RuntimeError("fix_ids altera todos os atendimentos do banco: apenas no SQLite")
+
+    conn = _open_db(opts)
+    _insert_all(conn, _tenant(_transformed(dir_)))
+    atendimentos = _load(dir_, 'atendimentos')
+    cursor = conn.cursor()
+    cursor.execute("SELECT id FROM pacientes")
+    ids = [row[0] for row in cursor.fetchall()]
+    linhas = [
+        (BENCH_TENANT, str(atd), ids[i % len(ids)], f"{str(atd)[:4]}-01-15")
+        for i, atd in enumerate(atendimentos['Atendimento'])
+    ]
+    cursor.executemany(
+        "INSERT INTO atendimentos (tenant_id, atendimento, paciente_id, data_atendimento) VALUES (%s, %s, %s, %s)",
+        linhas,
+    )
+    conn.commit()
+    cursor.close()
+    resultado = {}
+
+    def run():
+        try:
+            resultado.update(fix_ids(conn))
+        finally:
+            _close_db(conn, opts)
+    return run, len(linhas), resultado
+
+
+BENCH_FUNCS = {
+    'transform': bench_transform,
+    'insert': bench_insert,
+    'lookup': bench_lookup,
+    'duplicates': bench_duplicates,
+    'fix_ids': bench_fix_ids,
+}
+
+
+def _max_rss_mb():
+    # ru_maxrss em KB no Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _child(nome, dir_, opts, queue):
+    """Processo filho: prepara, mede e devolve o resultado pela fila."""
+    global QUERY_LOG
+    sys.path.insert(0, SCRIPTS_DIR)
+    from query_budget import QueryLog, QueryBudget
+    QUERY_LOG = QueryLog()
+    # Saída e avisos dos scripts medidos não interessam (e custam tempo)
+    warnings.simplefilter('ignore')
+    devnull = open(os.devnull, 'w')
+    sys.stdout = devnull
+    try:
+        run, registros, extra = BENCH_FUNCS[nome](dir_, opts)
+        rss_base = _max_rss_mb()
+        # Consultas da preparação (popular o banco) não contam
+        QUERY_LOG.reset()
+        inicio = time.perf_counter()
+        run()
+        segundos = time.perf_counter() - inicio
+        resultado = {
+            'registros': registros,
+            'segundos': round(segundos, 4),
+            'registros_s': round(registros / segundos, 1) if segundos > 0 else None,
+            'pico_rss_mb': round(_max_rss_mb(), 1),
+            'rss_preparacao_mb': round(rss_base, 1),
+            'extra': extra,
+        }
+        if QUERY_LOG.shapes:
+            resultado['consultas'] = QUERY_LOG.as_dict(registros, n=5)
+            orcamento = opts['orcamento'] or BUDGETS.get(nome)
+            if orcamento:
+                resultado['orcamento'] = orcamento
+                resultado['orcamento_excedido'] = QueryBudget.parse(orcamento).check(QUERY_LOG, registros)
+        queue.put(resultado)
+    except Exception as e:
+        queue.put({'erro': f"{type(e).__name__}: {e}"})
+    finally:
+        sys.stdout = sys.__stdout__
+        devnull.close()
+
+
+def run_benchmark(nome, dir_, opts):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(nome, dir_, opts, queue))
+    proc.start()
+    resultado = queue.get()
+    proc.join()
+    return resultado
+
+
+# ============================================
+# HISTÓRICO
+# ============================================
+
+def git_state():
+    """(commit curto, árvore alterada?) do repositório."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        return commit, bool(status)
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def load_history(path=HISTORY_FILE):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def append_history(entries, path=HISTORY_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+
+
+def previous_run(history, entry):
+    """Última medição do mesmo benchmark/tamanho/banco/workers em outro commit (ou a última, se não houver)."""
+    mesmas = [
+        h for h in history
+        if h['benchmark'] == entry['benchmark'] and h['linhas'] == entry['linhas']
+        and h.get('banco') == entry['banco'] and h.get('registros_s')
+        and h.get('extra', {}).get('workers') == entry['extra'].get('workers')
+    ]
+    outras = [h for h in mesmas if h.get('commit') != entry['commit']]
+    return (outras or mesmas or [None])[-1]
+
+
+def _delta(atual, anterior):
+    if not anterior:
+        return '?'
+    return f"{(atual - anterior) / anterior * 100:+.1f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks de migração e deduplicação com dados sintéticos')
+    parser.add_argument('--linhas', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='Tamanhos separados por vírgula (ex.: 20000,200000,2000000)')
+    parser.add_argument('--bench', default=','.join(BENCHMARKS), help=f"Subconjunto de {', '.join(BENCHMARKS)}")
+    parser.add_argument('--workers', type=int, default=1, help='Processos para o agrupamento de duplicatas')
+    parser.add_argument('--consultas', type=int, default=LOOKUPS, help=f'Nomes buscados no lookup (default: {LOOKUPS})')
+    parser.add_argument('--semente', type=int, default=0, help='Semente dos dados sintéticos')
+    parser.add_argument('--orcamento', help="Orçamento de consultas para todos os benchmarks "
+                        "(ex.: 'por_registro=2,por_forma=1'; default: BUDGETS)")
+    parser.add_argument('--mysql', action='store_true', help='Usa o banco de DATABASE_URL/DB_* em vez do SQLite')
+    parser.add_argument('--historico', default=HISTORY_FILE, help='Arquivo JSONL do histórico')
+    parser.add_argument('--sem-historico', action='store_true', help='Não grava o histórico')
+    args = parser.parse_args()
+
+    tamanhos = [int(t) for t in args.linhas.split(',') if t.strip()]
+    nomes = [b.strip() for b in args.bench.split(',') if b.strip()]
+    invalidos = [b for b in nomes if b not in BENCH_FUNCS]
+    if invalidos:
+        parser.error(f"benchmark desconhecido: {', '.join(invalidos)}")
+
+    if args.orcamento:
+        from query_budget import QueryBudget
+        try:
+            QueryBudget.parse(args.orcamento)
+        except ValueError as e:
+            parser.error(str(e))
+
+    opts = {'mysql': args.mysql, 'workers': args.workers, 'consultas': args.consultas,
+            'orcamento': args.orcamento}
+    banco = 'mysql' if args.mysql else 'sqlite'
+    commit, alterado = git_state()
+    history = load_history(args.historico)
+
+    print('=' * 60)
+    print('⏱️  GORGEN - Benchmarks')
+    print('=' * 60)
+    print(f"   Commit: {commit or '?'}{' (alterado)' if alterado else ''} | Banco: {banco}")
+    print()
+
+    novas = []
+    excedidos = 0
+    for linhas in tamanhos:
+        print(f"📊 {linhas:,} linhas")
+        dir_ = prepare_dataset(linhas, args.semente)
+        for nome in nomes:
+            resultado = run_benchmark(nome, dir_, opts)
+            if 'erro' in resultado:
+                print(f"   ❌ {nome:<11} {resultado['erro']}")
+                continue
+            entry = {
+                'data': datetime.now().isoformat(timespec='seconds'),
+                'commit': commit,
+                'alterado': alterado,
+                'banco': banco,
+                'linhas': linhas,
+                'benchmark': nome,
+                **resultado,
+            }
+            anterior = previous_run(history, entry)
+            comparacao = ''
+            if anterior:
+                comparacao = (f" | vs {anterior['commit']}: "
+                              f"{_delta(entry['registros_s'], anterior['registros_s'])} reg/s, "
+                              f"{_delta(entry['pico_rss_mb'], anterior['pico_rss_mb'])} RSS")
+            print(f"   {nome:<11} {entry['segundos']:>9.2f}s {entry['registros_s'] or 0:>12,.0f} reg/s "
+                  f"{entry['pico_rss_mb']:>8.0f} MB{comparacao}")
+            if 'consultas' in entry:
+                consultas = entry['consultas']
+                print(f"   {'':<11} {consultas['total']:,} consultas, {consultas['por_registro']:.2f} por registro "
+                      f"(orçamento: {entry.get('orcamento') or '-'})")
+            for violacao in entry.get('orcamento_excedido') or []:
+                print(f"   {'':<11} ❌ {violacao}")
+                excedidos += 1
+            novas.append(entry)
+        print()
+
+    if novas and not args.sem_historico:
+        append_history(novas, args.historico)
+        print(f"💾 Histórico: {args.historico}")
+
+    if excedidos:
+        print(f"❌ Orçamento de consultas excedido ({excedidos} violação(ões))")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
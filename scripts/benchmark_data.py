@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Gerador de dados sintéticos de clínica para benchmarks
+
+Gera planilhas de pacientes e de atendimentos com as mesmas colunas das
+planilhas reais (22kpacientes.xlsx, atendimentos2025-2026.xlsx) e com os
+problemas que os scripts precisam tratar:
+
+  - nomes brasileiros acentuados, com partículas (da, de, dos) e variantes
+    de grafia (Souza/Sousa, Luiz/Luís, Raphael/Rafael)
+  - CPFs válidos (dígitos verificadores corretos) e uma fração controlada de
+    inválidos (dígito errado, tamanho errado, dígitos repetidos, texto)
+  - duplicatas injetadas: mesmo paciente com outro ID e o nome em maiúsculas,
+    sem acentos ou com outra grafia, mantendo CPF e nascimento
+  - datas bagunçadas: datetime, DD/MM/AAAA, 06/jan./2025, datas impossíveis
+    (31/02) e fora do intervalo aceito
+  - valores monetários em formato brasileiro (R$ 1.234,56)
+
+A geração é vetorizada (NumPy/pandas) e determinística pela semente.
+
+Uso:
+    python3 scripts/benchmark_data.py [--linhas N] [--formato csv,xlsx] [--saida DIR] [--semente S]
+
+Planilhas .xlsx aceitam no máximo 1.048.575 linhas de dados; acima disso
+apenas o CSV é gerado (separador ';', codificação cp1252, como as exportações).
+"""
+
+import os
+import argparse
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from name_normalizer import normalize_name
+
+MAX_XLSX_ROWS = 1_048_575
+
+PRIMEIROS_NOMES = np.array([
+    'João', 'José', 'Antônio', 'Francisco', 'Carlos', 'Paulo', 'Pedro', 'Lucas', 'Luiz', 'Luís',
+    'Marcos', 'Gabriel', 'Rafael', 'Raphael', 'Daniel', 'Marcelo', 'Bruno', 'Eduardo', 'Felipe',
+    'Rodrigo', 'Sérgio', 'Fábio', 'Vinícius', 'Otávio', 'Caetano', 'Maria', 'Ana', 'Francisca',
+    'Antônia', 'Adriana', 'Juliana', 'Márcia', 'Fernanda', 'Patrícia', 'Aline', 'Sandra', 'Camila',
+    'Amanda', 'Bruna', 'Jéssica', 'Letícia', 'Júlia', 'Luciana', 'Vanessa', 'Mariana', 'Gisele',
+    'Giselle', 'Conceição', 'Inês', 'Lúcia', 'Débora', 'Cecília', 'Mônica', 'Thaís', 'Taís',
+], dtype=object)
+
+SOBRENOMES = np.array([
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Sousa', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira',
+    'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares',
+    'Fernandes', 'Vieira', 'Barbosa', 'Rocha', 'Dias', 'Nascimento', 'Andrade', 'Moreira', 'Nunes',
+    'Marques', 'Machado', 'Mendes', 'Freitas', 'Cardoso', 'Ramos', 'Gonçalves', 'Santana',
+    'Teixeira', 'Araújo', 'Conceição', 'Magalhães', 'Brandão', 'Simões', 'Gusmão', 'Leão',
+    'Falcão', 'Assunção', 'Müller', 'Schmidt', 'Zanetti', 'Bortolotto', 'Thomé',
+], dtype=object)
+
+PARTICULAS = np.array(['', '', '', 'da ', 'de ', 'dos ', 'das '], dtype=object)
+
+# Grafias alternativas usadas nas duplicatas injetadas
+VARIANTES = {'Souza': 'Sousa', 'Luiz': 'Luís', 'Raphael': 'Rafael', 'Giselle': 'Gisele',
+             'Thaís': 'Taís', 'Thomé': 'Tomé'}
+
+CIDADES = np.array([
+    ('Porto Alegre', 'RS'), ('Canoas', 'RS'), ('Gravataí', 'RS'), ('Novo Hamburgo', 'RS'),
+    ('São Leopoldo', 'RS'), ('Caxias do Sul', 'RS'), ('Florianópolis', 'SC'), ('São Paulo', 'SP'),
+    ('Curitiba', 'PR'), ('Rio de Janeiro', 'RJ'),
+], dtype=object)
+
+BAIRROS = np.array(['Centro', 'Moinhos de Vento', 'Petrópolis', 'Bela Vista', 'Menino Deus',
+                    'Cidade Baixa', 'Partenon', 'Sarandi', 'Tristeza', 'Três Figueiras'], dtype=object)
+
+RUAS = np.array(['Rua', 'Av.', 'Avenida', 'Travessa', 'R.'], dtype=object)
+
+OPERADORAS = np.array(['UNIMED', 'Particular', 'IPE', 'IPE-SAUDE', 'BRADESCO SAÚDE', 'CASSI',
+                       'CABERGS', 'SAUDE PAS', 'COOPMED', 'SAUDE CAIXA', 'GEAP'], dtype=object)
+
+TIPOS_ATENDIMENTO = np.array(['Consulta', 'Consulta', 'Consulta', 'Retorno', 'Visita internado',
+                              'Cirurgia', 'Procedimento', 'Exame'], dtype=object)
+
+LOCAIS = np.array(['Consultório', 'Consultório', 'HMV', 'HMD', 'HMDC', 'Santa Casa', 'On-line'], dtype=object)
+
+CONVENIOS = np.array(['UNIMED', 'PARTICULAR', 'IPE', 'BRADESCO', 'CASSI', 'AMIL', 'CABERGS',
+                      'SULAMERICA', 'SUL AMERICA', 'CORTESIA', 'RETORNO DE PARTICULAR'], dtype=object)
+
+MESES_ABREV = np.array(['jan', 'fev', 'mar', 'abr', 'mai', 'jun', 'jul', 'ago', 'set', 'out', 'nov', 'dez'],
+                       dtype=object)
+MESES = np.array(['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio', 'Junho', 'Julho', 'Agosto',
+                  'Setembro', 'Outubro', 'Novembro', 'Dezembro'], dtype=object)
+
+
+def _pick(rng, values, n):
+    return values[rng.integers(0, len(values), n)]
+
+
+def _zfill(values, width):
+    return pd.Series(values).astype(str).str.zfill(width).to_numpy(dtype=object)
+
+
+def _nomes(rng, n):
+    nomes = (
+        pd.Series(_pick(rng, PRIMEIROS_NOMES, n)) + ' '
+        + pd.Series(_pick(rng, PARTICULAS, n))
+        + pd.Series(_pick(rng, SOBRENOMES, n)) + ' '
+        + pd.Series(_pick(rng, SOBRENOMES, n))
+    )
+    return nomes.to_numpy(dtype=object)
+
+
+def _cpfs(rng, n, invalid_rate, missing_rate):
+    """CPFs formatados, com a fração invalid_rate inválida e missing_rate vazia."""
+    digits = rng.integers(0, 10, (n, 11))
+    d = digits[:, :9]
+    d1 = (d * np.arange(10, 1, -1)).sum(axis=1) * 10 % 11 % 10
+    d2 = (np.column_stack([d, d1]) * np.arange(11, 1, -1)).sum(axis=1) * 10 % 11 % 10
+    digits[:, 9] = d1
+    digits[:, 10] = d2
+
+    sorteio = rng.random(n)
+    invalido = sorteio < invalid_rate
+    # Dígito verificador errado (metade dos inválidos)
+    errado = invalido & (rng.random(n) < 0.5)
+    digits[errado, 10] = (digits[errado, 10] + 1) % 10
+
+    texto = pd.Series([''.join(map(str, row)) for row in digits.tolist()])
+    formatado = texto.str[:3] + '.' + texto.str[3:6] + '.' + texto.str[6:9] + '-' + texto.str[9:]
+
+    outros = np.flatnonzero(invalido & ~errado)
+    tipos = rng.integers(0, 3, len(outros))
+    formatado.iloc[outros[tipos == 0]] = texto.iloc[outros[tipos == 0]].str[:10]   # tamanho errado
+    formatado.iloc[outros[tipos == 1]] = '111.111.111-11'                          # dígitos repetidos
+    formatado.iloc[outros[tipos == 2]] = 'não informado'                           # texto
+
+    vazio = (sorteio >= invalid_rate) & (sorteio < invalid_rate + missing_rate)
+    formatado[vazio] = None
+    return formatado.to_numpy(dtype=object)
+
+
+def _datas(rng, n, inicio, fim):
+    dias = rng.integers(0, (fim - inicio).days, n)
+    return pd.to_datetime(inicio) + pd.to_timedelta(dias, unit='D')
+
+
+def _datas_baguncadas(rng, datas, missing_rate=0.05):
+    """Mistura datetime, DD/MM/AAAA, DD/mes./AAAA, datas impossíveis e fora do intervalo."""
+    n = len(datas)
+    saida = pd.Series(datas.to_pydatetime(), dtype=object)
+    sorteio = rng.random(n)
+
+    br = (sorteio >= 0.60) & (sorteio < 0.85)
+    saida[br] = datas[br].strftime('%d/%m/%Y')
+
+    abrev = (sorteio >= 0.85) & (sorteio < 0.90)
+    saida[abrev] = (
+        pd.Series(datas[abrev].day).astype(str).str.zfill(2).to_numpy(dtype=object) + '/'
+        + MESES_ABREV[datas[abrev].month - 1] + './'
+        + pd.Series(datas[abrev].year).astype(str).to_numpy(dtype=object)
+    )
+
+    impossivel = (sorteio >= 0.90) & (sorteio < 0.92)
+    saida[impossivel] = _pick(rng, np.array(['31/02/1980', '00/00/0000', '30/13/1975', 'ignorado'],
+                                            dtype=object), int(impossivel.sum()))
+
+    fora = (sorteio >= 0.92) & (sorteio < 0.93)
+    saida[fora] = [datetime(1890, 1, 1)] * int(fora.sum())
+
+    vazio = sorteio >= 1 - missing_rate
+    saida[vazio] = None
+    return saida.to_numpy(dtype=object)
+
+
+def _dinheiro(valores):
+    """Formato brasileiro: R$ 1.234,56."""
+    texto = pd.Series(valores).map(lambda v: f"{v:,.2f}")
+    return ('R$ ' + texto.str.replace(',', '_').str.replace('.', ',').str.replace('_', '.')).to_numpy(dtype=object)
+
+
+def _variante(nome, rng_valor):
+    """Outra grafia do mesmo nome (para duplicatas injetadas)."""
+    if rng_valor < 0.3:
+        return nome.upper()
+    if rng_valor < 0.6:
+        return normalize_name(nome).title()
+    for original, troca in VARIANTES.items():
+        if original in nome:
+            return nome.replace(original, troca)
+    return f"  {nome}  "
+
+
+def generate_pacientes(n, seed=0, invalid_cpf_rate=0.05, duplicate_rate=0.03):
+    """DataFrame com n linhas no formato da planilha de pacientes.
+
+    duplicate_rate: fração das linhas que são cópias de outro paciente (outro ID,
+    nome com outra grafia, mesmo CPF e nascimento).
+    """
+    rng = np.random.default_rng(seed)
+    originais = n - int(n * duplicate_rate)
+
+    nomes = _nomes(rng, originais)
+    cidades = _pick(rng, CIDADES, originais)
+    nascimento = _datas(rng, originais, datetime(1930, 1, 1), datetime(2020, 12, 31))
+    emails = (
+        pd.Series(nomes).map(normalize_name).str.replace(' ', '.', regex=False)
+        + '@' + pd.Series(_pick(rng, np.array(['gmail.com', 'hotmail.com', 'terra.com.br', 'yahoo.com.br'],
+                                               dtype=object), originais))
+    )
+    sem_email = rng.random(originais)
+    emails[sem_email < 0.3] = None
+    emails[(sem_email >= 0.3) & (sem_email < 0.33)] = 'sem email'
+
+    df = pd.DataFrame({
+        'ID paciente': np.arange(1, originais + 1),
+        'Nome': nomes,
+        'Data nascimento': _datas_baguncadas(rng, nascimento),
+        'Sexo': _pick(rng, np.array(['M', 'F', 'F', 'Masculino', 'Feminino', None], dtype=object), originais),
+        'CPF': _cpfs(rng, originais, invalid_cpf_rate, missing_rate=0.2),
+        'Nome da mae': _nomes(rng, originais),
+        'E-mail': emails.to_numpy(dtype=object),
+        'Telefone': ('(51) 9' + pd.Series(_zfill(rng.integers(0, 10**4, originais), 4)) + '-'
+                     + pd.Series(_zfill(rng.integers(0, 10**4, originais), 4))).to_numpy(dtype=object),
+        'Endereço': (pd.Series(_pick(rng, RUAS, originais)) + ' ' + pd.Series(_pick(rng, SOBRENOMES, originais))
+                     + ', ' + pd.Series(rng.integers(1, 5000, originais)).astype(str)).to_numpy(dtype=object),
+        'Bairro': _pick(rng, BAIRROS, originais),
+        'CEP': np.where(rng.random(originais) < 0.5,
+                        pd.Series(_zfill(rng.integers(90000000, 99999999, originais), 8)).str[:5] + '-'
+                        + pd.Series(_zfill(rng.integers(0, 1000, originais), 3)),
+                        _zfill(rng.integers(90000000, 99999999, originais), 8)),
+        'Cidade': [c[0] for c in cidades],
+        'UF': [c[1] for c in cidades],
+        'Pais': np.where(rng.random(originais) < 0.9, 'Brasil', None),
+        'Operadora 1': _pick(rng, OPERADORAS, originais),
+        'Plano / Modalidade 1': _pick(rng, np.array(['Apartamento', 'Enfermaria', 'Executivo', None],
+                                                    dtype=object), originais),
+        'Matricula convênio 1': _zfill(rng.integers(0, 10**12, originais), 12),
+        'Vigente 1': rng.random(originais) < 0.8,
+        'Privativo 1': rng.random(originais) < 0.1,
+        'Operadora 2': np.where(rng.random(originais) < 0.1, _pick(rng, OPERADORAS, originais), None),
+        'Plano / Modalidade 2': None,
+        'Matricula convênio 2': None,
+        'Vigente 2': False,
+        'Privativo 2': False,
+        'Obito / Perda de seguimento': rng.random(originais) < 0.02,
+        'Status do caso': _pick(rng, np.array(['Ativo', 'Ativo', 'Ativo', 'Inativo', 'Alta'],
+                                              dtype=object), originais),
+    })
+
+    # Duplicatas injetadas
+    extras = n - originais
+    if extras:
+        fonte = rng.integers(0, originais, extras)
+        dup = df.iloc[fonte].copy()
+        sorteio = rng.random(extras)
+        dup['Nome'] = [_variante(nome, r) for nome, r in zip(dup['Nome'], sorteio)]
+        dup['ID paciente'] = np.arange(originais + 1, n + 1)
+        df = pd.concat([df, dup], ignore_index=True)
+        # Embaralha para as duplicatas não ficarem no fim
+        df = df.iloc[rng.permutation(n)].reset_index(drop=True)
+
+    return df
+
+
+def generate_atendimentos(n, pacientes, seed=0, unknown_rate=0.02):
+    """DataFrame com n linhas no formato da planilha de atendimentos.
+
+    Os nomes vêm de pacientes (metade em maiúsculas, como na planilha real);
+    unknown_rate dos atendimentos são de pacientes que não existem.
+    """
+    rng = np.random.default_rng(seed + 1)
+    datas = _datas(rng, n, datetime(2023, 1, 1), datetime(2026, 12, 31)).sort_values()
+
+    nomes = pacientes['Nome'].to_numpy(dtype=object)[rng.integers(0, len(pacientes), n)]
+    nomes = np.where(rng.random(n) < 0.5, pd.Series(nomes).str.upper(), nomes)
+    desconhecido = rng.random(n) < unknown_rate
+    nomes[desconhecido] = _nomes(rng, int(desconhecido.sum()))
+
+    # Data: datetime (60%) ou texto abreviado '06/jan./2025' (como na planilha real)
+    texto_data = (
+        pd.Series(datas.day).astype(str).str.zfill(2).to_numpy(dtype=object) + '/'
+        + MESES_ABREV[datas.month - 1] + './' + pd.Series(datas.year).astype(str).to_numpy(dtype=object)
+    )
+    data_col = np.where(rng.random(n) < 0.6, pd.Series(datas.to_pydatetime(), dtype=object), texto_data)
+
+    ano = datas.year.to_numpy()
+    sequencia = pd.Series(ano).groupby(ano).cumcount().to_numpy() + 1
+    previsto = rng.choice(np.array([122.0, 180.0, 250.0, 350.0, 1250.5, 4300.0]), n)
+    pago = rng.random(n) < 0.7
+    trimestre = ((datas.month.to_numpy() - 1) // 3 + 1).astype(str)
+
+    return pd.DataFrame({
+        'Atendimento': ano * 10000 + sequencia,
+        'Data': data_col,
+        'Semana #': datas.isocalendar().week.to_numpy(),
+        'Tipo de atendimento': _pick(rng, TIPOS_ATENDIMENTO, n),
+        'Procedimento': _pick(rng, TIPOS_ATENDIMENTO, n),
+        'Nome': nomes,
+        'Local': _pick(rng, LOCAIS, n),
+        'Convênio': _pick(rng, CONVENIOS, n),
+        'Plano do convênio': None,
+        'Privativo': rng.random(n) < 0.1,
+        'Data envio para cobrança': _datas_baguncadas(rng, datas, missing_rate=0.6),
+        'Pagamento efetivado?': pago,
+        'Data esperada para pagamento': _datas_baguncadas(rng, datas, missing_rate=0.5),
+        'Faturamento Previsto': _dinheiro(previsto),
+        'Registro manual do valor de HM': np.where(rng.random(n) < 0.05, _dinheiro(previsto * 1.1), None),
+        'Faturamento previsto final': _dinheiro(previsto),
+        'Data do pagamento': np.where(pago, _datas_baguncadas(rng, datas, missing_rate=0.3), None),
+        'Pagamento efetivo': np.where(pago, 1, None),
+        'Nota Fiscal Correspondente': None,
+        'Observações': np.where(rng.random(n) < 0.05, 'Retorno com exames', None),
+        'FATURAMENTO REALIZADO': None,
+        'Faturamento Letícia': None,
+        'Faturamento AG+LU': 'R$ 0,00',
+        'Mes': MESES[datas.month - 1],
+        'Ano': ano,
+        'Trimestre': pd.Series(trimestre).to_numpy(dtype=object) + 'T',
+        'Trimestre + Ano': pd.Series(trimestre).to_numpy(dtype=object) + 'T' + ano.astype(str).astype(object),
+    })
+
+
+def write_dataset(df, path_base, formatos):
+    """Grava df como <path_base>.csv e/ou .xlsx. Retorna os caminhos gravados."""
+    caminhos = []
+    if 'csv' in formatos:
+        path = f"{path_base}.csv"
+        df.to_csv(path, sep=';', index=False, encoding='cp1252', errors='replace', date_format='%d/%m/%Y')
+        caminhos.append(path)
+    if 'xlsx' in formatos:
+        if len(df) > MAX_XLSX_ROWS:
+            print(f"   ⚠️  {len(df):,} linhas excedem o limite do .xlsx: apenas CSV")
+        else:
+            path = f"{path_base}.xlsx"
+            df.to_excel(path, index=False)
+            caminhos.append(path)
+    return caminhos
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Gera dados sintéticos de pacientes e atendimentos')
+    parser.add_argument('--linhas', type=int, default=20000, help='Linhas de pacientes (default: 20000)')
+    parser.add_argument('--atendimentos', type=int, help='Linhas de atendimentos (default: igual a --linhas)')
+    parser.add_argument('--formato', default='csv,xlsx', help='csv, xlsx ou csv,xlsx (default)')
+    parser.add_argument('--saida', default='.', help='Diretório de saída')
+    parser.add_argument('--semente', type=int, default=0, help='Semente do gerador (default: 0)')
+    parser.add_argument('--cpf-invalido', type=float, default=0.05, help='Fração de CPFs inválidos')
+    parser.add_argument('--duplicatas', type=float, default=0.03, help='Fração de duplicatas injetadas')
+    args = parser.parse_args()
+
+    formatos = {f.strip() for f in args.formato.split(',')}
+    os.makedirs(args.saida, exist_ok=True)
+
+    inicio = datetime.now()
+    pacientes = generate_pacientes(args.linhas, args.semente, args.cpf_invalido, args.duplicatas)
+    atendimentos = generate_atendimentos(args.atendimentos or args.linhas, pacientes, args.semente)
+    print(f"📊 Gerados {len(pacientes):,} pacientes e {len(atendimentos):,} atendimentos "
+          f"em {(datetime.now() - inicio).total_seconds():.1f}s")
+
+    for nome, df in (('pacientes', pacientes), ('atendimentos', atendimentos)):
+        base = os.path.join(args.saida, f"sintetico_{nome}_{len(df)}")
+        for path in write_dataset(df, base, formatos):
+            print(f"   📄 {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Mapeamento declarativo planilha -> tabela para os scripts de migração
+
+O mapeamento de cada migração é uma lista de colunas de destino, na ordem
+da tabela, cada uma um dicionário:
+
+  'destino'     coluna da tabela
+  'origem'      coluna da planilha (ou 'de': outra coluna de destino, já
+                calculada, da qual esta deriva)
+  'tipo'        tipo na leitura: 'str', 'int', 'date', 'bool' (delimited_reader)
+  'max'         tamanho máximo do texto (cortado)
+  'normalizar'  nome de um normalizador de NORMALIZERS ou função
+                (Series, coluna) -> Series; padrão 'texto'
+  'padrao'      valor quando o resultado é nulo
+  'aviso'       aviso contado quando a origem tem valor e o resultado é nulo
+                (ex.: 'CPFs inválidos')
+
+Normalizadores recebem a coluna inteira (operações vetorizadas do pandas, sem
+apply linha a linha) e a entrada do mapeamento, com as opções próprias
+('mapa', 'maiusculas', 'senao', 'prefixo', 'min_data', 'max_data').
+
+compile_mapping() gera um MappingPlan:
+  - plano de leitura: só as colunas de origem mapeadas são lidas (usecols no
+    CSV/TSV, projeção de colunas do cache da planilha) e convertidas para os
+    tipos declarados, qualquer que seja o formato de origem
+  - plano de transformação: transform(df) -> (DataFrame de destino, avisos)
+
+Um novo layout de planilha vira uma nova lista de colunas.
+
+Uso:
+    PLANO = compile_mapping(MAPEAMENTO, aliases=CSV_ALIASES)
+    for df in PLANO.read(arquivo, chunksize=20000):
+        resultado, avisos = PLANO.transform(df)
+"""
+
+import numpy as np
+import pandas as pd
+
+from delimited_reader import CHUNK_ROWS, convert_column, is_delimited, read_delimited
+from reject_quarantine import META_COLUMNS, is_parquet, read_parquet_chunks
+from workbook_cache import read_excel_cached
+
+TIPOS = ('str', 'int', 'date', 'bool')
+
+
+# ============================================
+# NORMALIZADORES (vetorizados)
+# ============================================
+
+def _none(serie):
+    """NaN/NA/NaT -> None (coluna object, como o banco e os hashes esperam)."""
+    serie = serie.astype(object)
+    return serie.where(serie.notna(), None)
+
+
+def texto(serie, coluna):
+    """Texto sem espaços nas bordas, cortado em 'max'; vazio -> nulo; 'prefixo' opcional."""
+    resultado = convert_column(serie, 'str')
+    if coluna.get('max'):
+        resultado = resultado.str[:coluna['max']]
+    resultado = resultado.replace('', None)
+    if coluna.get('prefixo'):
+        resultado = resultado.where(resultado.isna(), coluna['prefixo'] + resultado.fillna(''))
+    return _none(resultado)
+
+
+def maiusculas(serie, coluna):
+    return _none(texto(serie, coluna).str.upper())
+
+
+def sim_nao(serie, coluna):
+    """'Sim' se verdadeiro, senão 'Não' (inclusive nulo)."""
+    return pd.Series(np.where(serie.eq(True), 'Sim', 'Não'), index=serie.index, dtype=object)
+
+
+def booleano(serie, coluna):
+    """True/False (nulo -> False)."""
+    return serie.eq(True).astype(object)
+
+
+def inteiro(serie, coluna):
+    return _none(serie.astype('Int64'))
+
+
+def mapa(serie, coluna):
+    """Valor de coluna['mapa'] pela chave (texto; em maiúsculas se 'maiusculas').
+
+    Sem correspondência: 'senao' = 'titulo' usa a chave em formato de título;
+    senão, o texto da origem (cortado em 'max').
+    """
+    chave = texto(serie, {})
+    if coluna.get('maiusculas'):
+        chave = chave.str.upper()
+    mapeado = chave.map(coluna['mapa'])
+    senao = chave.str.title() if coluna.get('senao') == 'titulo' else texto(serie, coluna)
+    return _none(mapeado.where(mapeado.notna(), senao))
+
+
+def data_iso(serie, coluna):
+    """Data 'AAAA-MM-DD' dentro de ['min_data', 'max_data'] (fora -> nulo)."""
+    datas = serie if pd.api.types.is_datetime64_any_dtype(serie.dtype) else convert_column(serie, 'date')
+    validas = datas.notna()
+    if coluna.get('min_data') is not None:
+        validas &= datas >= coluna['min_data']
+    if coluna.get('max_data') is not None:
+        validas &= datas <= coluna['max_data']
+    return _none(datas.dt.strftime('%Y-%m-%d').where(validas))
+
+
+def data(serie, coluna):
+    """Objetos date (nulo -> None)."""
+    datas = serie if pd.api.types.is_datetime64_any_dtype(serie.dtype) else convert_column(serie, 'date')
+    return _none(pd.Series(datas.dt.date, index=serie.index).where(datas.notna()))
+
+
+NORMALIZERS = {
+    'texto': texto,
+    'maiusculas': maiusculas,
+    'sim_nao': sim_nao,
+    'booleano': booleano,
+    'inteiro': inteiro,
+    'mapa': mapa,
+    'data_iso': data_iso,
+    'data': data,
+}
+
+
+# ============================================
+# PLANO
+# ============================================
+
+class MappingPlan:
+    """Mapeamento compilado: o que ler (colunas e tipos) e como transformar."""
+
+    def __init__(self, colunas, tipos, aliases=None):
+        self.colunas = colunas
+        self.tipos = tipos
+        self.aliases = aliases or {}
+
+    @property
+    def destinos(self):
+        return [coluna['destino'] for coluna in self.colunas]
+
+    def prepare(self, df):
+        """Colunas de origem ausentes criadas vazias e todas nos tipos declarados."""
+        df = df.copy()
+        for origem, tipo in self.tipos.items():
+            df[origem] = convert_column(df[origem], tipo) if origem in df.columns else None
+        return df
+
+    def read(self, path, chunksize=None, nrows=None):
+        """Blocos tipados do arquivo (planilha, CSV/TSV ou quarentena .parquet), só com as colunas mapeadas.
+
+        Planilha: um bloco só, a menos que chunksize seja informado. As
+        colunas da quarentena (_linha...) são mantidas.
+        """
+        if is_delimited(path):
+            yield from read_delimited(path, self.tipos, aliases=self.aliases, chunksize=chunksize or CHUNK_ROWS,
+                                      nrows=nrows, keep=META_COLUMNS)
+            return
+        if is_parquet(path):
+            for chunk in read_parquet_chunks(path, chunksize or CHUNK_ROWS, nrows=nrows):
+                yield self.prepare(chunk)
+            return
+        df = self.prepare(read_excel_cached(path, nrows=nrows, columns=list(self.tipos)))
+        if not chunksize:
+            yield df
+            return
+        for inicio in range(0, len(df), chunksize):
+            yield df.iloc[inicio:inicio + chunksize]
+
+    def transform(self, df):
+        """DataFrame com as colunas de destino (na ordem do mapeamento) e os avisos."""
+        resultado = {}
+        avisos = []
+        for coluna in self.colunas:
+            serie = resultado[coluna['de']] if 'de' in coluna else df[coluna['origem']]
+            normalizar = coluna.get('normalizar', 'texto')
+            if not callable(normalizar):
+                normalizar = NORMALIZERS[normalizar]
+            valores = normalizar(serie, coluna)
+            if coluna.get('padrao') is not None:
+                valores = valores.where(valores.notna(), coluna['padrao'])
+            if coluna.get('aviso'):
+                invalidos = int((serie.notna() & valores.isna()).sum())
+                if invalidos:
+                    avisos.append(f"{coluna['aviso']}: {invalidos}")
+            resultado[coluna['destino']] = valores
+        return pd.DataFrame(resultado, index=df.index), avisos
+
+
+def compile_mapping(colunas, aliases=None):
+    """Valida o mapeamento e gera o MappingPlan (tipos de leitura por coluna de origem)."""
+    tipos = {}
+    destinos = set()
+    for coluna in colunas:
+        if 'de' in coluna:
+            if coluna['de'] not in destinos:
+                raise ValueError(f"{coluna['destino']}: deriva de {coluna['de']}, que não vem antes no mapeamento")
+        else:
+            tipo = coluna.get('tipo', 'str')
+            if tipo not in TIPOS:
+                raise ValueError(f"{coluna['destino']}: tipo desconhecido {tipo!r}")
+            if tipos.setdefault(coluna['origem'], tipo) != tipo:
+                raise ValueError(f"{coluna['origem']}: tipos diferentes no mapeamento ({tipos[coluna['origem']]}, {tipo})")
+        normalizar = coluna.get('normalizar', 'texto')
+        if not callable(normalizar) and normalizar not in NORMALIZERS:
+            raise ValueError(f"{coluna['destino']}: normalizador desconhecido {normalizar!r}")
+        destinos.add(coluna['destino'])
+    return MappingPlan(colunas, tipos, aliases)
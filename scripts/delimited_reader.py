@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Leitura em blocos de exportações CSV/TSV para os scripts de migração
+
+As exportações costumam vir em CSV separado por ';' e codificado em latin-1
+(Excel no Windows) ou UTF-8. read_delimited() detecta codificação e separador,
+lê o arquivo em blocos com o parser C do pandas e converte cada coluna
+conforme uma especificação de tipos, entregando DataFrames com os mesmos nomes
+de coluna da planilha .xlsx, prontos para as mesmas etapas de transformação e
+inserção.
+
+Especificação de colunas: {'Nome da coluna': tipo}, com tipo em
+  'str'   texto sem espaços nas bordas (vazio -> nulo)
+  'int'   inteiro (Int64, aceita nulos)
+  'date'  data no formato brasileiro (dia primeiro) -> Timestamp
+  'bool'  Sim/Não, Verdadeiro/Falso, TRUE/FALSE, 1/0, X
+
+Os cabeçalhos do arquivo são associados à especificação sem diferenciar
+maiúsculas, acentos e pontuação ('data_nascimento' -> 'Data nascimento',
+'email' -> 'E-mail'); aliases cobre nomes diferentes. Colunas da
+especificação ausentes no arquivo são criadas vazias. Com keep, só as
+colunas da especificação (e as de keep) são lidas do arquivo.
+
+convert_column() aplica a mesma conversão a colunas vindas de planilhas
+.xlsx ou Parquet (números, datas e booleanos já tipados).
+
+Uso pela linha de comando (inspeção):
+    python3 scripts/delimited_reader.py ARQUIVO.csv
+"""
+
+import csv
+import sys
+import codecs
+from datetime import date, datetime, time
+
+import pandas as pd
+
+from name_normalizer import normalize_name
+
+DELIMITED_EXTENSIONS = ('.csv', '.tsv', '.txt')
+CHUNK_ROWS = 20000
+SAMPLE_BYTES = 1 << 20
+
+# Ordem de tentativa: UTF-8 falha em bytes latin-1 acentuados; cp1252 cobre
+# as aspas/travessões do Excel; latin-1 aceita qualquer byte
+ENCODINGS = ('utf-8', 'cp1252', 'latin-1')
+DELIMITERS = ';,\t|'
+
+TRUE_VALUES = frozenset({'sim', 's', 'verdadeiro', 'true', 't', '1', 'x', 'yes', 'y'})
+FALSE_VALUES = frozenset({'nao', 'não', 'n', 'falso', 'false', 'f', '0', 'no'})
+
+
+def is_delimited(path):
+    """True se o arquivo deve ser lido como texto delimitado (pela extensão)."""
+    return str(path).lower().endswith(DELIMITED_EXTENSIONS)
+
+
+def detect_encoding(path):
+    """Codificação do arquivo: BOM, depois UTF-8 estrito, depois cp1252/latin-1."""
+    with open(path, 'rb') as f:
+        sample = f.read(SAMPLE_BYTES)
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+
+    for encoding in ENCODINGS:
+        try:
+            # final=False: a amostra pode terminar no meio de um caractere
+            codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def detect_delimiter(path, encoding):
+    """Separador mais provável a partir das primeiras linhas."""
+    with open(path, encoding=encoding, newline='') as f:
+        sample = ''.join(line for _, line in zip(range(20), f))
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        # Sniffer falha com uma única coluna ou linhas irregulares: usa o
+        # separador mais frequente do cabeçalho
+        header = sample.splitlines()[0] if sample else ''
+        return max(DELIMITERS, key=header.count) if header else ';'
+
+
+def _header_key(name):
+    return normalize_name(str(name)).replace(' ', '')
+
+
+def column_mapping(header, spec, aliases=None):
+    """{cabeçalho do arquivo: nome da especificação} para os cabeçalhos reconhecidos."""
+    wanted = {_header_key(col): col for col in spec}
+    for alias, col in (aliases or {}).items():
+        wanted.setdefault(_header_key(alias), col)
+
+    mapping = {}
+    for name in header:
+        col = wanted.get(_header_key(name))
+        if col is not None and col not in mapping.values():
+            mapping[name] = col
+    return mapping
+
+
+def _to_bool(value):
+    if value is None:
+        return None
+    lowered = value.strip().lower()
+    if lowered in TRUE_VALUES:
+        return True
+    if lowered in FALSE_VALUES:
+        return False
+    return None
+
+
+def _text(value):
+    """Texto de um valor já tipado (planilha): inteiros sem '.0', datas em ISO."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S' if value.time() != time() else '%Y-%m-%d')
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)
+
+
+def _as_text(series):
+    if series.dtype != object:
+        series = series.astype(object)
+    if pd.api.types.infer_dtype(series, skipna=True) in ('string', 'empty'):
+        # Texto lido do CSV: nada a converter
+        return series
+    return series.map(_text, na_action='ignore')
+
+
+def convert_column(series, tipo):
+    """Converte uma coluna (texto do CSV ou valores de planilha) para o tipo da especificação."""
+    if tipo == 'date' and pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series
+    if tipo == 'bool' and pd.api.types.is_bool_dtype(series.dtype):
+        return series.astype(object)
+    if tipo == 'int' and pd.api.types.is_integer_dtype(series.dtype):
+        return series.astype('Int64')
+    texto = _as_text(series).str.strip().replace('', None)
+    if tipo == 'int':
+        numeros = pd.to_numeric(texto.str.replace(r'\.0+$', '', regex=True), errors='coerce')
+        # Valores não inteiros (1.5) ficam nulos em vez de falhar na conversão para Int64
+        return numeros.where(numeros == numeros.round()).astype('Int64')
+    if tipo == 'date':
+        # ISO (AAAA-MM-DD, como a planilha e a quarentena Parquet gravam) não é lido com o dia primeiro
+        iso = texto.str.match(r'\d{4}-\d{2}-\d{2}', na=False)
+        datas = pd.to_datetime(texto.where(~iso), dayfirst=True, errors='coerce', format='mixed')
+        if iso.any():
+            datas[iso] = pd.to_datetime(texto[iso], errors='coerce', format='ISO8601')
+        return datas
+    if tipo == 'bool':
+        return texto.map(_to_bool, na_action='ignore').astype(object)
+    return texto.astype(object)
+
+
+def read_delimited(path, spec, aliases=None, chunksize=CHUNK_ROWS, nrows=None,
+                   encoding=None, sep=None, keep=None):
+    """Lê um CSV/TSV em blocos de DataFrames tipados conforme spec.
+
+    O índice continua entre blocos (0..N-1), de modo que idx + 2 é a linha do
+    arquivo. Retorna um iterador; encoding/sep são detectados se omitidos.
+    keep: colunas a manter além das da especificação; as demais não são lidas
+    (None: lê todas).
+    """
+    encoding = encoding or detect_encoding(path)
+    sep = sep or detect_delimiter(path, encoding)
+
+    with open(path, encoding=encoding, newline='') as f:
+        header = next(csv.reader(f, delimiter=sep), [])
+    mapping = column_mapping(header, spec, aliases)
+    usecols = None
+    if keep is not None:
+        usecols = [name for name in header if name in mapping or name in keep]
+
+    reader = pd.read_csv(
+        path, sep=sep, encoding=encoding, dtype=str, chunksize=chunksize, nrows=nrows,
+        keep_default_na=False, na_values=[''], skipinitialspace=True, usecols=usecols,
+    )
+    for chunk in reader:
+        chunk = chunk.rename(columns=mapping)
+        for col, tipo in spec.items():
+            if col in chunk.columns:
+                chunk[col] = convert_column(chunk[col], tipo)
+            else:
+                chunk[col] = None
+        yield chunk
+
+
+def describe(path):
+    """Codificação, separador e cabeçalho detectados (para inspeção)."""
+    encoding = detect_encoding(path)
+    sep = detect_delimiter(path, encoding)
+    with open(path, encoding=encoding, newline='') as f:
+        header = next(csv.reader(f, delimiter=sep), [])
+    return {'encoding': encoding, 'sep': sep, 'colunas': header}
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    for arquivo in sys.argv[1:]:
+        info = describe(arquivo)
+        print(f"📄 {arquivo}")
+        print(f"   Codificação: {info['encoding']} | Separador: {info['sep']!r}")
+        print(f"   Colunas ({len(info['colunas'])}): {', '.join(info['colunas'])}")
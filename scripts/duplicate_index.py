@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Índice persistente de chaves de duplicata de pacientes.
+
+Mantém em um arquivo SQLite local as mesmas chaves usadas por find_duplicates.py
+(nome+CPF, nome+data de nascimento) e os hashes de busca (cpf_hash, email_hash,
+telefone_hash), permitindo responder "quais pacientes existentes colidem com este
+registro?" com uma busca por chave, sem varrer a tabela.
+
+O índice é atualizado de forma incremental pela marca d'água de updated_at
+(por tenant); pacientes removidos (deleted_at) saem do índice na sincronização.
+
+Uso:
+    python3 scripts/duplicate_index.py sync [--tenant ID] [--full]
+    python3 scripts/duplicate_index.py check --tenant ID --nome NOME [--cpf CPF] [--nascimento AAAA-MM-DD]
+                                             [--email EMAIL] [--telefone TELEFONE]
+    python3 scripts/duplicate_index.py stats
+
+No check, CPF, email e telefone chegam em texto puro e são convertidos nos
+hashes de busca (cpf_hash, email_hash, telefone_hash) com o mesmo HMAC do app
+(server/services/HashingService.ts), usando a chave de HMAC_SECRET_KEY. Sem a
+chave, só as chaves de nome (nome+CPF, nome+nascimento) são verificadas.
+
+Uso como módulo:
+    index = DuplicateIndex()
+    colisoes = index.check(1, nome='Maria Silva', cpf='123.456.789-09')
+"""
+
+import os
+import re
+import sys
+import hmac
+import json
+import hashlib
+import sqlite3
+import argparse
+from datetime import datetime
+
+from db import connect
+from find_duplicates import build_keys
+
+DEFAULT_INDEX_PATH = '/home/ubuntu/consultorio_poc/data/duplicate_index.sqlite'
+
+# Colunas de hash (HMAC) indexadas diretamente, sem normalização adicional
+HASH_COLUMNS = ('cpf_hash', 'email_hash', 'telefone_hash')
+
+# Chave do HMAC dos hashes de busca (a mesma do servidor)
+HMAC_KEY_ENV = 'HMAC_SECRET_KEY'
+
+# Valores com cara de CPF (com ou sem formatação), como em HashingService.isCpfFormat
+CPF_FORMAT = re.compile(r'^[0-9.\-\s]{11,14}$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chaves (
+    tenant_id INTEGER NOT NULL,
+    tipo TEXT NOT NULL,
+    chave TEXT NOT NULL,
+    paciente_id INTEGER NOT NULL,
+    PRIMARY KEY (tenant_id, tipo, chave, paciente_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_chaves_paciente ON chaves (paciente_id);
+
+CREATE TABLE IF NOT EXISTS pacientes (
+    paciente_id INTEGER PRIMARY KEY,
+    tenant_id INTEGER NOT NULL,
+    id_paciente TEXT,
+    nome TEXT
+);
+
+CREATE TABLE IF NOT EXISTS marca_dagua (
+    tenant_id INTEGER PRIMARY KEY,
+    updated_at TEXT NOT NULL,
+    ultimo_id INTEGER NOT NULL
+);
+"""
+
+
+def search_hash(valor, tenant_id, chave):
+    """Hash de busca de um valor, como HashingService.createHash do servidor.
+
+    HMAC-SHA256 (hex) de "<tenant_id>:<valor normalizado>": só os dígitos se o
+    valor tem formato de CPF, senão sem espaços nas pontas e em minúsculas.
+    Retorna None para valor vazio.
+    """
+    if not valor or not valor.strip():
+        return None
+    if CPF_FORMAT.match(valor):
+        normalizado = re.sub(r'[^0-9]', '', valor)
+    else:
+        normalizado = valor.strip().lower()
+    dados = f"{tenant_id}:{normalizado}".encode('utf-8')
+    return hmac.new(chave.encode('utf-8'), dados, hashlib.sha256).hexdigest()
+
+
+def record_keys(nome=None, cpf=None, data_nascimento=None, cpf_hash=None,
+                email_hash=None, telefone_hash=None):
+    """Gera os pares (tipo, chave) de um registro de paciente."""
+    keys = []
+
+    key_cpf, key_nasc = build_keys(nome, cpf, data_nascimento)
+    if key_cpf:
+        keys.append(('nome_cpf', key_cpf))
+    if key_nasc:
+        keys.append(('nome_nascimento', key_nasc))
+
+    hashes = {'cpf_hash': cpf_hash, 'email_hash': email_hash, 'telefone_hash': telefone_hash}
+    for column in HASH_COLUMNS:
+        if hashes[column]:
+            keys.append((column, hashes[column]))
+
+    return keys
+
+
+class DuplicateIndex:
+    """Índice local (SQLite) de chaves de duplicata por tenant."""
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def get_watermark(self, tenant_id):
+        """Retorna (updated_at, ultimo_id) da última sincronização do tenant."""
+        row = self.conn.execute(
+            "SELECT updated_at, ultimo_id FROM marca_dagua WHERE tenant_id = ?", (tenant_id,)
+        ).fetchone()
+        if not row:
+            return datetime(1970, 1, 1), 0
+        return datetime.fromisoformat(row[0]), row[1]
+
+    def reset(self, tenant_id):
+        """Remove todas as chaves e a marca d'água de um tenant."""
+        with self.conn:
+            self.conn.execute("DELETE FROM chaves WHERE tenant_id = ?", (tenant_id,))
+            self.conn.execute("DELETE FROM pacientes WHERE tenant_id = ?", (tenant_id,))
+            self.conn.execute("DELETE FROM marca_dagua WHERE tenant_id = ?", (tenant_id,))
+
+    def add(self, tenant_id, paciente_id, id_paciente=None, nome=None, cpf=None,
+            data_nascimento=None, cpf_hash=None, email_hash=None, telefone_hash=None):
+        """Registra (ou substitui) as chaves de um paciente.
+
+        Útil para absorver um paciente recém-inserido sem esperar a próxima sincronização.
+        """
+        keys = record_keys(nome, cpf, data_nascimento, cpf_hash, email_hash, telefone_hash)
+        with self.conn:
+            self._replace(tenant_id, paciente_id, id_paciente, nome, keys)
+
+    def _replace(self, tenant_id, paciente_id, id_paciente, nome, keys):
+        self.conn.execute("DELETE FROM chaves WHERE paciente_id = ?", (paciente_id,))
+        self.conn.execute(
+            "INSERT OR REPLACE INTO pacientes (paciente_id, tenant_id, id_paciente, nome) VALUES (?, ?, ?, ?)",
+            (paciente_id, tenant_id, id_paciente, nome)
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO chaves (tenant_id, tipo, chave, paciente_id) VALUES (?, ?, ?, ?)",
+            [(tenant_id, tipo, chave, paciente_id) for tipo, chave in keys]
+        )
+
+    def _remove(self, paciente_id):
+        self.conn.execute("DELETE FROM chaves WHERE paciente_id = ?", (paciente_id,))
+        self.conn.execute("DELETE FROM pacientes WHERE paciente_id = ?", (paciente_id,))
+
+    def sync(self, cursor, tenant_id, chunk_size=5000):
+        """Absorve pacientes criados/alterados desde a última marca d'água.
+
+        Percorre (updated_at, id) em ordem crescente, em blocos; cada bloco é
+        aplicado em uma transação local junto com a nova marca d'água.
+        Retorna o número de pacientes processados.
+        """
+        updated_at, ultimo_id = self.get_watermark(tenant_id)
+        total = 0
+
+        while True:
+            cursor.execute("""
+                SELECT id, id_paciente, nome, cpf, data_nascimento,
+                       cpf_hash, email_hash, telefone_hash, deleted_at, updated_at
+                FROM pacientes
+                WHERE tenant_id = %s
+                  AND (updated_at > %s OR (updated_at = %s AND id > %s))
+                ORDER BY updated_at, id
+                LIMIT %s
+            """, (tenant_id, updated_at, updated_at, ultimo_id, chunk_size))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+
+            with self.conn:
+                for p in rows:
+                    if p['deleted_at'] is not None:
+                        self._remove(p['id'])
+                        continue
+                    keys = record_keys(
+                        p['nome'], p['cpf'], p['data_nascimento'],
+                        p['cpf_hash'], p['email_hash'], p['telefone_hash']
+                    )
+                    self._replace(tenant_id, p['id'], p['id_paciente'], p['nome'], keys)
+
+                updated_at, ultimo_id = rows[-1]['updated_at'], rows[-1]['id']
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO marca_dagua (tenant_id, updated_at, ultimo_id) VALUES (?, ?, ?)",
+                    (tenant_id, updated_at.isoformat(), ultimo_id)
+                )
+
+            total += len(rows)
+            if len(rows) < chunk_size:
+                break
+
+        return total
+
+    def check(self, tenant_id, nome=None, cpf=None, data_nascimento=None,
+              cpf_hash=None, email_hash=None, telefone_hash=None):
+        """Lista os pacientes do tenant que colidem com o registro candidato.
+
+        Retorna uma lista de dicts com paciente_id, id_paciente, nome e os
+        critérios (tipos de chave) que colidiram.
+        """
+        keys = record_keys(nome, cpf, data_nascimento, cpf_hash, email_hash, telefone_hash)
+        colisoes = {}
+
+        for tipo, chave in keys:
+            rows = self.conn.execute("""
+                SELECT c.paciente_id, p.id_paciente, p.nome
+                FROM chaves c
+                LEFT JOIN pacientes p ON p.paciente_id = c.paciente_id
+                WHERE c.tenant_id = ? AND c.tipo = ? AND c.chave = ?
+            """, (tenant_id, tipo, chave)).fetchall()
+            for paciente_id, id_paciente, nome_existente in rows:
+                colisao = colisoes.setdefault(paciente_id, {
+                    'paciente_id': paciente_id,
+                    'id_paciente': id_paciente,
+                    'nome': nome_existente,
+                    'criterios': [],
+                })
+                colisao['criterios'].append(tipo)
+
+        return list(colisoes.values())
+
+    def stats(self):
+        """Resumo do índice por tenant."""
+        rows = self.conn.execute("""
+            SELECT p.tenant_id, COUNT(*), m.updated_at
+            FROM pacientes p
+            LEFT JOIN marca_dagua m ON m.tenant_id = p.tenant_id
+            GROUP BY p.tenant_id
+            ORDER BY p.tenant_id
+        """).fetchall()
+        return [{'tenant_id': t, 'pacientes': n, 'marca_dagua': w} for t, n, w in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Índice persistente de duplicatas de pacientes')
+    parser.add_argument('--index', type=str, default=DEFAULT_INDEX_PATH, help='Arquivo SQLite do índice')
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    p_sync = sub.add_parser('sync', help="Absorve pacientes novos/alterados (marca d'água updated_at)")
+    p_sync.add_argument('--tenant', type=int, help='Sincroniza apenas este tenant_id')
+    p_sync.add_argument('--full', action='store_true', help='Reconstrói o índice do zero')
+
+    p_check = sub.add_parser('check', help='Verifica colisões de um registro candidato')
+    p_check.add_argument('--tenant', type=int, required=True)
+    p_check.add_argument('--nome', type=str, required=True)
+    p_check.add_argument('--cpf', type=str)
+    p_check.add_argument('--nascimento', type=str, help='Data de nascimento (AAAA-MM-DD)')
+    p_check.add_argument('--email', type=str, help=f'Email (verificado pelo email_hash; requer {HMAC_KEY_ENV})')
+    p_check.add_argument('--telefone', type=str, help=f'Telefone (verificado pelo telefone_hash; requer {HMAC_KEY_ENV})')
+
+    sub.add_parser('stats', help='Resumo do índice')
+
+    args = parser.parse_args()
+    index = DuplicateIndex(args.index)
+
+    try:
+        if args.comando == 'sync':
+            conn = connect()
+            cursor = conn.cursor(dictionary=True)
+            try:
+                if args.tenant is not None:
+                    tenants = [args.tenant]
+                else:
+                    cursor.execute("SELECT DISTINCT tenant_id FROM pacientes ORDER BY tenant_id")
+                    tenants = [row['tenant_id'] for row in cursor.fetchall()]
+
+                for tenant_id in tenants:
+                    if args.full:
+                        index.reset(tenant_id)
+                    total = index.sync(cursor, tenant_id)
+                    print(f"Tenant {tenant_id}: {total} pacientes absorvidos")
+            finally:
+                cursor.close()
+                conn.close()
+
+        elif args.comando == 'check':
+            hashes = {}
+            chave = os.environ.get(HMAC_KEY_ENV)
+            if chave:
+                for coluna, valor in (('cpf_hash', args.cpf), ('email_hash', args.email),
+                                      ('telefone_hash', args.telefone)):
+                    hashes[coluna] = search_hash(valor, args.tenant, chave)
+            elif args.cpf or args.email or args.telefone:
+                print(f"⚠️  {HMAC_KEY_ENV} não definida: verificando só as chaves de nome "
+                      f"(sem cpf_hash, email_hash e telefone_hash)", file=sys.stderr)
+            colisoes = index.check(args.tenant, nome=args.nome, cpf=args.cpf,
+                                   data_nascimento=args.nascimento, **hashes)
+            print(json.dumps(colisoes, ensure_ascii=False, indent=2))
+            return 1 if colisoes else 0
+
+        elif args.comando == 'stats':
+            print(json.dumps(index.stats(), ensure_ascii=False, indent=2))
+    finally:
+        index.close()
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,57 +4,40 @@ Script para identificar pacientes duplicados na base de dados.
 Critérios de duplicata:
 1. Mesmo nome (normalizado) + mesmo CPF (quando preenchido)
 2. Mesmo nome (normalizado) + mesma data de nascimento (quando preenchida)
+
+A varredura é particionada por tenant: cada clínica tem seu próprio espaço de
+chaves e seu próprio relatório (duplicatas_pacientes_tenant_<id>.json/.txt).
+
+Uso:
+    python3 scripts/find_duplicates.py [--tenant ID] [--workers N] [--profile]
+
+Opções:
+    --tenant ID   Analisa apenas o tenant informado (usa idx_pacientes_tenant_nome)
+    --workers N   Processos paralelos: um tenant por processo na varredura completa,
+                  ou normalização das chaves (memória compartilhada + NumPy) com --tenant
+    --profile     Perfila as etapas (leitura, agrupamento, consolidação, relatório)
+                  com cProfile + tracemalloc e grava os arquivos ao lado dos
+                  relatórios; --profile-stacks grava também as pilhas amostradas.
+                  Só o processo principal é perfilado.
 """
 
 import os
 import re
 import json
-from urllib.parse import urlparse
-import mysql.connector
+import argparse
+import hashlib
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 
-def get_db_config():
-    """Extrai configuração do banco a partir de DATABASE_URL"""
-    url = os.environ.get('DATABASE_URL', '')
-    if not url:
-        raise ValueError("DATABASE_URL não definida")
-    
-    parsed = urlparse(url)
-    return {
-        'host': parsed.hostname,
-        'port': parsed.port or 3306,
-        'user': parsed.username,
-        'password': parsed.password,
-        'database': parsed.path.lstrip('/').split('?')[0],
-        'ssl_disabled': False
-    }
+from db import connect, pooled_connection
+from name_normalizer import normalize_name
+from run_profiler import RunProfiler, profile_stage
 
-def normalize_name(name):
-    """Normaliza nome para comparação (lowercase, sem acentos, sem espaços extras)"""
-    if not name:
-        return ""
-    
-    # Converter para minúsculas
-    name = name.lower().strip()
-    
-    # Remover acentos
-    replacements = {
-        'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a', 'ä': 'a',
-        'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
-        'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i',
-        'ó': 'o', 'ò': 'o', 'õ': 'o', 'ô': 'o', 'ö': 'o',
-        'ú': 'u', 'ù': 'u', 'û': 'u', 'ü': 'u',
-        'ç': 'c', 'ñ': 'n'
-    }
-    for old, new in replacements.items():
-        name = name.replace(old, new)
-    
-    # Remover caracteres especiais e múltiplos espaços
-    name = re.sub(r'[^a-z0-9\s]', '', name)
-    name = re.sub(r'\s+', ' ', name).strip()
-    
-    return name
+OUTPUT_DIR = '/home/ubuntu/consultorio_poc/data'
+
+# Largura (bytes) das chaves codificadas no modo paralelo (digest blake2b)
+KEY_WIDTH = 16
 
 def normalize_cpf(cpf):
     """Normaliza CPF removendo pontos e traços"""
@@ -62,123 +45,212 @@ def normalize_cpf(cpf):
         return ""
     return re.sub(r'[^0-9]', '', str(cpf))
 
-def main():
-    print("=" * 60)
-    print("ANÁLISE DE DUPLICATAS DE PACIENTES")
-    print("=" * 60)
-    print()
+def build_keys(nome, cpf, data_nasc):
+    """Monta as chaves de agrupamento (nome+CPF, nome+nascimento) de um paciente.
     
-    # Conectar ao banco
-    config = get_db_config()
-    conn = mysql.connector.connect(**config)
-    cursor = conn.cursor(dictionary=True)
+    Retorna None na chave cujo campo de apoio não está preenchido.
+    """
+    nome_norm = normalize_name(nome)
+    cpf_norm = normalize_cpf(cpf)
     
-    # Buscar todos os pacientes ativos
-    print("Buscando pacientes no banco de dados...")
-    cursor.execute("""
-        SELECT 
-            id,
-            id_paciente,
-            nome,
-            cpf,
-            data_nascimento,
-            email,
-            telefone,
-            convenio,
-            created_at
-        FROM pacientes 
-        WHERE deleted_at IS NULL
-        ORDER BY nome, created_at
-    """)
+    key_cpf = None
+    if cpf_norm and len(cpf_norm) >= 11:
+        key_cpf = f"{nome_norm}|{cpf_norm}"
     
-    pacientes = cursor.fetchall()
-    print(f"Total de pacientes ativos: {len(pacientes)}")
-    print()
+    key_nasc = None
+    if data_nasc:
+        data_str = data_nasc.strftime('%Y-%m-%d') if isinstance(data_nasc, datetime) else str(data_nasc)
+        key_nasc = f"{nome_norm}|{data_str}"
     
-    # Dicionários para agrupar duplicatas
+    return key_cpf, key_nasc
+
+def group_sequential(pacientes):
+    """Agrupa pacientes por chave em um único processo."""
     duplicatas_nome_cpf = defaultdict(list)
     duplicatas_nome_nascimento = defaultdict(list)
     
-    # Processar cada paciente
     for p in pacientes:
-        nome_norm = normalize_name(p['nome'])
-        cpf_norm = normalize_cpf(p['cpf'])
-        data_nasc = p['data_nascimento']
-        
-        # Agrupar por nome + CPF (quando CPF existe)
-        if cpf_norm and len(cpf_norm) >= 11:
-            key_cpf = f"{nome_norm}|{cpf_norm}"
+        key_cpf, key_nasc = build_keys(p['nome'], p['cpf'], p['data_nascimento'])
+        if key_cpf:
             duplicatas_nome_cpf[key_cpf].append(p)
-        
-        # Agrupar por nome + data de nascimento (quando data existe)
-        if data_nasc:
-            data_str = data_nasc.strftime('%Y-%m-%d') if isinstance(data_nasc, datetime) else str(data_nasc)
-            key_nasc = f"{nome_norm}|{data_str}"
+        if key_nasc:
             duplicatas_nome_nascimento[key_nasc].append(p)
     
     # Filtrar apenas grupos com mais de 1 paciente (duplicatas)
     dup_cpf = {k: v for k, v in duplicatas_nome_cpf.items() if len(v) > 1}
     dup_nasc = {k: v for k, v in duplicatas_nome_nascimento.items() if len(v) > 1}
+    return dup_cpf, dup_nasc
+
+def encode_key(key):
+    """Codifica uma chave textual em KEY_WIDTH bytes (vazio quando não há chave)."""
+    if not key:
+        return b''
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=KEY_WIDTH).digest()
+
+def _encode_slice(shm_cpf_name, shm_nasc_name, total, start, registros):
+    """Worker: normaliza uma fatia de pacientes e grava as chaves na memória compartilhada."""
+    import numpy as np
+    from multiprocessing import shared_memory
+    
+    shm_cpf = shared_memory.SharedMemory(name=shm_cpf_name)
+    shm_nasc = shared_memory.SharedMemory(name=shm_nasc_name)
+    try:
+        keys_cpf = np.ndarray((total,), dtype=f'S{KEY_WIDTH}', buffer=shm_cpf.buf)
+        keys_nasc = np.ndarray((total,), dtype=f'S{KEY_WIDTH}', buffer=shm_nasc.buf)
+        for offset, (nome, cpf, data_nasc) in enumerate(registros):
+            key_cpf, key_nasc = build_keys(nome, cpf, data_nasc)
+            keys_cpf[start + offset] = encode_key(key_cpf)
+            keys_nasc[start + offset] = encode_key(key_nasc)
+        del keys_cpf, keys_nasc
+    finally:
+        shm_cpf.close()
+        shm_nasc.close()
+    return len(registros)
+
+def _runs(keys):
+    """Ordena as chaves e devolve os índices de cada sequência repetida (>1), na ordem original."""
+    import numpy as np
     
-    # Consolidar duplicatas únicas (evitar contar o mesmo par duas vezes)
-    todos_ids_duplicados = set()
+    if len(keys) < 2:
+        return []
+    
+    order = np.argsort(keys, kind='stable')
+    sorted_keys = keys[order]
+    boundaries = np.flatnonzero(sorted_keys[1:] != sorted_keys[:-1]) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(keys)]))
+    
+    mask = ((ends - starts) > 1) & (sorted_keys[starts] != b'')
+    runs = [order[s:e] for s, e in zip(starts[mask], ends[mask])]
+    # Ordenação estável: o primeiro índice de cada run é a primeira ocorrência
+    runs.sort(key=lambda idx: idx[0])
+    return runs
+
+def group_parallel(pacientes, workers):
+    """Agrupa pacientes normalizando fatias disjuntas em paralelo.
+    
+    Cada worker grava chaves de largura fixa em arrays NumPy sobre memória
+    compartilhada; o agrupamento é um sort + run-length vetorizado.
+    """
+    import numpy as np
+    from multiprocessing import shared_memory
+    
+    total = len(pacientes)
+    size = max(total, 1) * KEY_WIDTH
+    shm_cpf = shared_memory.SharedMemory(create=True, size=size)
+    shm_nasc = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        keys_cpf = np.ndarray((total,), dtype=f'S{KEY_WIDTH}', buffer=shm_cpf.buf)
+        keys_nasc = np.ndarray((total,), dtype=f'S{KEY_WIDTH}', buffer=shm_nasc.buf)
+        
+        bounds = np.linspace(0, total, workers + 1, dtype=int)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for start, end in zip(bounds[:-1], bounds[1:]):
+                if start == end:
+                    continue
+                registros = [(p['nome'], p['cpf'], p['data_nascimento']) for p in pacientes[start:end]]
+                futures.append(executor.submit(
+                    _encode_slice, shm_cpf.name, shm_nasc.name, total, int(start), registros
+                ))
+            for future in futures:
+                future.result()
+        
+        dup_cpf = {}
+        for idx in _runs(keys_cpf):
+            grupo = [pacientes[i] for i in idx]
+            key_cpf, _ = build_keys(grupo[0]['nome'], grupo[0]['cpf'], grupo[0]['data_nascimento'])
+            dup_cpf[key_cpf] = grupo
+        
+        dup_nasc = {}
+        for idx in _runs(keys_nasc):
+            grupo = [pacientes[i] for i in idx]
+            _, key_nasc = build_keys(grupo[0]['nome'], grupo[0]['cpf'], grupo[0]['data_nascimento'])
+            dup_nasc[key_nasc] = grupo
+        
+        del keys_cpf, keys_nasc
+    finally:
+        shm_cpf.close()
+        shm_cpf.unlink()
+        shm_nasc.close()
+        shm_nasc.unlink()
+    
+    return dup_cpf, dup_nasc
+
+def fetch_tenants(cursor):
+    """Lista os tenants que possuem pacientes ativos."""
+    cursor.execute("""
+        SELECT DISTINCT tenant_id
+        FROM pacientes
+        WHERE deleted_at IS NULL
+        ORDER BY tenant_id
+    """)
+    return [row['tenant_id'] for row in cursor.fetchall()]
+
+def fetch_pacientes(cursor, tenant_id):
+    """Busca os pacientes ativos de um tenant (idx_pacientes_tenant_nome)."""
+    cursor.execute("""
+        SELECT 
+            id,
+            id_paciente,
+            nome,
+            cpf,
+            data_nascimento,
+            email,
+            telefone,
+            convenio,
+            created_at
+        FROM pacientes 
+        WHERE tenant_id = %s
+          AND deleted_at IS NULL
+        ORDER BY nome, created_at
+    """, (tenant_id,))
+    return cursor.fetchall()
+
+def consolidate_groups(dup_cpf, dup_nasc):
+    """Consolida os grupos por CPF e por nascimento (evita contar o mesmo grupo duas vezes)."""
+    grupos_por_ids = {}
     grupos_duplicatas = []
     
     # Processar duplicatas por CPF
     for key, pacientes_grupo in dup_cpf.items():
         ids = tuple(sorted([p['id'] for p in pacientes_grupo]))
-        if ids not in todos_ids_duplicados:
-            todos_ids_duplicados.add(ids)
-            grupos_duplicatas.append({
+        if ids not in grupos_por_ids:
+            grupo = {
                 'tipo': 'CPF',
                 'criterio': key,
                 'pacientes': pacientes_grupo
-            })
+            }
+            grupos_por_ids[ids] = grupo
+            grupos_duplicatas.append(grupo)
     
     # Processar duplicatas por data de nascimento
     for key, pacientes_grupo in dup_nasc.items():
         ids = tuple(sorted([p['id'] for p in pacientes_grupo]))
         # Verificar se já não foi identificado pelo CPF
-        ja_identificado = False
-        for grupo in grupos_duplicatas:
-            grupo_ids = tuple(sorted([p['id'] for p in grupo['pacientes']]))
-            if ids == grupo_ids:
-                ja_identificado = True
-                grupo['tipo'] = 'CPF + Data Nascimento'
-                break
+        grupo = grupos_por_ids.get(ids)
+        if grupo:
+            grupo['tipo'] = 'CPF + Data Nascimento'
+            continue
         
-        if not ja_identificado:
-            grupos_duplicatas.append({
-                'tipo': 'Data Nascimento',
-                'criterio': key,
-                'pacientes': pacientes_grupo
-            })
-    
-    # Estatísticas
-    print("=" * 60)
-    print("RESULTADOS")
-    print("=" * 60)
-    print()
-    print(f"Duplicatas por Nome + CPF: {len(dup_cpf)} grupos")
-    print(f"Duplicatas por Nome + Data Nascimento: {len(dup_nasc)} grupos")
-    print(f"Total de grupos de duplicatas únicos: {len(grupos_duplicatas)}")
-    print()
-    
-    # Contar pacientes envolvidos
-    pacientes_duplicados = set()
-    for grupo in grupos_duplicatas:
-        for p in grupo['pacientes']:
-            pacientes_duplicados.add(p['id'])
-    
-    print(f"Total de pacientes envolvidos em duplicatas: {len(pacientes_duplicados)}")
-    print()
+        grupo = {
+            'tipo': 'Data Nascimento',
+            'criterio': key,
+            'pacientes': pacientes_grupo
+        }
+        grupos_por_ids[ids] = grupo
+        grupos_duplicatas.append(grupo)
     
-    # Gerar relatório detalhado
+    return grupos_duplicatas
+
+def build_report(tenant_id, grupos_duplicatas):
+    """Gera o relatório detalhado (lista serializável) dos grupos de um tenant."""
     relatorio = []
     
     for i, grupo in enumerate(grupos_duplicatas, 1):
         grupo_info = {
             'grupo': i,
+            'tenant_id': tenant_id,
             'tipo_duplicata': grupo['tipo'],
             'quantidade': len(grupo['pacientes']),
             'pacientes': []
@@ -200,22 +272,25 @@ def main():
         
         relatorio.append(grupo_info)
     
-    # Salvar relatório JSON
-    output_json = '/home/ubuntu/consultorio_poc/data/duplicatas_pacientes.json'
+    return relatorio
+
+def write_reports(tenant_id, relatorio, total_envolvidos):
+    """Salva os relatórios JSON e TXT de um tenant; retorna os caminhos."""
+    output_json = os.path.join(OUTPUT_DIR, f'duplicatas_pacientes_tenant_{tenant_id}.json')
     with open(output_json, 'w', encoding='utf-8') as f:
         json.dump(relatorio, f, ensure_ascii=False, indent=2)
-    print(f"Relatório JSON salvo em: {output_json}")
     
     # Gerar relatório em texto para revisão
-    output_txt = '/home/ubuntu/consultorio_poc/data/duplicatas_pacientes.txt'
+    output_txt = os.path.join(OUTPUT_DIR, f'duplicatas_pacientes_tenant_{tenant_id}.txt')
     with open(output_txt, 'w', encoding='utf-8') as f:
         f.write("=" * 80 + "\n")
         f.write("RELATÓRIO DE PACIENTES DUPLICADOS - GORGEN\n")
+        f.write(f"Tenant: {tenant_id}\n")
         f.write(f"Data: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n")
         f.write("=" * 80 + "\n\n")
         
-        f.write(f"Total de grupos de duplicatas: {len(grupos_duplicatas)}\n")
-        f.write(f"Total de pacientes envolvidos: {len(pacientes_duplicados)}\n\n")
+        f.write(f"Total de grupos de duplicatas: {len(relatorio)}\n")
+        f.write(f"Total de pacientes envolvidos: {total_envolvidos}\n\n")
         
         f.write("-" * 80 + "\n\n")
         
@@ -236,24 +311,141 @@ def main():
             
             f.write("-" * 80 + "\n\n")
     
-    print(f"Relatório TXT salvo em: {output_txt}")
+    return output_json, output_txt
+
+def scan_tenant(tenant_id, workers=1, profiler=None):
+    """Analisa as duplicatas de um único tenant, com conexão própria.
     
-    # Exibir primeiros grupos como amostra
+    Pode rodar em um processo separado; retorna um resumo serializável.
+    """
+    # Conexão do pool do processo: reaproveitada entre os tenants do mesmo worker
+    with profile_stage(profiler, 'leitura'), pooled_connection(size=1) as conn:
+        cursor = conn.cursor(dictionary=True)
+        try:
+            pacientes = fetch_pacientes(cursor, tenant_id)
+        finally:
+            cursor.close()
+    
+    # Agrupar por nome + CPF e nome + data de nascimento
+    with profile_stage(profiler, 'agrupamento'):
+        if workers > 1:
+            dup_cpf, dup_nasc = group_parallel(pacientes, workers)
+        else:
+            dup_cpf, dup_nasc = group_sequential(pacientes)
+    
+    with profile_stage(profiler, 'consolidacao'):
+        grupos_duplicatas = consolidate_groups(dup_cpf, dup_nasc)
+    
+    # Contar pacientes envolvidos
+    pacientes_duplicados = set()
+    for grupo in grupos_duplicatas:
+        for p in grupo['pacientes']:
+            pacientes_duplicados.add(p['id'])
+    
+    with profile_stage(profiler, 'relatorio'):
+        relatorio = build_report(tenant_id, grupos_duplicatas)
+        output_json, output_txt = write_reports(tenant_id, relatorio, len(pacientes_duplicados))
+    
+    return {
+        'tenant_id': tenant_id,
+        'pacientes': len(pacientes),
+        'grupos_cpf': len(dup_cpf),
+        'grupos_nascimento': len(dup_nasc),
+        'grupos': len(grupos_duplicatas),
+        'envolvidos': len(pacientes_duplicados),
+        'json': output_json,
+        'txt': output_txt,
+        'amostra': relatorio[:10],
+    }
+
+def main(tenant=None, workers=1, profile=False, profile_stacks=False):
+    print("=" * 60)
+    print("ANÁLISE DE DUPLICATAS DE PACIENTES")
+    print("=" * 60)
+    print()
+    
+    profiler = None
+    if profile or profile_stacks:
+        sufixo = f'_tenant_{tenant}' if tenant is not None else ''
+        profiler = RunProfiler(os.path.join(OUTPUT_DIR, f'duplicatas_pacientes{sufixo}'), stacks=profile_stacks)
+        profiler.start()
+    
+    if tenant is not None:
+        tenants = [tenant]
+    else:
+        conn = connect()
+        cursor = conn.cursor(dictionary=True)
+        tenants = fetch_tenants(cursor)
+        cursor.close()
+        conn.close()
+    
+    print(f"Tenants a analisar: {len(tenants)}")
     print()
+    
+    # Um tenant: paraleliza a normalização das chaves.
+    # Vários tenants: um tenant por processo, cada um com seu espaço de chaves.
+    if len(tenants) == 1:
+        if workers > 1:
+            print(f"Normalizando chaves em {workers} processos...")
+        resumos = [scan_tenant(tenants[0], workers, profiler)]
+    elif workers > 1:
+        print(f"Processando tenants em {min(workers, len(tenants))} processos...")
+        with ProcessPoolExecutor(max_workers=min(workers, len(tenants))) as executor:
+            resumos = list(executor.map(scan_tenant, tenants))
+    else:
+        resumos = [scan_tenant(t, profiler=profiler) for t in tenants]
+    
+    # Estatísticas
     print("=" * 60)
-    print("AMOSTRA DOS PRIMEIROS 10 GRUPOS DE DUPLICATAS")
+    print("RESULTADOS")
     print("=" * 60)
     
-    for grupo in relatorio[:10]:
-        print(f"\nGRUPO {grupo['grupo']} ({grupo['tipo_duplicata']}):")
-        for p in grupo['pacientes']:
-            print(f"  - {p['id_paciente']}: {p['nome']}")
-            print(f"    CPF: {p['cpf'] or 'N/A'} | Nasc: {p['data_nascimento'] or 'N/A'}")
+    for resumo in resumos:
+        print()
+        print(f"Tenant {resumo['tenant_id']}: {resumo['pacientes']} pacientes ativos")
+        print(f"  Duplicatas por Nome + CPF: {resumo['grupos_cpf']} grupos")
+        print(f"  Duplicatas por Nome + Data Nascimento: {resumo['grupos_nascimento']} grupos")
+        print(f"  Total de grupos de duplicatas únicos: {resumo['grupos']}")
+        print(f"  Total de pacientes envolvidos em duplicatas: {resumo['envolvidos']}")
+        print(f"  Relatório JSON salvo em: {resumo['json']}")
+        print(f"  Relatório TXT salvo em: {resumo['txt']}")
     
-    cursor.close()
-    conn.close()
+    total_grupos = sum(r['grupos'] for r in resumos)
+    total_envolvidos = sum(r['envolvidos'] for r in resumos)
     
-    return len(grupos_duplicatas), len(pacientes_duplicados)
+    if len(resumos) > 1:
+        print()
+        print(f"Total geral: {total_grupos} grupos, {total_envolvidos} pacientes envolvidos")
+    
+    # Exibir primeiros grupos como amostra
+    if len(resumos) == 1:
+        print()
+        print("=" * 60)
+        print("AMOSTRA DOS PRIMEIROS 10 GRUPOS DE DUPLICATAS")
+        print("=" * 60)
+        
+        for grupo in resumos[0]['amostra']:
+            print(f"\nGRUPO {grupo['grupo']} ({grupo['tipo_duplicata']}):")
+            for p in grupo['pacientes']:
+                print(f"  - {p['id_paciente']}: {p['nome']}")
+                print(f"    CPF: {p['cpf'] or 'N/A'} | Nasc: {p['data_nascimento'] or 'N/A'}")
+    
+    if profiler:
+        print()
+        profiler.stop()
+    
+    return total_grupos, total_envolvidos
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Identifica pacientes duplicados')
+    parser.add_argument('--tenant', type=int, help='Analisa apenas este tenant_id')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Número de processos paralelos (default: 1)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Perfila as etapas (cProfile + tracemalloc) e grava ao lado dos relatórios')
+    parser.add_argument('--profile-stacks', action='store_true',
+                        help='Como --profile, gravando também as pilhas amostradas (.collapsed)')
+    args = parser.parse_args()
+    
+    main(tenant=args.tenant, workers=max(1, args.workers),
+         profile=args.profile, profile_stacks=args.profile_stacks)
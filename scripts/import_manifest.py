@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Manifesto de importação para cargas incrementais (--delta)
+
+Cada reimportação semanal da planilha reprocessava e regravava todas as
+linhas. Com --delta, os scripts de migração guardam, para cada origem
+(script + arquivo + tenant), um manifesto chave natural -> hash do conteúdo
+da última versão importada de cada linha:
+
+  data/import_manifests/<script>_<arquivo>_t<tenant>.json
+  (diretório alterável por GORGEN_MANIFEST_DIR)
+
+Na execução seguinte, as linhas lidas (já transformadas, como seriam
+gravadas) são comparadas com o manifesto e separadas em novas, alteradas,
+removidas (estão no manifesto e sumiram do arquivo) e inalteradas. O conjunto
+de mudanças é impresso antes de ser aplicado, e só as novas, alteradas e
+removidas vão ao banco: o custo passa a acompanhar o que mudou, não o tamanho
+do arquivo. O manifesto só é regravado depois da aplicação, sem as linhas
+recusadas pelo banco (que voltam a ser tentadas na próxima carga).
+
+O hash (blake2b de 64 bits) é do conteúdo transformado: uma mudança nas
+regras de transformação também aparece como alteração.
+
+Uso:
+    manifesto = ImportManifest.load(manifest_path('migrate_patients', arquivo, tenant_id))
+    mudancas = diff(manifesto.hashes, atuais)
+    mudancas.print_summary()
+    ...
+    manifesto.save(novos_hashes, arquivo=arquivo)
+"""
+
+import os
+import json
+import hashlib
+from datetime import datetime
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+MANIFEST_ENV = 'GORGEN_MANIFEST_DIR'
+MANIFEST_DIR = os.path.join(REPO_DIR, 'data', 'import_manifests')
+VERSION = 1
+# Remoções acima desta fração do manifesto indicam arquivo errado ou truncado
+MAX_DELETE_FRACTION = 0.2
+_SEPARATOR = '\x1f'
+
+
+def manifest_dir():
+    return os.environ.get(MANIFEST_ENV) or MANIFEST_DIR
+
+
+def manifest_path(script, arquivo, tenant_id):
+    nome = os.path.splitext(os.path.basename(arquivo))[0]
+    return os.path.join(manifest_dir(), f"{script}_{nome}_t{tenant_id}.json")
+
+
+def content_hash(values):
+    """Hash do conteúdo de uma linha (sequência de valores já transformados)."""
+    texto = _SEPARATOR.join('' if v is None else str(v) for v in values)
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class ImportManifest:
+    """Chave natural -> hash da última versão importada de cada linha de uma origem."""
+
+    def __init__(self, path, hashes=None, existe=False, atualizado_em=None):
+        self.path = path
+        self.hashes = hashes or {}
+        self.existe = existe
+        self.atualizado_em = atualizado_em
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            return cls(path)
+        with open(path, encoding='utf-8') as f:
+            dados = json.load(f)
+        if dados.get('versao') != VERSION:
+            # Hash de outra versão: tudo aparece como alterado e é regravado uma vez
+            return cls(path, existe=True, atualizado_em=dados.get('atualizado_em'))
+        return cls(path, dados.get('linhas', {}), existe=True, atualizado_em=dados.get('atualizado_em'))
+
+    def save(self, hashes, arquivo=None):
+        self.hashes = hashes
+        self.atualizado_em = datetime.now().isoformat(timespec='seconds')
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'versao': VERSION,
+                'arquivo': arquivo,
+                'atualizado_em': self.atualizado_em,
+                'total': len(hashes),
+                'linhas': hashes,
+            }, f, ensure_ascii=False)
+        # Troca atômica: uma carga interrompida não deixa manifesto pela metade
+        os.replace(tmp, self.path)
+        self.existe = True
+
+
+class ChangeSet:
+    """Linhas novas, alteradas, removidas e inalteradas em relação ao manifesto."""
+
+    def __init__(self, novos, alterados, removidos, inalterados):
+        self.novos = novos
+        self.alterados = alterados
+        self.removidos = removidos
+        self.inalterados = inalterados
+
+    @property
+    def total(self):
+        return len(self.novos) + len(self.alterados) + len(self.removidos)
+
+    def as_dict(self, n=50):
+        return {
+            'novos': len(self.novos),
+            'alterados': len(self.alterados),
+            'removidos': len(self.removidos),
+            'inalterados': self.inalterados,
+            'exemplos': {
+                'novos': self.novos[:n],
+                'alterados': self.alterados[:n],
+                'removidos': self.removidos[:n],
+            },
+        }
+
+    def print_summary(self, n=10):
+        print('🧮 MUDANÇAS EM RELAÇÃO À ÚLTIMA IMPORTAÇÃO')
+        print(f"   Novos: {len(self.novos):,} | Alterados: {len(self.alterados):,} | "
+              f"Removidos: {len(self.removidos):,} | Inalterados: {self.inalterados:,}")
+        for nome, chaves in (('Novos', self.novos), ('Alterados', self.alterados), ('Removidos', self.removidos)):
+            if not chaves:
+                continue
+            exemplos = ', '.join(str(c) for c in chaves[:n])
+            resto = f" ... e mais {len(chaves) - n:,}" if len(chaves) > n else ''
+            print(f"   {nome}: {exemplos}{resto}")
+        print()
+
+
+def diff(anteriores, atuais, existentes=None, com_remocoes=True):
+    """Compara os hashes atuais (chave -> hash, na ordem do arquivo) com o manifesto.
+
+    existentes: chaves já presentes no banco, usadas quando não há manifesto
+    (primeira carga com --delta): as que existem entram como alteradas
+    (atualização), não como novas. com_remocoes=False (ex.: --limit) não
+    considera remoções.
+    """
+    novos, alterados = [], []
+    inalterados = 0
+    for chave, valor in atuais.items():
+        anterior = anteriores.get(chave)
+        if anterior is None:
+            if existentes is not None and chave in existentes:
+                alterados.append(chave)
+            else:
+                novos.append(chave)
+        elif anterior != valor:
+            alterados.append(chave)
+        else:
+            inalterados += 1
+    removidos = [chave for chave in anteriores if chave not in atuais] if com_remocoes else []
+    return ChangeSet(novos, alterados, removidos, inalterados)
+
+
+def check_deletions(mudancas, anteriores, forcar=False):
+    """Mensagem de erro se as remoções passam de MAX_DELETE_FRACTION do manifesto (None se ok)."""
+    if forcar or not anteriores or not mudancas.removidos:
+        return None
+    fracao = len(mudancas.removidos) / len(anteriores)
+    if fracao <= MAX_DELETE_FRACTION:
+        return None
+    return (f"{len(mudancas.removidos):,} remoções ({fracao:.0%} do manifesto, limite "
+            f"{MAX_DELETE_FRACTION:.0%}): arquivo errado ou incompleto? Use --forcar-remocoes para aplicar")
+
+
+def next_hashes(anteriores, atuais, falhas=(), parcial=False):
+    """Manifesto depois da aplicação: os hashes atuais (sem as removidas) e,
+    para as chaves que falharam, a versão anterior (ou nada, se eram novas).
+
+    parcial (ex.: --limit): o arquivo não foi lido inteiro, as chaves não
+    lidas mantêm o hash anterior.
+    """
+    hashes = dict(anteriores) if parcial else {}
+    hashes.update(atuais)
+    for chave in falhas:
+        if chave in anteriores:
+            hashes[chave] = anteriores[chave]
+        else:
+            hashes.pop(chave, None)
+    return hashes
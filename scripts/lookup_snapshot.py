@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Snapshot local das chaves de busca de um tenant (dry-run offline)
+
+O --dry-run de migrate_atendimentos.py não grava, mas ainda faz até seis
+consultas por linha no banco de produção (busca do paciente pelo nome e
+verificação de duplicado). Este comando exporta uma vez, para um arquivo
+SQLite (sqlite_standin.py), só o que essas consultas leem:
+
+  pacientes     id, id_paciente, codigo_legado, nome, nome_normalizado,
+                nome_fonetico, deleted_at (excluídos logicamente também: a
+                busca os ignora, mas o --delta de pacientes os conta como
+                existentes)
+  atendimentos  id, atendimento, paciente_id, deleted_at (a verificação de
+                duplicado não olha deleted_at)
+  sequencias    último atendimento de cada ano (AAAA + sequencial), o início
+                da numeração de novos atendimentos
+
+e os metadados (tenant, data de geração, contagens) em snapshot_meta. Com
+--snapshot, os dry-runs rodam inteiros sobre o arquivo, com as mesmas
+consultas, e chegam às mesmas estatísticas (encontrados, não encontrados,
+duplicados) sem tocar o cluster de produção. Quando há mais de um paciente
+candidato, o escolhido por LIMIT 1 pode ser outro (a ordem não é garantida
+nem no MySQL), mas o resultado da busca é o mesmo.
+
+O snapshot reflete o banco no momento da exportação: gere outro antes de
+simular uma carga que depende de dados recentes.
+
+Uso:
+    python3 scripts/lookup_snapshot.py [--tenant 1] [--saida ARQUIVO]
+    python3 scripts/migrate_atendimentos.py --dry-run --snapshot ARQUIVO
+    python3 scripts/migrate_patients.py --dry-run --delta --snapshot=ARQUIVO
+
+Opções:
+    --tenant N   Tenant exportado (default: GORGEN_TENANT_ID ou 1)
+    --saida      Arquivo SQLite (default: data/snapshots/lookup_tenant<N>.sqlite)
+    --lote N     Linhas por leitura no banco (default: 10000)
+"""
+
+import os
+import json
+import argparse
+from datetime import datetime
+
+from db import connect, get_db_config, describe, default_tenant
+import sqlite_standin
+
+SNAPSHOT_DIR = '/home/ubuntu/consultorio_poc/data/snapshots'
+FETCH_ROWS = 10000
+VERSION = 1
+
+# Colunas exportadas (as lidas por find_paciente_by_name, pela verificação de
+# duplicado e por existing_ids)
+TABLES = {
+    'pacientes': ['id', 'tenant_id', 'id_paciente', 'codigo_legado', 'nome', 'nome_normalizado',
+                  'nome_fonetico', 'deleted_at'],
+    'atendimentos': ['id', 'tenant_id', 'atendimento', 'paciente_id', 'deleted_at'],
+}
+
+META_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshot_meta (chave TEXT PRIMARY KEY, valor TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS sequencias (ano TEXT PRIMARY KEY, ultimo TEXT NOT NULL);
+"""
+
+
+def default_path(tenant_id):
+    return os.path.join(SNAPSHOT_DIR, f"lookup_tenant{tenant_id}.sqlite")
+
+
+def copy_table(origem, destino, tabela, tenant_id, lote=FETCH_ROWS):
+    """Copia as colunas de TABLES[tabela] do tenant em blocos de lote linhas. Retorna o total."""
+    colunas = TABLES[tabela]
+    lista = ', '.join(colunas)
+    insert = f"INSERT INTO {tabela} ({lista}) VALUES ({', '.join(['%s'] * len(colunas))})"
+    leitura = origem.cursor()
+    escrita = destino.cursor()
+    total = 0
+    try:
+        leitura.execute(f"SELECT {lista} FROM {tabela} WHERE tenant_id = %s ORDER BY id", (tenant_id,))
+        while True:
+            linhas = leitura.fetchmany(lote)
+            if not linhas:
+                break
+            escrita.executemany(insert, linhas)
+            total += len(linhas)
+            print(f"\r   {tabela}: {total:,}", end='')
+    finally:
+        leitura.close()
+        escrita.close()
+    print(f"\r   {tabela}: {total:,}")
+    return total
+
+
+def sequence_heads(conn, tenant_id):
+    """Último atendimento de cada ano (prefixo AAAA) do tenant: {ano: atendimento}."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+            SELECT SUBSTR(atendimento, 1, 4) AS ano, MAX(atendimento)
+            FROM atendimentos
+            WHERE tenant_id = %s
+            GROUP BY SUBSTR(atendimento, 1, 4)
+            ORDER BY ano
+        """, (tenant_id,))
+        return {str(ano): str(ultimo) for ano, ultimo in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+def _remove_sqlite(path):
+    """Remove um arquivo SQLite e os arquivos -wal/-shm ao lado."""
+    for sufixo in ('', '-wal', '-shm'):
+        if os.path.exists(path + sufixo):
+            os.remove(path + sufixo)
+
+
+def export_snapshot(conn, path, tenant_id, lote=FETCH_ROWS):
+    """Exporta as chaves de busca do tenant para path (troca atômica). Retorna os metadados."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = path + '.tmp'
+    _remove_sqlite(tmp)
+    destino = sqlite_standin.connect(tmp)
+    try:
+        destino._db.executescript(META_SCHEMA)
+        contagens = {tabela: copy_table(conn, destino, tabela, tenant_id, lote) for tabela in TABLES}
+        sequencias = sequence_heads(conn, tenant_id)
+        cursor = destino.cursor()
+        cursor.executemany("INSERT INTO sequencias (ano, ultimo) VALUES (%s, %s)", sequencias.items())
+        meta = {
+            'versao': VERSION,
+            'tenant_id': tenant_id,
+            'gerado_em': datetime.now().isoformat(timespec='seconds'),
+            'contagens': contagens,
+            'sequencias': sequencias,
+        }
+        cursor.executemany("INSERT INTO snapshot_meta (chave, valor) VALUES (%s, %s)",
+                           [(chave, json.dumps(valor)) for chave, valor in meta.items()])
+        cursor.close()
+        destino.commit()
+        # Arquivo único, sem o -wal ao lado
+        destino._db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        destino._db.execute('PRAGMA journal_mode = DELETE')
+    except BaseException:
+        destino.close()
+        _remove_sqlite(tmp)
+        raise
+    destino.close()
+    os.replace(tmp, path)
+    return meta
+
+
+def read_meta(conn):
+    """Metadados de um snapshot aberto (ValueError se o arquivo não é um snapshot)."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT chave, valor FROM snapshot_meta")
+        return {chave: json.loads(valor) for chave, valor in cursor.fetchall()}
+    except Exception:
+        raise ValueError("o arquivo não é um snapshot de chaves (gere com lookup_snapshot.py)")
+    finally:
+        cursor.close()
+
+
+def open_snapshot(path, tenant_id):
+    """Abre o snapshot (conexão com a API do mysql.connector) conferindo o tenant.
+
+    Retorna (conexão, metadados).
+    """
+    if not os.path.exists(path):
+        raise ValueError(f"snapshot não encontrado: {path}")
+    conn = sqlite_standin.connect(path, schema=False)
+    try:
+        meta = read_meta(conn)
+        if meta.get('tenant_id') != tenant_id:
+            raise ValueError(f"o snapshot {path} é do tenant {meta.get('tenant_id')}, não do {tenant_id}")
+    except ValueError:
+        conn.close()
+        raise
+    return conn, meta
+
+
+def describe_snapshot(path, meta):
+    """Resumo de uma linha: arquivo, tenant, idade e contagens."""
+    gerado_em = datetime.fromisoformat(meta['gerado_em'])
+    horas = (datetime.now() - gerado_em).total_seconds() / 3600
+    idade = f"{horas:.1f} h" if horas < 48 else f"{horas / 24:.0f} dias"
+    contagens = ', '.join(f"{n:,} {tabela}" for tabela, n in meta['contagens'].items())
+    return f"{path} (tenant {meta['tenant_id']}, gerado em {meta['gerado_em']}, há {idade}; {contagens})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Snapshot local das chaves de busca para dry-runs offline')
+    parser.add_argument('--tenant', type=int, default=default_tenant(),
+                        help='Tenant exportado (default: o das migrações)')
+    parser.add_argument('--saida', type=str, help='Arquivo SQLite (default: data/snapshots/lookup_tenant<N>.sqlite)')
+    parser.add_argument('--lote', type=int, default=FETCH_ROWS, help=f'Linhas por leitura (default: {FETCH_ROWS})')
+    args = parser.parse_args()
+    path = args.saida or default_path(args.tenant)
+
+    print('=' * 60)
+    print(f"📸 GORGEN - Snapshot das chaves de busca (tenant {args.tenant})")
+    print('=' * 60)
+    print(f"🔌 Conectando ao banco de dados: {describe(get_db_config())}")
+    conn = connect()
+    inicio = datetime.now()
+    try:
+        meta = export_snapshot(conn, path, args.tenant, max(1, args.lote))
+    finally:
+        conn.close()
+
+    for ano, ultimo in meta['sequencias'].items():
+        print(f"   Sequência {ano}: último {ultimo}")
+    print()
+    print(f"✅ Snapshot salvo em {path} ({(datetime.now() - inicio).total_seconds():.1f}s, "
+          f"{os.path.getsize(path) / 1024 / 1024:.1f} MB)")
+    print(f"   Dry-run offline: migrate_atendimentos.py --dry-run --snapshot {path}")
+
+
+if __name__ == '__main__':
+    main()
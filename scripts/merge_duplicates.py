@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Executor de mesclagem de pacientes duplicados.
+
+Recebe os grupos revisados gerados por find_duplicates.py
+(duplicatas_pacientes_tenant_<id>.json), escolhe um sobrevivente por grupo e,
+para cada lote de grupos, em uma única transação:
+  1. Reaponta os registros filhos para o sobrevivente com UPDATEs em conjunto
+     (UPDATE ... SET paciente_id = CASE ... WHERE paciente_id IN (...))
+  2. Faz soft-delete dos pacientes removidos
+  3. Registra a mesclagem em um log compacto (JSONL)
+
+Revisão: o arquivo deve conter apenas os grupos confirmados. Grupos marcados
+com "confirmado": false são ignorados, e um grupo pode fixar o sobrevivente
+com "sobrevivente": <id>.
+
+Grupos confirmados que compartilham pacientes (ex.: um grupo por CPF e outro
+por data de nascimento com um paciente em comum) são unidos em um só antes da
+escolha do sobrevivente: cada conjunto ligado tem um único sobrevivente, e
+nenhum registro é movido para um paciente que também está sendo removido.
+Sobreviventes fixados diferentes no mesmo conjunto são um erro.
+
+Os registros de todas as tabelas com paciente_id (CHILD_TABLES) vão para o
+sobrevivente. Grupos em que mais de um paciente tem resumo clínico (uma linha
+por paciente) não são mesclados: os resumos precisam ser unidos à mão antes.
+Se o banco tiver uma tabela com paciente_id fora de CHILD_TABLES, os grupos
+com registros nela também são recusados, para nada ficar apontando para um
+paciente removido.
+
+Uso:
+    python3 scripts/merge_duplicates.py ARQUIVO.json [--sobrevivente=REGRA] [--batch=N] [--dry-run]
+
+Opções:
+    --sobrevivente=REGRA  mais_antigo (default), mais_recente, mais_completo, menor_id
+    --batch=N             Grupos por transação (default: 200)
+    --usuario=ID          Preenche deleted_by nos pacientes removidos
+    --log=ARQUIVO         Log de mesclagem (default: data/merge_log.jsonl)
+    --dry-run             Executa as atualizações e faz rollback (mostra as contagens)
+"""
+
+import sys
+import json
+import argparse
+from datetime import datetime
+
+from mysql.connector import Error
+
+from db import connect
+
+DEFAULT_LOG = '/home/ubuntu/consultorio_poc/data/merge_log.jsonl'
+
+# Tabelas cujos registros pertencem a um paciente (todas as colunas paciente_id
+# de drizzle/schema.ts) e a coluna de tenant de cada uma. As autorizações e os
+# logs cross-tenant não têm tenant_id: o paciente é do tenant de origem.
+CHILD_TABLES = {
+    'atendimentos': 'tenant_id',
+    'evolucoes': 'tenant_id',
+    'agendamentos': 'tenant_id',
+    'resultados_laboratoriais': 'tenant_id',
+    'documentos_medicos': 'tenant_id',
+    'documentos_externos': 'tenant_id',
+    'resumo_clinico': 'tenant_id',
+    'problemas_ativos': 'tenant_id',
+    'alergias': 'tenant_id',
+    'medicamentos_uso': 'tenant_id',
+    'internacoes': 'tenant_id',
+    'cirurgias': 'tenant_id',
+    'exames_laboratoriais': 'tenant_id',
+    'exames_imagem': 'tenant_id',
+    'endoscopias': 'tenant_id',
+    'cardiologia': 'tenant_id',
+    'terapias': 'tenant_id',
+    'obstetricia': 'tenant_id',
+    'historico_medidas': 'tenant_id',
+    'patologias': 'tenant_id',
+    'endereco_historico': 'tenant_id',
+    'prontuario_acessos': 'tenant_id',
+    'paciente_autorizacoes': 'tenant_origem_id',
+    'cross_tenant_access_logs': 'tenant_origem_id',
+}
+
+# Tabelas com no máximo uma linha por paciente (UNIQUE paciente_id): só há o
+# que mover se, no grupo, no máximo um paciente tem a linha
+SINGLE_ROW_TABLES = ('resumo_clinico',)
+
+# Campos considerados pela regra "mais_completo"
+COMPLETENESS_FIELDS = ('cpf', 'data_nascimento', 'email', 'telefone', 'convenio')
+
+
+def choose_survivor(grupo, regra):
+    """Escolhe o id do paciente sobrevivente de um grupo."""
+    if grupo.get('sobrevivente'):
+        return int(grupo['sobrevivente'])
+
+    pacientes = grupo['pacientes']
+
+    if regra == 'menor_id':
+        return min(p['id'] for p in pacientes)
+    if regra == 'mais_recente':
+        return max(pacientes, key=lambda p: (p['created_at'], p['id']))['id']
+    if regra == 'mais_completo':
+        return max(
+            pacientes,
+            key=lambda p: (sum(1 for c in COMPLETENESS_FIELDS if p.get(c)), -p['id'])
+        )['id']
+
+    # mais_antigo
+    return min(pacientes, key=lambda p: (p['created_at'] or '9999', p['id']))['id']
+
+
+def union_groups(grupos):
+    """Une (union-find) os grupos de um tenant que compartilham pacientes.
+
+    Retorna um grupo por conjunto ligado, com os pacientes de todos (sem
+    repetição) e o sobrevivente fixado, se houver. ValueError se o conjunto
+    tem sobreviventes fixados diferentes.
+    """
+    pai = {}
+
+    def raiz(i):
+        while pai[i] != i:
+            pai[i] = pai[pai[i]]
+            i = pai[i]
+        return i
+
+    for grupo in grupos:
+        ids = [p['id'] for p in grupo['pacientes']]
+        for i in ids:
+            pai.setdefault(i, i)
+        for i in ids[1:]:
+            pai[raiz(i)] = raiz(ids[0])
+
+    unidos = {}
+    for grupo in grupos:
+        r = raiz(grupo['pacientes'][0]['id'])
+        unido = unidos.setdefault(r, {'tenant_id': grupo['tenant_id'], 'pacientes': {}, 'fixados': set()})
+        for p in grupo['pacientes']:
+            unido['pacientes'].setdefault(p['id'], p)
+        if grupo.get('sobrevivente'):
+            unido['fixados'].add(int(grupo['sobrevivente']))
+
+    resultado = []
+    for unido in unidos.values():
+        ids = sorted(unido['pacientes'])
+        if len(unido['fixados']) > 1:
+            raise ValueError(
+                f"tenant {unido['tenant_id']}: grupos com pacientes em comum ({', '.join(map(str, ids))}) "
+                f"fixam sobreviventes diferentes ({', '.join(map(str, sorted(unido['fixados'])))}); "
+                f"revise o arquivo"
+            )
+        resultado.append({
+            'tenant_id': unido['tenant_id'],
+            'pacientes': [unido['pacientes'][i] for i in ids],
+            'sobrevivente': next(iter(unido['fixados']), None),
+        })
+    return resultado
+
+
+def load_groups(path, regra):
+    """Lê os grupos revisados e devolve [(tenant_id, sobrevivente, [removidos])].
+
+    Grupos do mesmo tenant com pacientes em comum viram uma só mesclagem (union_groups).
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        grupos = json.load(f)
+
+    por_tenant = {}
+    for grupo in grupos:
+        if grupo.get('confirmado') is False:
+            continue
+        por_tenant.setdefault(grupo['tenant_id'], []).append(grupo)
+
+    merges = []
+    for tenant_grupos in por_tenant.values():
+        for grupo in union_groups(tenant_grupos):
+            ids = [p['id'] for p in grupo['pacientes']]
+            if len(ids) < 2:
+                continue
+
+            sobrevivente = choose_survivor(grupo, regra)
+            if sobrevivente not in ids:
+                raise ValueError(f"tenant {grupo['tenant_id']}: sobrevivente {sobrevivente} não está no grupo "
+                                 f"({', '.join(map(str, ids))})")
+            removidos = [i for i in ids if i != sobrevivente]
+            merges.append((grupo['tenant_id'], sobrevivente, removidos))
+
+    return merges
+
+
+def active_ids(cursor, tenant_id, ids):
+    """Retorna o subconjunto de ids ainda ativos no tenant."""
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(
+        f"SELECT id FROM pacientes WHERE tenant_id = %s AND deleted_at IS NULL AND id IN ({placeholders})",
+        [tenant_id] + list(ids)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def uncovered_tables(cursor):
+    """Tabelas do banco com coluna paciente_id que a mesclagem não reaponta."""
+    cursor.execute("""
+        SELECT table_name FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND column_name = 'paciente_id'
+    """)
+    return sorted({row[0] for row in cursor.fetchall()} - set(CHILD_TABLES))
+
+
+def rows_per_patient(cursor, table, tenant_id, ids, tenant_column='tenant_id'):
+    """Retorna {paciente_id: linhas} da tabela para os ids do tenant."""
+    placeholders = ', '.join(['%s'] * len(ids))
+    cursor.execute(
+        f"SELECT paciente_id, COUNT(*) FROM {table} "
+        f"WHERE {tenant_column} = %s AND paciente_id IN ({placeholders}) GROUP BY paciente_id",
+        [tenant_id] + list(ids)
+    )
+    return {row[0]: row[1] for row in cursor.fetchall()}
+
+
+def merge_batch(cursor, tenant_id, merges, usuario=None, nao_cobertas=()):
+    """Aplica um lote de mesclagens de um tenant (sem commit).
+
+    nao_cobertas: tabelas com paciente_id fora de CHILD_TABLES (uncovered_tables);
+    grupos com registros nelas são recusados.
+
+    Retorna (mesclagens aplicadas, linhas movidas por tabela,
+    [(sobrevivente, removidos, motivo)] recusados).
+    """
+    todos_ids = set()
+    for sobrevivente, removidos in merges:
+        todos_ids.add(sobrevivente)
+        todos_ids.update(removidos)
+
+    # Ignora grupos com pacientes já removidos ou de outro tenant
+    ativos = active_ids(cursor, tenant_id, todos_ids)
+    merges = [
+        (sobrevivente, removidos) for sobrevivente, removidos in merges
+        if sobrevivente in ativos and all(r in ativos for r in removidos)
+    ]
+    if not merges:
+        return [], {}, []
+
+    # Recusa os grupos que deixariam registros para trás
+    recusados = []
+    for table in SINGLE_ROW_TABLES:
+        com_linha = rows_per_patient(cursor, table, tenant_id, todos_ids, CHILD_TABLES[table])
+        for sobrevivente, removidos in merges:
+            donos = [i for i in [sobrevivente] + removidos if i in com_linha]
+            if len(donos) > 1:
+                recusados.append((sobrevivente, removidos,
+                                  f"{table} em mais de um paciente ({', '.join(map(str, donos))})"))
+    for table in nao_cobertas:
+        com_linha = rows_per_patient(cursor, table, tenant_id, todos_ids)
+        for sobrevivente, removidos in merges:
+            donos = [i for i in removidos if i in com_linha]
+            if donos:
+                recusados.append((sobrevivente, removidos,
+                                  f"{table} (fora de CHILD_TABLES) com registros de {', '.join(map(str, donos))}"))
+    if recusados:
+        fora = {sobrevivente for sobrevivente, _, _ in recusados}
+        merges = [(sobrevivente, removidos) for sobrevivente, removidos in merges if sobrevivente not in fora]
+        if not merges:
+            return [], {}, recusados
+
+    destino = {}
+    for sobrevivente, removidos in merges:
+        for removido in removidos:
+            destino[removido] = sobrevivente
+    # Registros nunca vão para um paciente que também está sendo removido
+    # (load_groups une os grupos com pacientes em comum)
+    conflitos = sorted(set(destino.values()) & set(destino))
+    if conflitos:
+        raise ValueError(f"sobreviventes também marcados para remoção: {', '.join(map(str, conflitos))}")
+
+    in_clause = ', '.join(['%s'] * len(destino))
+    case_clause = ' '.join(['WHEN %s THEN %s'] * len(destino))
+    case_params = [v for par in destino.items() for v in par]
+
+    movidos = {}
+    for table, tenant_column in CHILD_TABLES.items():
+        cursor.execute(
+            f"UPDATE {table} SET paciente_id = CASE paciente_id {case_clause} END "
+            f"WHERE {tenant_column} = %s AND paciente_id IN ({in_clause})",
+            case_params + [tenant_id] + list(destino)
+        )
+        movidos[table] = cursor.rowcount
+
+    cursor.execute(
+        f"UPDATE pacientes SET deleted_at = NOW(), deleted_by = %s "
+        f"WHERE tenant_id = %s AND deleted_at IS NULL AND id IN ({in_clause})",
+        [usuario, tenant_id] + list(destino)
+    )
+    movidos['pacientes_removidos'] = cursor.rowcount
+
+    return merges, movidos, recusados
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Mescla grupos de pacientes duplicados confirmados')
+    parser.add_argument('arquivo', help='JSON de grupos revisados (saída de find_duplicates.py)')
+    parser.add_argument('--sobrevivente', default='mais_antigo',
+                        choices=['mais_antigo', 'mais_recente', 'mais_completo', 'menor_id'],
+                        help='Regra de escolha do sobrevivente')
+    parser.add_argument('--batch', type=int, default=200, help='Grupos por transação')
+    parser.add_argument('--usuario', type=int, help='Preenche deleted_by nos pacientes removidos')
+    parser.add_argument('--log', type=str, default=DEFAULT_LOG, help='Arquivo de log (JSONL)')
+    parser.add_argument('--dry-run', action='store_true', help='Faz rollback ao final de cada lote')
+    args = parser.parse_args()
+
+    print('=' * 60)
+    print('MESCLAGEM DE PACIENTES DUPLICADOS')
+    print('=' * 60)
+    print(f"Arquivo: {args.arquivo}")
+    print(f"Regra do sobrevivente: {args.sobrevivente}")
+    print(f"Modo: {'SIMULAÇÃO (dry-run)' if args.dry_run else 'PRODUÇÃO'}")
+    print()
+
+    try:
+        merges = load_groups(args.arquivo, args.sobrevivente)
+    except ValueError as e:
+        print(f"❌ Erro: {e}")
+        return 1
+    print(f"Grupos confirmados: {len(merges)}")
+
+    # Lotes por tenant (cada lote é uma transação)
+    por_tenant = {}
+    for tenant_id, sobrevivente, removidos in merges:
+        por_tenant.setdefault(tenant_id, []).append((sobrevivente, removidos))
+
+    conn = connect()
+    cursor = conn.cursor()
+
+    nao_cobertas = uncovered_tables(cursor)
+    if nao_cobertas:
+        print(f"⚠️  Tabelas com paciente_id fora da mesclagem: {', '.join(nao_cobertas)}")
+        print("   Grupos com registros nelas serão recusados (inclua-as em CHILD_TABLES)")
+
+    totais = {table: 0 for table in CHILD_TABLES}
+    totais['pacientes_removidos'] = 0
+    aplicados = 0
+    ignorados = 0
+    recusados = []
+    inicio = datetime.now()
+
+    log = None if args.dry_run else open(args.log, 'a', encoding='utf-8')
+    try:
+        for tenant_id, grupos in por_tenant.items():
+            for i in range(0, len(grupos), args.batch):
+                lote = grupos[i:i + args.batch]
+                try:
+                    feitos, movidos, recusados_lote = merge_batch(cursor, tenant_id, lote, args.usuario,
+                                                                  nao_cobertas)
+                    if args.dry_run:
+                        conn.rollback()
+                    else:
+                        conn.commit()
+                except Error as e:
+                    conn.rollback()
+                    print(f"\n❌ Erro no lote (tenant {tenant_id}, grupos {i + 1}-{i + len(lote)}): {e}")
+                    ignorados += len(lote)
+                    continue
+
+                aplicados += len(feitos)
+                ignorados += len(lote) - len(feitos)
+                recusados.extend((tenant_id,) + r for r in recusados_lote)
+                for table, n in movidos.items():
+                    totais[table] += n
+
+                if log:
+                    timestamp = datetime.now().isoformat()
+                    for sobrevivente, removidos in feitos:
+                        log.write(json.dumps({
+                            't': timestamp,
+                            'tenant_id': tenant_id,
+                            'sobrevivente': sobrevivente,
+                            'removidos': removidos,
+                        }) + '\n')
+                    log.flush()
+
+                print(f"\r   Tenant {tenant_id}: {min(i + args.batch, len(grupos))}/{len(grupos)} grupos", end='')
+            print()
+    finally:
+        if log:
+            log.close()
+        cursor.close()
+        conn.close()
+
+    duracao = (datetime.now() - inicio).total_seconds()
+
+    print()
+    print('=' * 60)
+    print('RESUMO')
+    print('=' * 60)
+    print(f"Grupos mesclados: {aplicados}")
+    print(f"Grupos ignorados: {ignorados}")
+    if recusados:
+        print(f"Grupos recusados (revise antes de mesclar): {len({(t, s) for t, s, _, _ in recusados})}")
+        for tenant_id, sobrevivente, removidos, motivo in recusados:
+            print(f"  tenant {tenant_id}, sobrevivente {sobrevivente} <- {removidos}: {motivo}")
+    for table, n in totais.items():
+        print(f"  {table}: {n}")
+    print(f"Duração: {duracao:.1f} segundos")
+    if not args.dry_run:
+        print(f"Log salvo em: {args.log}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Migração de várias clínicas (tenants) em paralelo
+
+As clínicas entram em ondas; migrar uma de cada vez faz a onda durar a soma
+de todas. Este comando lê um manifesto tenant -> arquivos de origem e roda as
+migrações (migrate_patients.py e depois migrate_atendimentos.py, cada uma em
+um processo próprio, com --tenant) de vários tenants ao mesmo tempo, dentro
+de um orçamento global de conexões ao banco:
+
+  - cada etapa usa de 1 até a cota do tenant em conexões (com mais de uma,
+    roda com --pipeline e uma conexão por escritor); a cota é o orçamento
+    dividido pelos tenants que ainda têm etapas, de modo que uma clínica
+    grande nunca ocupa as conexões das pequenas
+  - quando uma conexão fica livre, a vez é do tenant que menos usou o banco
+    até ali (conexões x segundos); entre os que ainda não começaram, o maior
+    primeiro, já que é ele que define a duração da onda
+  - os atendimentos de um tenant só rodam depois dos pacientes dele, e não
+    rodam se os pacientes falharam
+
+Com orçamento para todos os tenants, a onda dura mais ou menos o tempo do
+maior deles.
+
+Manifesto (JSON; caminhos relativos ao próprio manifesto):
+    {"tenants": [
+        {"tenant_id": 1, "nome": "Dr. André Gorgen",
+         "pacientes": "22kpacientes.xlsx", "atendimentos": "atendimentos2025-2026.xlsx"},
+        {"tenant_id": 7, "nome": "Clínica Nova", "pacientes": "nova/pacientes.csv"}
+    ]}
+
+Cada tenant ganha uma pasta em --saida com a saída de cada etapa (.log), os
+relatórios JSON das migrações, a quarentena e tenant_<id>.json; o relatório
+agregado (relatorio_tenants.json) soma as estatísticas e compara a duração da
+onda com a soma das etapas.
+
+Uso:
+    python3 scripts/migrate_tenants.py onda.json [--conexoes 8] [--dry-run] [--delta] [--saida PASTA]
+
+Opções:
+    --conexoes N  Orçamento global de conexões ao banco (default: 8)
+    --dry-run     Simula todas as migrações (repassado às etapas)
+    --delta       Importação incremental (repassado às etapas; uma conexão por etapa)
+    --tenants     Só estes tenant_id do manifesto (ex.: 3,7)
+    --saida       Pasta dos relatórios (default: data/migracoes_tenants/<data_hora>)
+
+Sai com código 1 se alguma etapa falhou.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from datetime import datetime
+
+from db import TENANT_ENV
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+OUTPUT_DIR = '/home/ubuntu/consultorio_poc/data/migracoes_tenants'
+CONNECTIONS = 8
+POLL_SECONDS = 0.2
+
+# Etapas de cada tenant, na ordem (atendimentos buscam os pacientes já migrados)
+ETAPAS = [
+    ('pacientes', 'migrate_patients.py'),
+    ('atendimentos', 'migrate_atendimentos.py'),
+]
+
+
+# ============================================
+# MANIFESTO
+# ============================================
+
+def load_manifest(path):
+    """Lê e valida o manifesto. Retorna a lista de tenants (dicionários)."""
+    with open(path, 'r', encoding='utf-8') as f:
+        manifesto = json.load(f)
+    tenants = manifesto['tenants'] if isinstance(manifesto, dict) else manifesto
+    base = os.path.dirname(os.path.abspath(path))
+
+    vistos = set()
+    for entrada in tenants:
+        tenant_id = entrada.get('tenant_id')
+        if not isinstance(tenant_id, int) or isinstance(tenant_id, bool):
+            raise ValueError(f"tenant_id inválido no manifesto: {tenant_id!r}")
+        if tenant_id in vistos:
+            raise ValueError(f"tenant {tenant_id} aparece mais de uma vez no manifesto")
+        vistos.add(tenant_id)
+        if not any(entrada.get(tabela) for tabela, _ in ETAPAS):
+            raise ValueError(f"tenant {tenant_id}: nenhum arquivo de origem ({', '.join(t for t, _ in ETAPAS)})")
+        for tabela, _ in ETAPAS:
+            if entrada.get(tabela):
+                entrada[tabela] = os.path.normpath(os.path.join(base, entrada[tabela]))
+                if not os.path.exists(entrada[tabela]):
+                    raise ValueError(f"tenant {tenant_id}: arquivo não encontrado: {entrada[tabela]}")
+    return tenants
+
+
+# ============================================
+# TENANTS E ETAPAS
+# ============================================
+
+class Tenant:
+    """Um tenant do manifesto: etapas pendentes, uso do banco e resultados."""
+
+    def __init__(self, entrada, pasta):
+        self.id = entrada['tenant_id']
+        self.nome = entrada.get('nome') or f"tenant {self.id}"
+        self.pasta = os.path.join(pasta, f"tenant_{self.id}")
+        self.etapas = [(tabela, script, entrada[tabela]) for tabela, script in ETAPAS if entrada.get(tabela)]
+        self.tamanho = sum(os.path.getsize(arquivo) for _, _, arquivo in self.etapas)
+        self.servico = 0.0  # conexões x segundos já usados
+        self.rodando = False
+        self.resultados = []
+
+    @property
+    def proxima(self):
+        """Próxima etapa a rodar (None se terminou, falhou ou há uma etapa rodando)."""
+        if self.rodando or self.falhou or len(self.resultados) >= len(self.etapas):
+            return None
+        return self.etapas[len(self.resultados)]
+
+    @property
+    def pendente(self):
+        return self.rodando or self.proxima is not None
+
+    @property
+    def falhou(self):
+        return any(r['status'] != 'ok' for r in self.resultados)
+
+    def skip_remaining(self, motivo):
+        for tabela, _, arquivo in self.etapas[len(self.resultados):]:
+            self.resultados.append({'etapa': tabela, 'arquivo': arquivo, 'status': 'pulado', 'motivo': motivo})
+
+    def report(self):
+        duracoes = [r['duracao_s'] for r in self.resultados if 'duracao_s' in r]
+        return {
+            'tenant_id': self.id,
+            'nome': self.nome,
+            'status': 'falhou' if self.falhou else 'ok',
+            'duracao_s': round(sum(duracoes), 2),
+            'conexao_segundos': round(self.servico, 1),
+            'etapas': self.resultados,
+        }
+
+
+def step_command(tenant, tabela, script, arquivo, conexoes, opcoes):
+    """Linha de comando da etapa e o arquivo do relatório JSON que ela grava."""
+    relatorio = os.path.join(tenant.pasta, f"{tabela}.json")
+    quarentena = os.path.join(tenant.pasta, f"{tabela}_rejeitados.csv")
+    pipeline = conexoes > 1
+    cmd = [sys.executable, os.path.join(SCRIPTS_DIR, script)]
+    if script == 'migrate_patients.py':
+        cmd += [f"--file={arquivo}", f"--tenant={tenant.id}", f"--relatorio={relatorio}",
+                f"--rejeitados={quarentena}"]
+        if pipeline:
+            cmd += ['--pipeline', f"--writers={conexoes}"]
+    else:
+        cmd += ['--file', arquivo, '--tenant', str(tenant.id), '--relatorio', relatorio, '--rejeitados', quarentena]
+        if pipeline:
+            cmd += ['--pipeline', '--writers', str(conexoes)]
+    if opcoes.dry_run:
+        cmd.append('--dry-run')
+    if opcoes.delta:
+        cmd.append('--delta')
+    return cmd, relatorio
+
+
+def step_stats(tabela, relatorio):
+    """Estatísticas principais do relatório JSON de uma etapa (None se não foi gravado)."""
+    if not os.path.exists(relatorio):
+        return None
+    with open(relatorio, 'r', encoding='utf-8') as f:
+        dados = json.load(f)
+    if tabela == 'pacientes':
+        stats = {chave: dados.get(chave, 0) for chave in ('total', 'processed', 'inserted', 'skipped')}
+        stats.update(atualizados=dados.get('atualizados', 0), removidos=dados.get('removidos', 0),
+                     rejeitados_banco=len(dados.get('rejeitados', [])))
+    else:
+        stats = dict(dados.get('estatisticas', {}))
+    stats['quarentena'] = (dados.get('quarentena') or {}).get('total', 0)
+    return stats
+
+
+# ============================================
+# ESCALONAMENTO
+# ============================================
+
+def run_tenants(tenants, conexoes, opcoes, log=print):
+    """Roda as etapas de todos os tenants dentro do orçamento de conexões.
+
+    A cada conexão liberada, os tenants com etapa pronta são atendidos em
+    ordem de uso do banco (conexões x segundos), o maior primeiro no empate;
+    cada etapa recebe até a cota do tenant (orçamento / tenants pendentes).
+    """
+    livres = conexoes
+    rodando = {}  # Popen -> (tenant, etapa, conexões, início, arquivo do log, relatório)
+    try:
+        while True:
+            prontos = [t for t in tenants if t.proxima is not None]
+            if not prontos and not rodando:
+                break
+            pendentes = sum(1 for t in tenants if t.pendente)
+            cota = -(-conexoes // pendentes)
+            for tenant in sorted(prontos, key=lambda t: (t.servico, -t.tamanho)):
+                if not livres:
+                    break
+                tabela, script, arquivo = tenant.proxima
+                n = 1 if opcoes.delta else min(cota, livres)
+                cmd, relatorio = step_command(tenant, tabela, script, arquivo, n, opcoes)
+                os.makedirs(tenant.pasta, exist_ok=True)
+                if os.path.exists(relatorio):
+                    # --saida reaproveitada: o relatório de outra execução não vale para esta
+                    os.remove(relatorio)
+                saida = open(os.path.join(tenant.pasta, f"{tabela}.log"), 'w', encoding='utf-8')
+                env = dict(os.environ, **{TENANT_ENV: str(tenant.id), 'PYTHONUNBUFFERED': '1'})
+                processo = subprocess.Popen(cmd, stdout=saida, stderr=subprocess.STDOUT, env=env, cwd=SCRIPTS_DIR)
+                rodando[processo] = (tenant, tabela, n, time.perf_counter(), saida, relatorio, arquivo)
+                tenant.rodando = True
+                livres -= n
+                log(f"▶️  {tenant.nome} ({tenant.id}): {tabela} com {n} conexão(ões) "
+                    f"[livres: {livres}/{conexoes}]")
+
+            time.sleep(POLL_SECONDS)
+            for processo in [p for p in rodando if p.poll() is not None]:
+                tenant, tabela, n, inicio, saida, relatorio, arquivo = rodando.pop(processo)
+                saida.close()
+                duracao = time.perf_counter() - inicio
+                livres += n
+                tenant.rodando = False
+                tenant.servico += n * duracao
+                ok = processo.returncode == 0
+                tenant.resultados.append({
+                    'etapa': tabela,
+                    'arquivo': arquivo,
+                    'status': 'ok' if ok else 'falhou',
+                    'codigo_saida': processo.returncode,
+                    'conexoes': n,
+                    'duracao_s': round(duracao, 2),
+                    'log': saida.name,
+                    'relatorio': relatorio if os.path.exists(relatorio) else None,
+                    'estatisticas': step_stats(tabela, relatorio),
+                })
+                log(f"{'✅' if ok else '❌'} {tenant.nome} ({tenant.id}): {tabela} em {duracao:.1f}s"
+                    f"{'' if ok else f' (código {processo.returncode}, ver {saida.name})'}")
+                if not ok:
+                    tenant.skip_remaining(f"{tabela} falhou")
+    except KeyboardInterrupt:
+        log("\n⏹️  Interrompido: encerrando as etapas em andamento...")
+        for processo, (tenant, tabela, n, inicio, saida, relatorio, arquivo) in rodando.items():
+            processo.terminate()
+            processo.wait()
+            saida.close()
+            tenant.resultados.append({'etapa': tabela, 'arquivo': arquivo, 'status': 'interrompido',
+                                      'duracao_s': round(time.perf_counter() - inicio, 2), 'log': saida.name})
+        for tenant in tenants:
+            tenant.skip_remaining('interrompido')
+        raise
+
+
+# ============================================
+# RELATÓRIOS
+# ============================================
+
+def aggregate_report(tenants, conexoes, duracao, opcoes):
+    """Relatório agregado: totais por etapa, tenants com falha e paralelismo obtido."""
+    totais = {}
+    for tenant in tenants:
+        for r in tenant.resultados:
+            for chave, valor in (r.get('estatisticas') or {}).items():
+                if isinstance(valor, (int, float)):
+                    totais.setdefault(r['etapa'], {}).setdefault(chave, 0)
+                    totais[r['etapa']][chave] += valor
+    soma = sum(r.get('duracao_s', 0) for t in tenants for r in t.resultados)
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'modo': ('dry-run' if opcoes.dry_run else 'producao') + ('-delta' if opcoes.delta else ''),
+        'conexoes': conexoes,
+        'tenants': len(tenants),
+        'tenants_ok': [t.id for t in tenants if not t.falhou],
+        'tenants_com_falha': [t.id for t in tenants if t.falhou],
+        'duracao_s': round(duracao, 2),
+        'soma_etapas_s': round(soma, 2),
+        'maior_tenant_s': max((t.report()['duracao_s'] for t in tenants), default=0),
+        'paralelismo': round(soma / duracao, 2) if duracao else None,
+        'totais': totais,
+        'por_tenant': [t.report() for t in tenants],
+    }
+
+
+def print_summary(relatorio):
+    print(f"\n{'=' * 60}")
+    print("RESUMO DA ONDA")
+    print(f"{'=' * 60}")
+    for t in relatorio['por_tenant']:
+        etapas = ', '.join(f"{r['etapa']} {r['status']}" + (f" {r['duracao_s']:.1f}s" if 'duracao_s' in r else '')
+                           for r in t['etapas'])
+        print(f"   {'✅' if t['status'] == 'ok' else '❌'} {t['tenant_id']:>5} {t['nome'][:30]:<30} {etapas}")
+    for etapa, totais in relatorio['totais'].items():
+        print(f"   {etapa}: " + ', '.join(f"{chave} {valor:,}" for chave, valor in totais.items()))
+    print(f"   Duração da onda: {relatorio['duracao_s']:.1f}s (soma das etapas: {relatorio['soma_etapas_s']:.1f}s, "
+          f"maior tenant: {relatorio['maior_tenant_s']:.1f}s, paralelismo {relatorio['paralelismo'] or 0:.1f}x)")
+    if relatorio['tenants_com_falha']:
+        print(f"   ❌ Tenants com falha: {', '.join(map(str, relatorio['tenants_com_falha']))}")
+    print(f"{'=' * 60}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migração de vários tenants em paralelo')
+    parser.add_argument('manifesto', help='Manifesto JSON: tenant -> arquivos de origem')
+    parser.add_argument('--conexoes', type=int, default=CONNECTIONS,
+                        help=f'Orçamento global de conexões ao banco (default: {CONNECTIONS})')
+    parser.add_argument('--dry-run', action='store_true', help='Simula todas as migrações')
+    parser.add_argument('--delta', action='store_true', help='Importação incremental (uma conexão por etapa)')
+    parser.add_argument('--tenants', type=str, help='Só estes tenant_id do manifesto (ex.: 3,7)')
+    parser.add_argument('--saida', type=str, help='Pasta dos relatórios (default: data/migracoes_tenants/<data_hora>)')
+    args = parser.parse_args()
+
+    try:
+        entradas = load_manifest(args.manifesto)
+    except (OSError, ValueError, KeyError) as e:
+        parser.error(f"manifesto inválido: {e}")
+    if args.tenants:
+        escolhidos = {int(t) for t in args.tenants.split(',')}
+        entradas = [e for e in entradas if e['tenant_id'] in escolhidos]
+    if not entradas:
+        parser.error('nenhum tenant para migrar')
+    conexoes = max(1, args.conexoes)
+    pasta = args.saida or os.path.join(OUTPUT_DIR, datetime.now().strftime('%Y%m%d_%H%M%S'))
+    os.makedirs(pasta, exist_ok=True)
+    tenants = [Tenant(entrada, pasta) for entrada in entradas]
+
+    print('=' * 60)
+    print('🏥 GORGEN - Migração de tenants em paralelo')
+    print('=' * 60)
+    print(f"   Modo: {'🔍 DRY-RUN (simulação)' if args.dry_run else '🚀 PRODUÇÃO'}{' - delta' if args.delta else ''}")
+    print(f"   Tenants: {len(tenants)} | Orçamento: {conexoes} conexão(ões)")
+    print(f"   Relatórios: {pasta}")
+    print()
+
+    inicio = time.perf_counter()
+    interrompido = False
+    try:
+        run_tenants(tenants, conexoes, args)
+    except KeyboardInterrupt:
+        interrompido = True
+    duracao = time.perf_counter() - inicio
+
+    relatorio = aggregate_report(tenants, conexoes, duracao, args)
+    for tenant in tenants:
+        with open(os.path.join(pasta, f"tenant_{tenant.id}.json"), 'w', encoding='utf-8') as f:
+            json.dump(tenant.report(), f, ensure_ascii=False, indent=2, default=str)
+    caminho = os.path.join(pasta, 'relatorio_tenants.json')
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(relatorio, f, ensure_ascii=False, indent=2, default=str)
+
+    print_summary(relatorio)
+    print(f"\n📄 Relatório agregado: {caminho}")
+    if interrompido or relatorio['tenants_com_falha']:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Normalização de nomes compartilhada pelos scripts de migração e deduplicação.
+
+Regra única (chave de comparação):
+  - minúsculas
+  - sem acentos (qualquer letra latina acentuada vira a letra base)
+  - sem pontuação/caracteres especiais
+  - espaços múltiplos colapsados e bordas removidas
+
+A conversão usa uma tabela str.translate pré-computada e um cache LRU para nomes
+repetidos; normalize_name_series() aplica a mesma regra em uma Series do pandas
+de forma vetorizada.
+
+phonetic_key() gera uma chave fonética simplificada para o português (Sousa/Souza,
+Luis/Luiz, Rafael/Raphael, Gisele/Giselle), usada nas colunas indexadas
+pacientes.nome_normalizado / pacientes.nome_fonetico. A chave sai só do nome
+normalizado: grafias com e sem acento ou cedilha (Gonçalves/Goncalves,
+Conceição/Conceicao) têm sempre a mesma chave; ç com s (Gonsalves) não.
+PHONETIC_VERSION muda a cada alteração das regras: o backfill
+(backfill_nome_normalizado.py) recalcula então todos os pacientes.
+
+Modo de comparação com as implementações antigas (find_duplicates.py e
+migrate_atendimentos.py):
+    python3 scripts/name_normalizer.py --comparar [ARQUIVO ...]
+
+ARQUIVO contém um nome por linha; sem arquivos, usa stdin.
+"""
+
+import re
+import sys
+import time
+import argparse
+import unicodedata
+from functools import lru_cache
+
+# Letras que não se decompõem em NFD
+_SPECIAL = {
+    'ß': 'ss', 'æ': 'ae', 'Æ': 'ae', 'œ': 'oe', 'Œ': 'oe',
+    'ø': 'o', 'Ø': 'o', 'đ': 'd', 'Đ': 'd', 'ł': 'l', 'Ł': 'l',
+    'ð': 'd', 'Ð': 'd', 'þ': 'th', 'Þ': 'th', 'ı': 'i',
+}
+
+# Faixas cobertas pela tabela: ASCII, Latin-1, Latin Extended-A/B,
+# pontuação geral e Latin Extended Additional
+_RANGES = (range(0x0000, 0x0250), range(0x2000, 0x2070), range(0x1E00, 0x1F00))
+
+_NON_KEY = re.compile(r'[^a-z0-9 ]')
+_SPACES = re.compile(r'\s+')
+
+# Versão das regras da chave fonética (nome_fonetico gravado no banco)
+PHONETIC_VERSION = 3
+
+# Partículas ignoradas na chave fonética
+_PARTICLES = frozenset({'da', 'de', 'do', 'das', 'dos', 'e'})
+
+# Regras fonéticas aplicadas a cada palavra já normalizada (ordem importa)
+_PHONETIC_RULES = [(re.compile(pattern), repl) for pattern, repl in (
+    (r'ph', 'f'),
+    (r'th', 't'),
+    (r'[cs]h', 'x'),
+    (r'lh', 'l'),
+    (r'nh', 'n'),
+    (r'gu(?=[ei])', 'g'),
+    (r'qu(?=[ei])', 'k'),
+    (r'q', 'k'),
+    (r'c(?=[ei])', 's'),
+    (r'c', 'k'),
+    (r'g(?=[ei])', 'j'),
+    (r'y', 'i'),
+    (r'w', 'v'),
+    (r'z', 's'),
+    (r'h', ''),
+    (r'n$', 'm'),
+    (r'ao$', 'am'),
+    (r'e$', 'i'),
+    (r'o$', 'u'),
+    (r'(.)\1+', r'\1'),
+)]
+
+
+def _build_table():
+    table = {}
+    for block in _RANGES:
+        for cp in block:
+            ch = chr(cp)
+            if ch in _SPECIAL:
+                table[cp] = _SPECIAL[ch]
+                continue
+            if ch.isspace():
+                table[cp] = ' '
+                continue
+            base = ''.join(
+                c for c in unicodedata.normalize('NFD', ch) if unicodedata.category(c) != 'Mn'
+            ).lower()
+            if base and all(c.isascii() and c.isalnum() for c in base):
+                if base != ch:
+                    table[cp] = base
+            else:
+                table[cp] = None
+    return table
+
+
+TRANSLATE_TABLE = _build_table()
+
+
+@lru_cache(maxsize=65536)
+def _normalize(name):
+    name = name.translate(TRANSLATE_TABLE)
+    if not name.isascii():
+        name = _NON_KEY.sub('', name)
+    return ' '.join(name.split())
+
+
+def normalize_name(name):
+    """Normaliza nome para comparação (minúsculas, sem acentos, sem pontuação, espaços simples)."""
+    if not name or not isinstance(name, str):
+        return ''
+    return _normalize(name)
+
+
+@lru_cache(maxsize=65536)
+def _phonetic(name):
+    words = []
+    for word in _normalize(name).split():
+        if word in _PARTICLES:
+            continue
+        for pattern, repl in _PHONETIC_RULES:
+            word = pattern.sub(repl, word)
+        if word:
+            words.append(word)
+    return ' '.join(words)
+
+
+def phonetic_key(name):
+    """Chave fonética (português) do nome; nomes com mesma pronúncia provável coincidem."""
+    if not name or not isinstance(name, str):
+        return ''
+    return _phonetic(name)
+
+
+def normalize_name_series(series):
+    """Versão vetorizada de normalize_name para uma Series do pandas (nulos viram '')."""
+    s = series.astype('string').str.translate(TRANSLATE_TABLE)
+    s = s.str.replace(_NON_KEY.pattern, '', regex=True)
+    s = s.str.replace(_SPACES.pattern, ' ', regex=True).str.strip()
+    return s.fillna('').astype(object)
+
+
+# ============================================
+# IMPLEMENTAÇÕES ANTIGAS (apenas para --comparar)
+# ============================================
+
+def legacy_find_duplicates(name):
+    """normalize_name original de find_duplicates.py."""
+    if not name:
+        return ""
+    name = name.lower().strip()
+    replacements = {
+        'á': 'a', 'à': 'a', 'ã': 'a', 'â': 'a', 'ä': 'a',
+        'é': 'e', 'è': 'e', 'ê': 'e', 'ë': 'e',
+        'í': 'i', 'ì': 'i', 'î': 'i', 'ï': 'i',
+        'ó': 'o', 'ò': 'o', 'õ': 'o', 'ô': 'o', 'ö': 'o',
+        'ú': 'u', 'ù': 'u', 'û': 'u', 'ü': 'u',
+        'ç': 'c', 'ñ': 'n'
+    }
+    for old, new in replacements.items():
+        name = name.replace(old, new)
+    name = re.sub(r'[^a-z0-9\s]', '', name)
+    name = re.sub(r'\s+', ' ', name).strip()
+    return name
+
+
+def legacy_migrate_atendimentos(nome):
+    """normalize_name original de migrate_atendimentos.py."""
+    if not nome:
+        return ''
+    nome = unicodedata.normalize('NFD', nome)
+    nome = ''.join(c for c in nome if unicodedata.category(c) != 'Mn')
+    nome = ' '.join(nome.lower().split())
+    return nome
+
+
+def compare(names):
+    """Compara a normalização atual com as duas implementações antigas."""
+    legacy = {
+        'find_duplicates': legacy_find_duplicates,
+        'migrate_atendimentos': legacy_migrate_atendimentos,
+    }
+
+    print('=' * 60)
+    print('COMPARAÇÃO DE NORMALIZAÇÃO DE NOMES')
+    print('=' * 60)
+    print(f"Nomes: {len(names):,}")
+
+    _normalize.cache_clear()
+    start = time.perf_counter()
+    atuais = [normalize_name(n) for n in names]
+    tempo_atual = time.perf_counter() - start
+
+    divergencias_total = 0
+    for label, func in legacy.items():
+        start = time.perf_counter()
+        antigos = [func(n) for n in names]
+        tempo = time.perf_counter() - start
+
+        divergencias = [(n, a, b) for n, a, b in zip(names, atuais, antigos) if a != b]
+        divergencias_total += len(divergencias)
+
+        print()
+        print(f"{label}: {len(divergencias):,} divergências")
+        print(f"   Tempo antigo: {tempo * 1000:.1f} ms | atual: {tempo_atual * 1000:.1f} ms")
+        for nome, atual, antigo in divergencias[:10]:
+            print(f"   - {nome!r}: atual={atual!r} antigo={antigo!r}")
+        if len(divergencias) > 10:
+            print(f"   ... e mais {len(divergencias) - 10}")
+
+    return divergencias_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Normalização de nomes compartilhada')
+    parser.add_argument('--comparar', action='store_true',
+                        help='Compara com as implementações antigas')
+    parser.add_argument('arquivos', nargs='*', help='Arquivos com um nome por linha (default: stdin)')
+    args = parser.parse_args()
+
+    if args.arquivos:
+        names = []
+        for path in args.arquivos:
+            with open(path, 'r', encoding='utf-8') as f:
+                names.extend(line.rstrip('\n') for line in f)
+    else:
+        names = [line.rstrip('\n') for line in sys.stdin]
+
+    if args.comparar:
+        compare(names)
+    else:
+        for name in names:
+            print(normalize_name(name))
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Contagem de consultas por forma de SQL e orçamento de consultas
+
+Consultas por linha de entrada (N+1) são o que mais degrada os scripts de
+migração: uma busca de paciente por atendimento, uma verificação de
+duplicado por linha, sondagem de sufixos em laço. QueryLog agrupa os
+statements executados pela forma normalizada do SQL (literais e
+placeholders viram '?', espaços colapsados, listas IN/VALUES reduzidas),
+com chamadas e tempo de cada forma, e calcula consultas por registro de
+entrada.
+
+QueryBudget define limites (consultas por registro, por forma por registro,
+total) e falha (QueryBudgetExceeded, um AssertionError) quando excedidos:
+benchmarks e testes usam check()/enforce() para pegar o padrão por linha
+antes da produção.
+
+Uso:
+    log = QueryLog()
+    conn = CountingConnection(connect(), queries=log)    # run_metrics.py
+    ...
+    log.print_summary(registros=len(df))
+    QueryBudget.parse('por_registro=2,por_forma=1').enforce(log, registros=len(df))
+"""
+
+import re
+from functools import lru_cache
+
+_COMMENT = re.compile(r'(--[^\n]*|/\*.*?\*/)', re.DOTALL)
+_STRING = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_NUMBER = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_PLACEHOLDER = re.compile(r'%s|%\(\w+\)s|\?')
+_IN_LIST = re.compile(r'\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)', re.IGNORECASE)
+_VALUES_LIST = re.compile(r'\bVALUES\s*(\([^()]*\))(?:\s*,\s*\([^()]*\))*', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+_SELECT_LIST = re.compile(r'^SELECT\s+.+?\s+FROM\b', re.IGNORECASE)
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    """Forma normalizada do SQL: mesmas consultas com parâmetros diferentes se agrupam."""
+    shape = _COMMENT.sub(' ', sql)
+    shape = _STRING.sub('?', shape)
+    shape = _PLACEHOLDER.sub('?', shape)
+    shape = _NUMBER.sub('?', shape)
+    shape = _IN_LIST.sub('IN (?+)', shape)
+    shape = _VALUES_LIST.sub(r'VALUES \1', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+class QueryLog:
+    """Chamadas e tempo por forma de SQL."""
+
+    def __init__(self):
+        self.shapes = {}
+
+    def record(self, sql, segundos, many=False):
+        if isinstance(sql, bytes):
+            sql = sql.decode('utf-8', 'replace')
+        forma = self.shapes.setdefault(normalize_sql(sql), {'chamadas': 0, 'segundos': 0.0, 'executemany': 0})
+        forma['chamadas'] += 1
+        forma['segundos'] += segundos
+        if many:
+            forma['executemany'] += 1
+
+    def reset(self):
+        self.shapes.clear()
+
+    @property
+    def total(self):
+        return sum(f['chamadas'] for f in self.shapes.values())
+
+    def per_row(self, registros):
+        return self.total / registros if registros else None
+
+    def top(self, n=None, key='segundos'):
+        formas = sorted(self.shapes.items(), key=lambda item: -item[1][key])
+        return formas[:n] if n else formas
+
+    def as_dict(self, registros=None, n=20):
+        return {
+            'total': self.total,
+            'formas': len(self.shapes),
+            'por_registro': round(self.per_row(registros), 3) if registros else None,
+            'principais': [
+                {
+                    'sql': sql,
+                    'chamadas': forma['chamadas'],
+                    'segundos': round(forma['segundos'], 4),
+                    'por_registro': round(forma['chamadas'] / registros, 3) if registros else None,
+                    'media_ms': round(forma['segundos'] / forma['chamadas'] * 1000, 3),
+                }
+                for sql, forma in self.top(n)
+            ],
+        }
+
+    def print_summary(self, registros=None, n=5, largura=90):
+        if not self.shapes:
+            return
+        por_registro = f" | {self.per_row(registros):.2f} por registro" if registros else ''
+        print(f"   Consultas: {self.total:,} em {len(self.shapes)} forma(s){por_registro}")
+        for sql, forma in self.top(n):
+            taxa = f" {forma['chamadas'] / registros:>6.2f}/reg" if registros else ''
+            # A lista de colunas do SELECT é o que menos distingue as formas
+            texto = _SELECT_LIST.sub('SELECT … FROM', sql)
+            texto = texto if len(texto) <= largura else texto[:largura - 3] + '...'
+            print(f"      {forma['chamadas']:>9,}x {forma['segundos']:>8.2f}s{taxa}  {texto}")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Orçamento de consultas excedido (falha benchmark/teste)."""
+
+    def __init__(self, violacoes):
+        self.violacoes = violacoes
+        super().__init__('Orçamento de consultas excedido: ' + '; '.join(violacoes))
+
+
+class QueryBudget:
+    """Limites de consultas: por registro de entrada, por forma por registro e total."""
+
+    CAMPOS = ('por_registro', 'por_forma', 'total')
+
+    def __init__(self, por_registro=None, por_forma=None, total=None):
+        self.por_registro = por_registro
+        self.por_forma = por_forma
+        self.total = total
+
+    @classmethod
+    def parse(cls, texto):
+        """'2.5' (consultas por registro) ou 'por_registro=2,por_forma=1,total=5000'."""
+        limites = {}
+        for parte in str(texto).split(','):
+            parte = parte.strip()
+            if not parte:
+                continue
+            nome, sep, valor = parte.partition('=')
+            if not sep:
+                nome, valor = 'por_registro', nome
+            nome = nome.strip()
+            if nome not in cls.CAMPOS:
+                raise ValueError(f"Limite desconhecido no orçamento: {nome} (use {', '.join(cls.CAMPOS)})")
+            limites[nome] = float(valor)
+        return cls(**limites)
+
+    def __repr__(self):
+        limites = ', '.join(f"{c}={getattr(self, c):g}" for c in self.CAMPOS if getattr(self, c) is not None)
+        return f"QueryBudget({limites})"
+
+    def check(self, log, registros=None):
+        """Lista de violações (vazia se dentro do orçamento)."""
+        violacoes = []
+        if self.total is not None and log.total > self.total:
+            violacoes.append(f"{log.total:,} consultas (limite {self.total:g})")
+        if registros:
+            if self.por_registro is not None and log.per_row(registros) > self.por_registro:
+                violacoes.append(f"{log.per_row(registros):.2f} consultas por registro (limite {self.por_registro:g})")
+            if self.por_forma is not None:
+                for sql, forma in log.top(key='chamadas'):
+                    taxa = forma['chamadas'] / registros
+                    if taxa > self.por_forma:
+                        violacoes.append(f"{taxa:.2f}/registro (limite {self.por_forma:g}): {sql[:120]}")
+        return violacoes
+
+    def enforce(self, log, registros=None):
+        violacoes = self.check(log, registros)
+        if violacoes:
+            raise QueryBudgetExceeded(violacoes)
@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Reconciliação pós-migração por checksums em blocos
+
+O contador 'inserted' das migrações é o número de linhas enviadas, não o que
+o banco guardou. Este comando confere a origem transformada (as mesmas
+funções de leitura e transformação das migrações) contra pacientes ou
+atendimentos do tenant, sem comparar linha a linha:
+
+  1. cada registro vira um CRC32 das colunas normalizadas (texto, NULL como
+     '<nulo>', datas AAAA-MM-DD, decimais com 2 casas, booleanos 1/0), e a
+     chave, outro CRC32
+  2. os registros são agrupados em faixas do CRC32 da chave (2^bits faixas);
+     cada faixa resume-se a COUNT(*) e BIT_XOR dos CRC32 das linhas. No
+     banco, isso é uma consulta agregada (GROUP BY) por nível
+  3. só as faixas que diferem descem um nível (faixas 2^passo vezes menores,
+     como em uma árvore de Merkle); faixas com até --folha registros são
+     comparadas por chave (CRC32 de cada linha) e as linhas divergentes,
+     coluna a coluna (até --detalhes linhas)
+
+Conferir uma importação de 2M linhas custa algumas consultas agregadas; o
+relatório lista as chaves faltando no banco, sobrando no banco, duplicadas
+e divergentes.
+
+Uso:
+    python3 scripts/reconcile.py pacientes --file data/22kpacientes.xlsx
+    python3 scripts/reconcile.py atendimentos --file data/atendimentos2025-2026.xlsx [--tenant 1]
+
+Opções:
+    --tenant N     Tenant conferido (default: o das migrações)
+    --limit N      Só os primeiros N registros da origem (as faixas do banco
+                   terão registros a mais: útil apenas para testes)
+    --bits N       Bits do primeiro nível (default: 8, 256 faixas)
+    --passo N      Bits acrescentados a cada nível (default: 4)
+    --folha N      Registros por faixa para comparar por chave (default: 256)
+    --detalhes N   Linhas divergentes comparadas coluna a coluna (default: 20)
+    --relatorio    Arquivo JSON do relatório
+
+Sai com código 1 se origem e banco não conferem.
+"""
+
+import sys
+import json
+import zlib
+import argparse
+from datetime import datetime, date
+from decimal import Decimal, InvalidOperation
+
+import numpy as np
+import pandas as pd
+
+import migrate_patients
+import migrate_atendimentos
+from db import connect, get_db_config, describe
+from run_metrics import RunMetrics
+
+NULL_TOKEN = '<nulo>'
+SEPARATOR = '|'
+BITS = 8
+STEP_BITS = 4
+LEAF_ROWS = 256
+DETAIL_ROWS = 20
+RANGES_PER_QUERY = 200
+REPORT_FILE = '/home/ubuntu/consultorio_poc/data/reconciliacao_{tabela}.json'
+
+# Colunas comparadas (chave e tenant à parte) e o tipo usado na normalização
+TABLES = {
+    'pacientes': {
+        'chave': 'id_paciente',
+        'colunas': {
+            c: ('data' if c == 'data_nascimento' else 'texto')
+            for c in migrate_patients.PACIENTE_COLUMNS if c not in ('tenant_id', 'id_paciente')
+        },
+    },
+    'atendimentos': {
+        'chave': 'atendimento',
+        'colunas': {
+            'nome_paciente': 'texto',
+            'data_atendimento': 'data',
+            'semana': 'int',
+            'tipo_atendimento': 'texto',
+            'procedimento': 'texto',
+            'local': 'texto',
+            'convenio': 'texto',
+            'plano_convenio': 'texto',
+            'pagamento_efetivado': 'bool',
+            'faturamento_previsto': 'decimal',
+            'registro_manual_valor_hm': 'decimal',
+            'faturamento_previsto_final': 'decimal',
+            'data_envio_faturamento': 'data',
+            'data_esperada_pagamento': 'data',
+            'data_pagamento': 'data',
+            'nota_fiscal_correspondente': 'texto',
+            'observacoes': 'texto',
+            'faturamento_leticia': 'decimal',
+            'faturamento_ag_lu': 'decimal',
+            'mes': 'int',
+            'ano': 'int',
+            'trimestre': 'texto',
+            'trimestre_ano': 'texto',
+        },
+    },
+}
+
+
+# ============================================
+# NORMALIZAÇÃO (mesmo texto dos dois lados)
+# ============================================
+
+def normalize_value(value, tipo='texto'):
+    """Texto de um valor da origem como o banco o devolve em column_sql."""
+    if value is None or (not isinstance(value, str) and pd.isna(value)):
+        return NULL_TOKEN
+    if tipo == 'data':
+        if isinstance(value, (datetime, date)):
+            return value.strftime('%Y-%m-%d')
+        return str(value)[:10]
+    if tipo == 'bool':
+        return '1' if value else '0'
+    if tipo == 'int':
+        return str(int(value))
+    if tipo == 'decimal':
+        try:
+            return f"{Decimal(str(value)):.2f}"
+        except InvalidOperation:
+            return str(value)
+    return str(value)
+
+
+def row_text(values, tipos):
+    return SEPARATOR.join(normalize_value(v, t) for v, t in zip(values, tipos))
+
+
+def crc32(texto):
+    return zlib.crc32(texto.encode('utf-8'))
+
+
+def column_sql(coluna, tipo):
+    """Expressão SQL que devolve a coluna normalizada como texto."""
+    expr = f"DATE({coluna})" if tipo == 'data' else coluna
+    return f"COALESCE(CAST({expr} AS CHAR), '{NULL_TOKEN}')"
+
+
+def row_crc_sql(spec):
+    partes = ', '.join(column_sql(c, t) for c, t in spec['colunas'].items())
+    return f"CRC32(CONCAT_WS('{SEPARATOR}', {partes}))"
+
+
+def bucket_range(prefixo, bits):
+    """Faixa [início, fim] do CRC32 da chave coberta pelo prefixo de bits bits."""
+    deslocamento = 32 - bits
+    return prefixo << deslocamento, ((prefixo + 1) << deslocamento) - 1
+
+
+# ============================================
+# ORIGEM
+# ============================================
+
+def source_rows(tabela, arquivo, limit=None):
+    """(chave, valores) de cada registro da origem, como a migração os gravaria."""
+    spec = TABLES[tabela]
+    colunas = list(spec['colunas'])
+    if tabela == 'pacientes':
+        seen_ids = set()
+        source = migrate_patients.read_source(arquivo, limit, migrate_patients.CONFIG['chunk_size'])
+        for _, df in source:
+            df_transformed, _ = migrate_patients.transform_dataframe(df, seen_ids)
+            yield from ((valores[0], valores[1:])
+                        for valores in migrate_patients.batch_values(df_transformed, [spec['chave']] + colunas))
+        return
+    # Atendimentos: como na migração, linhas sem nome ficam de fora e a primeira ocorrência de cada número vale
+    vistos = set()
+    for df in migrate_atendimentos.load_chunks(arquivo, limit):
+        for _, dados, _ in migrate_atendimentos.extract_chunk(df):
+            if dados is None or not dados['nome_paciente'] or dados['atendimento'] in vistos:
+                continue
+            vistos.add(dados['atendimento'])
+            yield dados['atendimento'], tuple(dados[c] for c in colunas)
+
+
+class SourceChecksums:
+    """CRC32 da chave e da linha de cada registro da origem, ordenados pelo da chave."""
+
+    def __init__(self, chaves, chave_crc, linha_crc):
+        ordem = np.argsort(chave_crc, kind='stable')
+        self.chaves = np.asarray(chaves, dtype=object)[ordem]
+        self.chave_crc = np.asarray(chave_crc, dtype=np.uint64)[ordem]
+        self.linha_crc = np.asarray(linha_crc, dtype=np.uint64)[ordem]
+
+    @classmethod
+    def build(cls, tabela, rows):
+        tipos = list(TABLES[tabela]['colunas'].values())
+        chaves, chave_crc, linha_crc = [], [], []
+        for chave, valores in rows:
+            chave = str(chave)
+            chaves.append(chave)
+            chave_crc.append(crc32(chave))
+            linha_crc.append(crc32(row_text(valores, tipos)))
+        return cls(chaves, chave_crc, linha_crc)
+
+    def __len__(self):
+        return len(self.chaves)
+
+    def _slices(self, faixas):
+        if faixas is None:
+            return [(0, len(self.chave_crc))]
+        return [(int(np.searchsorted(self.chave_crc, inicio, 'left')),
+                 int(np.searchsorted(self.chave_crc, fim, 'right'))) for inicio, fim in faixas]
+
+    def buckets(self, bits, faixas=None):
+        """{prefixo: (registros, xor)} no nível bits, dentro das faixas (None: tudo)."""
+        resultado = {}
+        for i, j in self._slices(faixas):
+            if i == j:
+                continue
+            prefixos = self.chave_crc[i:j] >> np.uint64(32 - bits)
+            valores, inicios, contagens = np.unique(prefixos, return_index=True, return_counts=True)
+            xors = np.bitwise_xor.reduceat(self.linha_crc[i:j], inicios)
+            resultado.update((int(p), (int(n), int(x))) for p, n, x in zip(valores, contagens, xors))
+        return resultado
+
+    def rows(self, faixas):
+        """{chave: crc da linha} dos registros nas faixas."""
+        linhas = {}
+        for i, j in self._slices(faixas):
+            linhas.update(zip(self.chaves[i:j], (int(c) for c in self.linha_crc[i:j])))
+        return linhas
+
+
+# ============================================
+# BANCO
+# ============================================
+
+def _range_filter(spec, faixas):
+    if faixas is None:
+        return '', []
+    condicoes = ' OR '.join([f"CRC32({spec['chave']}) BETWEEN %s AND %s"] * len(faixas))
+    return f" AND ({condicoes})", [v for faixa in faixas for v in faixa]
+
+
+def _in_groups(faixas):
+    if faixas is None:
+        yield None
+        return
+    for inicio in range(0, len(faixas), RANGES_PER_QUERY):
+        yield faixas[inicio:inicio + RANGES_PER_QUERY]
+
+
+def db_buckets(conn, tabela, tenant_id, bits, faixas=None):
+    """{prefixo: (registros, xor)} do banco: uma consulta agregada (por grupo de faixas)."""
+    spec = TABLES[tabela]
+    resultado = {}
+    cursor = conn.cursor()
+    try:
+        for grupo in _in_groups(faixas):
+            filtro, params = _range_filter(spec, grupo)
+            cursor.execute(f"""
+                SELECT CRC32({spec['chave']}) >> {32 - bits} AS faixa, COUNT(*), BIT_XOR({row_crc_sql(spec)})
+                FROM {tabela}
+                WHERE tenant_id = %s AND deleted_at IS NULL{filtro}
+                GROUP BY faixa
+            """, (tenant_id, *params))
+            resultado.update((int(p), (int(n), int(x))) for p, n, x in cursor.fetchall())
+    finally:
+        cursor.close()
+    return resultado
+
+
+def db_rows(conn, tabela, tenant_id, faixas):
+    """[(chave, crc da linha)] do banco nas faixas."""
+    spec = TABLES[tabela]
+    linhas = []
+    cursor = conn.cursor()
+    try:
+        for grupo in _in_groups(faixas):
+            filtro, params = _range_filter(spec, grupo)
+            cursor.execute(f"""
+                SELECT {spec['chave']}, {row_crc_sql(spec)}
+                FROM {tabela}
+                WHERE tenant_id = %s AND deleted_at IS NULL{filtro}
+            """, (tenant_id, *params))
+            linhas.extend((str(chave), int(crc)) for chave, crc in cursor.fetchall())
+    finally:
+        cursor.close()
+    return linhas
+
+
+def db_values(conn, tabela, tenant_id, chaves):
+    """{chave: textos normalizados das colunas} do banco para as chaves."""
+    spec = TABLES[tabela]
+    if not chaves:
+        return {}
+    colunas = ', '.join(column_sql(c, t) for c, t in spec['colunas'].items())
+    placeholders = ', '.join(['%s'] * len(chaves))
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            SELECT {spec['chave']}, {colunas}
+            FROM {tabela}
+            WHERE tenant_id = %s AND deleted_at IS NULL AND {spec['chave']} IN ({placeholders})
+        """, (tenant_id, *chaves))
+        return {str(row[0]): tuple(row[1:]) for row in cursor.fetchall()}
+    finally:
+        cursor.close()
+
+
+# ============================================
+# RECONCILIAÇÃO
+# ============================================
+
+def reconcile(conn, tabela, tenant_id, origem, bits=BITS, passo=STEP_BITS, folha=LEAF_ROWS):
+    """Compara origem (SourceChecksums) e banco descendo só nas faixas divergentes."""
+    niveis = []
+    folhas = []
+    faixas = None
+    totais = None
+    while True:
+        banco = db_buckets(conn, tabela, tenant_id, bits, faixas)
+        fonte = origem.buckets(bits, faixas)
+        if totais is None:
+            totais = (sum(n for n, _ in fonte.values()), sum(n for n, _ in banco.values()))
+        divergentes = sorted(p for p in banco.keys() | fonte.keys() if banco.get(p) != fonte.get(p))
+        niveis.append({'bits': bits, 'faixas': len(banco.keys() | fonte.keys()), 'divergentes': len(divergentes)})
+        print(f"   Nível {len(niveis)} ({bits} bits): {niveis[-1]['faixas']:,} faixas, "
+              f"{len(divergentes):,} divergente(s)")
+        # Faixas pequenas (ou no último nível) são comparadas por chave; as outras descem
+        descer = []
+        for p in divergentes:
+            maior = max(banco.get(p, (0, 0))[0], fonte.get(p, (0, 0))[0])
+            (folhas if maior <= folha or bits >= 32 else descer).append(bucket_range(p, bits))
+        if not descer:
+            break
+        faixas = descer
+        bits = min(32, bits + passo)
+
+    linhas_banco = db_rows(conn, tabela, tenant_id, folhas) if folhas else []
+    linhas_fonte = origem.rows(folhas) if folhas else {}
+    banco_por_chave = {}
+    for chave, crc in linhas_banco:
+        banco_por_chave.setdefault(chave, []).append(crc)
+    faltando = sorted(c for c in linhas_fonte if c not in banco_por_chave)
+    sobrando = sorted(c for c in banco_por_chave if c not in linhas_fonte)
+    duplicados = sorted(c for c, crcs in banco_por_chave.items() if len(crcs) > 1)
+    # Chave duplicada só diverge se nenhuma das cópias confere com a origem
+    divergentes = sorted(c for c in linhas_fonte if c in banco_por_chave and linhas_fonte[c] not in banco_por_chave[c])
+    return {
+        'registros_origem': totais[0],
+        'registros_banco': totais[1],
+        'niveis': niveis,
+        'faixas_comparadas_por_chave': len(folhas),
+        'faltando_no_banco': faltando,
+        'sobrando_no_banco': sobrando,
+        'duplicados_no_banco': duplicados,
+        'divergentes': divergentes,
+    }
+
+
+def column_differences(conn, tabela, tenant_id, arquivo, chaves, limit=None):
+    """Colunas que diferem em cada chave divergente (segunda leitura da origem, só dessas chaves)."""
+    spec = TABLES[tabela]
+    alvo = set(chaves)
+    fonte = {}
+    for chave, valores in source_rows(tabela, arquivo, limit):
+        chave = str(chave)
+        if chave in alvo and chave not in fonte:
+            fonte[chave] = tuple(normalize_value(v, t) for v, t in zip(valores, spec['colunas'].values()))
+    banco = db_values(conn, tabela, tenant_id, list(alvo))
+    diferencas = {}
+    for chave in chaves:
+        if chave not in fonte or chave not in banco:
+            continue
+        diferencas[chave] = {
+            coluna: {'origem': a, 'banco': b}
+            for coluna, a, b in zip(spec['colunas'], fonte[chave], banco[chave]) if a != b
+        }
+    return diferencas
+
+
+def print_summary(resultado, n=10):
+    conferem = resultado['conferem']
+    print()
+    print('=' * 60)
+    print(f"🧾 RECONCILIAÇÃO: {'✅ origem e banco conferem' if conferem else '❌ origem e banco divergem'}")
+    print('=' * 60)
+    print(f"   Registros na origem: {resultado['registros_origem']:,} | no banco: {resultado['registros_banco']:,}")
+    print(f"   Consultas ao banco: {resultado['consultas']} | faixas comparadas por chave: "
+          f"{resultado['faixas_comparadas_por_chave']:,}")
+    for nome, rotulo in (('faltando_no_banco', 'Faltando no banco'), ('sobrando_no_banco', 'Sobrando no banco'),
+                         ('duplicados_no_banco', 'Duplicados no banco'), ('divergentes', 'Divergentes')):
+        chaves = resultado[nome]
+        if not chaves:
+            continue
+        resto = f" ... e mais {len(chaves) - n:,}" if len(chaves) > n else ''
+        print(f"   {rotulo} ({len(chaves):,}): {', '.join(chaves[:n])}{resto}")
+    for chave, colunas in list(resultado.get('colunas_divergentes', {}).items())[:n]:
+        for coluna, valores in colunas.items():
+            print(f"      {chave}.{coluna}: origem {valores['origem']!r} | banco {valores['banco']!r}")
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Reconciliação pós-migração por checksums em blocos')
+    parser.add_argument('tabela', choices=sorted(TABLES))
+    parser.add_argument('--file', type=str, required=True, help='Planilha ou CSV/TSV de origem')
+    parser.add_argument('--tenant', type=int, help='Tenant conferido (default: o das migrações)')
+    parser.add_argument('--limit', type=int, help='Só os primeiros N registros da origem')
+    parser.add_argument('--bits', type=int, default=BITS, help=f'Bits do primeiro nível (default: {BITS})')
+    parser.add_argument('--passo', type=int, default=STEP_BITS, help=f'Bits por nível (default: {STEP_BITS})')
+    parser.add_argument('--folha', type=int, default=LEAF_ROWS,
+                        help=f'Registros por faixa para comparar por chave (default: {LEAF_ROWS})')
+    parser.add_argument('--detalhes', type=int, default=DETAIL_ROWS,
+                        help=f'Linhas divergentes comparadas coluna a coluna (default: {DETAIL_ROWS})')
+    parser.add_argument('--relatorio', type=str, help='Arquivo JSON do relatório')
+    args = parser.parse_args()
+
+    if args.tenant is not None:
+        tenant_id = args.tenant
+    else:
+        tenant_id = migrate_patients.CONFIG['tenant_id'] if args.tabela == 'pacientes' else migrate_atendimentos.TENANT_ID
+    bits = max(1, min(32, args.bits))
+    passo = max(1, args.passo)
+
+    print('=' * 60)
+    print(f"🧾 GORGEN - Reconciliação de {args.tabela} (tenant {tenant_id})")
+    print('=' * 60)
+    print(f"📂 Origem: {args.file}")
+    inicio = datetime.now()
+    origem = SourceChecksums.build(args.tabela, source_rows(args.tabela, args.file, args.limit))
+    print(f"   {len(origem):,} registros na origem ({(datetime.now() - inicio).total_seconds():.1f}s)")
+    print()
+
+    metrics = RunMetrics()
+    print(f"🔌 Banco: {describe(get_db_config())}")
+    conn = metrics.wrap_connection(connect())
+    try:
+        resultado = reconcile(conn, args.tabela, tenant_id, origem, bits, passo, args.folha)
+        if resultado['divergentes'] and args.detalhes:
+            resultado['colunas_divergentes'] = column_differences(
+                conn, args.tabela, tenant_id, args.file, resultado['divergentes'][:args.detalhes], args.limit)
+    finally:
+        conn.close()
+
+    resultado['consultas'] = metrics.queries.total
+    resultado['conferem'] = not any(resultado[k] for k in (
+        'faltando_no_banco', 'sobrando_no_banco', 'duplicados_no_banco', 'divergentes'))
+    resultado.update({
+        'tabela': args.tabela,
+        'tenant_id': tenant_id,
+        'arquivo': args.file,
+        'duracao_s': round((datetime.now() - inicio).total_seconds(), 3),
+        'timestamp': datetime.now().isoformat(),
+    })
+    print_summary(resultado)
+
+    relatorio = args.relatorio or REPORT_FILE.format(tabela=args.tabela)
+    with open(relatorio, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2, default=str)
+    print(f"📄 Relatório salvo em: {relatorio}")
+    sys.exit(0 if resultado['conferem'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Quarentena das linhas rejeitadas pelas migrações
+
+As linhas que não chegam ao banco (sem ID, sem nome, paciente não
+encontrado, recusadas pelo banco...) eram só contadas nos avisos ou
+descritas em texto nos erros; corrigi-las exigia reprocessar o arquivo
+inteiro. RejectWriter grava cada uma, à medida que é rejeitada, em um
+arquivo de quarentena com a linha original e:
+
+  _linha    linha no arquivo de origem (índice + 2; preservada ao reprocessar)
+  _motivo   código do motivo (MOTIVOS; 'banco_<errno>' para recusas do banco)
+  _detalhe  mensagem legível
+
+O formato vem da extensão: .csv (padrão, gravado em fluxo) ou .parquet
+(mantém os tipos; exige pyarrow e é gravado ao final). O arquivo só é
+substituído ao final de uma execução concluída (troca atômica), e removido
+se não houve rejeições.
+
+Depois de corrigir o arquivo de quarentena, --only-rejects o usa como
+origem: só as linhas rejeitadas são reprocessadas, e as que continuam
+rejeitadas voltam para a quarentena, com a linha original.
+
+Uso:
+    rejects = RejectWriter(quarantine_path(arquivo))
+    rejects.add(df_rejeitadas, 'sem_nome', 'Nome do paciente vazio')
+    rejects.close()
+    relatorio['quarentena'] = rejects.report()
+"""
+
+import os
+import threading
+from collections import Counter
+
+import pandas as pd
+
+LINE_COLUMN = '_linha'
+REASON_COLUMN = '_motivo'
+DETAIL_COLUMN = '_detalhe'
+META_COLUMNS = [LINE_COLUMN, REASON_COLUMN, DETAIL_COLUMN]
+SUFFIX = '_rejeitados'
+
+MOTIVOS = {
+    'sem_id': 'ID do paciente vazio',
+    'sem_nome': 'Nome do paciente vazio',
+    'paciente_nao_encontrado': 'Paciente não encontrado no banco',
+    'erro_extracao': 'Erro ao interpretar a linha',
+    'banco': 'Recusada pelo banco',
+    'erro': 'Erro inesperado',
+}
+
+
+def db_reason(codigo):
+    """Código do motivo para uma recusa do banco (errno do MySQL/TiDB, se houver)."""
+    return f"banco_{codigo}" if codigo else 'banco'
+
+
+def is_parquet(path):
+    return str(path).lower().endswith('.parquet')
+
+
+def quarantine_path(arquivo, fmt='csv'):
+    """Arquivo de quarentena padrão, ao lado da origem: <nome>_rejeitados.<fmt>.
+
+    Se a origem já é um arquivo de quarentena (--only-rejects), é ele mesmo.
+    """
+    base, _ = os.path.splitext(arquivo)
+    if base.endswith(SUFFIX):
+        return arquivo
+    return f"{base}{SUFFIX}.{fmt}"
+
+
+def source_lines(df):
+    """Linha de origem de cada registro: _linha, se o bloco veio da quarentena; senão índice + 2."""
+    if LINE_COLUMN in df.columns:
+        return df[LINE_COLUMN].astype('int64')
+    return pd.Series(df.index, index=df.index) + 2
+
+
+def source_line(idx, row=None):
+    """Linha de origem de um registro (Series): _linha, se veio da quarentena; senão idx + 2."""
+    if row is not None and LINE_COLUMN in row.index and pd.notna(row[LINE_COLUMN]):
+        return int(row[LINE_COLUMN])
+    return idx + 2
+
+
+def read_parquet_chunks(path, chunksize=None, nrows=None):
+    """Blocos de um arquivo de quarentena .parquet, com índice contínuo (como read_delimited)."""
+    df = pd.read_parquet(path)
+    if nrows:
+        df = df.head(nrows)
+    df = df.reset_index(drop=True)
+    chunksize = chunksize or len(df) or 1
+    for inicio in range(0, len(df), chunksize):
+        yield df.iloc[inicio:inicio + chunksize]
+
+
+def _brazilian_dates(df):
+    """Datas como DD/MM/AAAA: a leitura de CSV (delimited_reader) interpreta o dia primeiro."""
+    colunas = df.columns[[pd.api.types.is_datetime64_any_dtype(t) for t in df.dtypes]]
+    if len(colunas):
+        df = df.copy()
+        for col in colunas:
+            com_hora = (df[col].dropna().dt.normalize() != df[col].dropna()).any()
+            df[col] = df[col].dt.strftime('%d/%m/%Y %H:%M:%S' if com_hora else '%d/%m/%Y')
+    return df
+
+
+class RejectWriter:
+    """Grava as linhas rejeitadas (originais) com linha de origem e motivo.
+
+    add() pode ser chamado de várias threads (leitura e escrita do pipeline).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = is_parquet(path)
+        self.total = 0
+        self.motivos = Counter()
+        self._tmp = path + '.tmp'
+        self._file = None
+        self._columns = None
+        self._frames = []
+        self._lock = threading.Lock()
+
+    def _frame(self, rows, motivo, detalhe, linhas):
+        originais = rows.drop(columns=[c for c in META_COLUMNS if c in rows.columns])
+        if not self.parquet:
+            originais = _brazilian_dates(originais)
+        out = pd.DataFrame({
+            LINE_COLUMN: source_lines(rows) if linhas is None else list(linhas),
+            REASON_COLUMN: motivo,
+            DETAIL_COLUMN: detalhe,
+        }, index=rows.index)
+        return pd.concat([out, originais], axis=1)
+
+    def add(self, rows, motivo, detalhe=None, linhas=None):
+        """Envia as linhas originais (DataFrame) à quarentena com o motivo.
+
+        detalhe: mensagem única ou uma por linha; linhas: números de linha
+        (padrão: source_lines).
+        """
+        if rows is None or rows.empty:
+            return
+        if detalhe is None:
+            detalhe = MOTIVOS.get(motivo, MOTIVOS['banco'] if motivo.startswith('banco') else motivo)
+        out = self._frame(rows, motivo, detalhe, linhas)
+        with self._lock:
+            self.total += len(out)
+            self.motivos[motivo] += len(out)
+            if self.parquet:
+                self._frames.append(out)
+                return
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                self._file = open(self._tmp, 'w', encoding='utf-8', newline='')
+                self._columns = list(out.columns)
+                out.to_csv(self._file, index=False)
+            else:
+                # Colunas fixadas pelo primeiro bloco (novas colunas não cabem no cabeçalho)
+                out.reindex(columns=self._columns).to_csv(self._file, index=False, header=False)
+            self._file.flush()
+
+    def add_row(self, row, motivo, detalhe=None, linha=None):
+        """Como add, para uma linha (Series) só."""
+        self.add(row.to_frame().T, motivo, detalhe, None if linha is None else [linha])
+
+    def close(self, concluido=True):
+        """Publica a quarentena (troca atômica). Sem concluido, descarta e mantém a anterior."""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if not concluido:
+                if os.path.exists(self._tmp):
+                    os.remove(self._tmp)
+                return
+            if self.parquet and self._frames:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                df = pd.concat(self._frames, ignore_index=True)
+                # Colunas com tipos mistos (datas e textos) não têm tipo Arrow: vão como texto
+                for col in df.columns[df.dtypes == object]:
+                    df[col] = df[col].map(lambda v: None if pd.isna(v) else str(v))
+                df.to_parquet(self._tmp, index=False)
+                self._frames = []
+            if self.total:
+                os.replace(self._tmp, self.path)
+            elif os.path.exists(self.path):
+                # Nenhuma rejeição: a quarentena anterior não vale mais
+                os.remove(self.path)
+
+    def report(self):
+        return {
+            'arquivo': self.path if self.total else None,
+            'total': self.total,
+            'motivos': dict(self.motivos),
+        }
+
+    def print_summary(self):
+        if not self.total:
+            return
+        motivos = ', '.join(f"{m}: {n:,}" for m, n in self.motivos.most_common())
+        print(f"🚧 Quarentena: {self.total:,} linha(s) rejeitada(s) em {self.path} ({motivos})")
+        print("   Corrija o arquivo e reprocesse só essas linhas com --only-rejects")
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Histórico de execuções e detecção de regressões de desempenho
+
+Cada execução dos scripts de migração acrescenta uma linha a
+data/run_history.jsonl (ou GORGEN_RUN_HISTORY) com o tamanho do conjunto de
+dados, a duração, registros/s total e por etapa, idas ao banco e pico de
+memória (o bloco 'desempenho' de run_metrics.py).
+
+As execuções são comparadas apenas com as do mesmo script, mesmo arquivo de
+origem, mesmo número de linhas e mesmo modo (dry-run, produção, upsert). A
+última execução é comparada com a mediana das N anteriores (janela); um
+desvio é significativo quando o z-score robusto (desvio / MAD escalado)
+passa do limiar E a variação relativa passa da variação mínima. A mediana e o
+MAD não se deixam levar por uma execução anômala na linha de base. Etapas que
+duram menos de MIN_STAGE_SECONDS não são comparadas (só ruído).
+
+Uso:
+    python3 scripts/run_history.py compare [--script S] [--janela N] [--limiar Z] [--variacao P]
+    python3 scripts/run_history.py list [--script S] [-n N]
+
+compare sai com código 1 quando há regressão (útil em CI).
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from datetime import datetime
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+HISTORY_ENV = 'GORGEN_RUN_HISTORY'
+HISTORY_FILE = os.path.join(REPO_DIR, 'data', 'run_history.jsonl')
+
+WINDOW = 10
+MIN_BASELINE = 3
+Z_THRESHOLD = 3.5
+MIN_CHANGE = 0.10
+# Etapas mais curtas que isso são dominadas por ruído e não são comparadas
+MIN_STAGE_SECONDS = 0.5
+# MAD -> desvio padrão para dados normais
+MAD_SCALE = 1.4826
+
+
+def history_path():
+    return os.environ.get(HISTORY_ENV) or HISTORY_FILE
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip() or None
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def record_run(script, arquivo, modo, linhas, desempenho, registros=None, path=None):
+    """Acrescenta uma execução ao histórico. Retorna a entrada gravada.
+
+    linhas: tamanho do conjunto de dados lido; registros: registros
+    efetivamente processados (default: linhas); desempenho: RunMetrics.as_dict().
+    """
+    registros = linhas if registros is None else registros
+    duracao = desempenho.get('duracao_s') or 0
+    entry = {
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'script': script,
+        'arquivo': os.path.basename(arquivo) if arquivo else None,
+        'modo': modo,
+        'linhas': linhas,
+        'registros': registros,
+        'duracao_s': duracao,
+        'registros_s': round(registros / duracao, 1) if duracao > 0 else None,
+        'etapas': {
+            nome: {'segundos': etapa['segundos'], 'registros_s': etapa['registros_s']}
+            for nome, etapa in desempenho.get('etapas', {}).items()
+        },
+        'idas_ao_banco': desempenho.get('idas_ao_banco', {}).get('total'),
+        'pico_rss_mb': desempenho.get('pico_rss_mb'),
+    }
+    path = path or history_path()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+    return entry
+
+
+def load_history(path=None):
+    path = path or history_path()
+    if not os.path.exists(path):
+        return []
+    entries = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue  # linha truncada por execução interrompida
+    return entries
+
+
+def group_key(entry):
+    return (entry.get('script'), entry.get('arquivo'), entry.get('linhas'), entry.get('modo'))
+
+
+def run_metrics(entry):
+    """{métrica: (valor, maior_é_melhor)} comparáveis de uma execução."""
+    metricas = {'registros_s': (entry.get('registros_s'), True)}
+    for nome, etapa in (entry.get('etapas') or {}).items():
+        if (etapa.get('segundos') or 0) < MIN_STAGE_SECONDS:
+            continue
+        # Etapas sem registros (commit) comparam pelo tempo total
+        if etapa.get('registros_s'):
+            metricas[f'{nome}.registros_s'] = (etapa['registros_s'], True)
+        else:
+            metricas[f'{nome}.segundos'] = (etapa.get('segundos'), False)
+    if entry.get('idas_ao_banco') is not None and entry.get('registros'):
+        metricas['idas_por_registro'] = (entry['idas_ao_banco'] / entry['registros'], False)
+    metricas['pico_rss_mb'] = (entry.get('pico_rss_mb'), False)
+    return {k: v for k, v in metricas.items() if v[0] is not None}
+
+
+def robust_deviation(valor, baseline):
+    """(mediana, z robusto, variação relativa) de valor contra a linha de base."""
+    mediana = statistics.median(baseline)
+    mad = statistics.median(abs(v - mediana) for v in baseline) * MAD_SCALE
+    variacao = (valor - mediana) / mediana if mediana else 0.0
+    if mad == 0:
+        # Linha de base sem dispersão: qualquer diferença é "infinita" em z
+        z = 0.0 if valor == mediana else float('inf') * (1 if valor > mediana else -1)
+    else:
+        z = (valor - mediana) / mad
+    return mediana, z, variacao
+
+
+def compare_latest(entries, window=WINDOW, z_threshold=Z_THRESHOLD, min_change=MIN_CHANGE):
+    """Compara a última execução de cada grupo com as anteriores.
+
+    Retorna uma lista de {'grupo', 'execucao', 'metricas': [...]},
+    onde cada métrica tem valor, mediana, z, variacao e status
+    ('regressao', 'melhora', 'estavel' ou 'sem_base').
+    """
+    grupos = {}
+    for entry in entries:
+        grupos.setdefault(group_key(entry), []).append(entry)
+
+    resultados = []
+    for key, execucoes in grupos.items():
+        ultima, anteriores = execucoes[-1], execucoes[:-1][-window:]
+        base_metricas = [run_metrics(e) for e in anteriores]
+        metricas = []
+        for nome, (valor, maior_melhor) in run_metrics(ultima).items():
+            baseline = [m[nome][0] for m in base_metricas if nome in m]
+            if len(baseline) < MIN_BASELINE:
+                metricas.append({'metrica': nome, 'valor': valor, 'status': 'sem_base', 'n': len(baseline)})
+                continue
+            mediana, z, variacao = robust_deviation(valor, baseline)
+            pior = (z < 0) if maior_melhor else (z > 0)
+            significativo = abs(z) >= z_threshold and abs(variacao) >= min_change
+            status = ('regressao' if pior else 'melhora') if significativo else 'estavel'
+            metricas.append({
+                'metrica': nome, 'valor': valor, 'mediana': mediana, 'z': z,
+                'variacao': variacao, 'status': status, 'n': len(baseline),
+            })
+        resultados.append({'grupo': key, 'execucao': ultima, 'metricas': metricas})
+    return resultados
+
+
+def _fmt(valor):
+    if isinstance(valor, float):
+        return f"{valor:,.3f}" if abs(valor) < 10 else f"{valor:,.1f}"
+    return f"{valor:,}"
+
+
+def print_comparison(resultado, only_changes=False):
+    script, arquivo, linhas, modo = resultado['grupo']
+    execucao = resultado['execucao']
+    print(f"📈 {script} | {arquivo} | {linhas:,} linhas | {modo} | "
+          f"{execucao['data']} ({execucao.get('commit') or '?'})")
+    icones = {'regressao': '🔴', 'melhora': '🟢', 'estavel': '  ', 'sem_base': '  '}
+    for m in resultado['metricas']:
+        if only_changes and m['status'] in ('estavel', 'sem_base'):
+            continue
+        if m['status'] == 'sem_base':
+            print(f"   {icones['sem_base']} {m['metrica']:<28} {_fmt(m['valor']):>14} (linha de base com {m['n']} execução(ões))")
+            continue
+        z = f"{m['z']:+.1f}" if abs(m['z']) != float('inf') else ('+∞' if m['z'] > 0 else '-∞')
+        print(f"   {icones[m['status']]} {m['metrica']:<28} {_fmt(m['valor']):>14} "
+              f"vs mediana {_fmt(m['mediana']):>14} ({m['variacao'] * 100:+.1f}%, z {z}, n={m['n']})")
+
+
+def check_last_run(entry, path=None):
+    """Compara a execução recém-gravada com o histórico e imprime regressões/melhoras."""
+    entries = [e for e in load_history(path) if group_key(e) == group_key(entry)]
+    if len(entries) <= MIN_BASELINE:
+        print(f"📚 Histórico: {len(entries)} execução(ões) deste conjunto/modo "
+              f"(comparação a partir de {MIN_BASELINE + 1})")
+        return []
+    resultado = compare_latest(entries)[0]
+    regressoes = [m for m in resultado['metricas'] if m['status'] == 'regressao']
+    mudancas = [m for m in resultado['metricas'] if m['status'] in ('regressao', 'melhora')]
+    if mudancas:
+        print_comparison(resultado, only_changes=True)
+    else:
+        print(f"📚 Desempenho estável em relação às últimas {min(len(entries) - 1, WINDOW)} execuções")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Histórico de execuções e regressões de desempenho')
+    parser.add_argument('comando', choices=['compare', 'list'])
+    parser.add_argument('--script', help='Filtra por script (ex.: migrate_patients)')
+    parser.add_argument('--janela', type=int, default=WINDOW, help=f'Execuções na linha de base (default: {WINDOW})')
+    parser.add_argument('--limiar', type=float, default=Z_THRESHOLD, help=f'z robusto mínimo (default: {Z_THRESHOLD})')
+    parser.add_argument('--variacao', type=float, default=MIN_CHANGE * 100,
+                        help=f'Variação mínima em %% (default: {MIN_CHANGE * 100:.0f})')
+    parser.add_argument('-n', type=int, default=20, help='Execuções listadas (list)')
+    parser.add_argument('--historico', help=f'Arquivo do histórico (default: {HISTORY_FILE})')
+    args = parser.parse_args()
+
+    entries = load_history(args.historico)
+    if args.script:
+        entries = [e for e in entries if e.get('script') == args.script]
+    if not entries:
+        print("Histórico vazio.")
+        return 0
+
+    if args.comando == 'list':
+        for e in entries[-args.n:]:
+            print(f"{e['data']}  {e.get('commit') or '-':<8} {e['script']:<22} {e.get('modo'):<9} "
+                  f"{e.get('linhas') or 0:>10,} linhas {e.get('duracao_s') or 0:>9.1f}s "
+                  f"{e.get('registros_s') or 0:>10,.0f} reg/s {e.get('pico_rss_mb') or 0:>7,.0f} MB  {e.get('arquivo')}")
+        return 0
+
+    resultados = compare_latest(entries, args.janela, args.limiar, args.variacao / 100)
+    regressoes = 0
+    for resultado in resultados:
+        print_comparison(resultado)
+        print()
+        regressoes += sum(1 for m in resultado['metricas'] if m['status'] == 'regressao')
+
+    if regressoes:
+        print(f"🔴 {regressoes} métrica(s) com regressão significativa")
+        return 1
+    print("✅ Nenhuma regressão significativa")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
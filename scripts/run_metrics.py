@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Métricas de desempenho por etapa para os scripts de migração
+
+Registra, durante uma execução:
+  - tempo e registros por etapa (leitura, transformação, busca, inserção,
+    commit...), com registros/s de cada uma
+  - latências individuais (por lote ou por registro) com p50/p95/p99
+  - pico de memória (RSS) do processo
+  - idas ao banco: execute, executemany e commit, contadas por uma conexão
+    envelopada (wrap_connection); executemany conta como uma ida, pois o
+    conector envia o lote em um único INSERT multi-linha
+  - chamadas e tempo por forma de SQL, com consultas por registro lido
+    (query_budget.py)
+
+Uso:
+    metrics = RunMetrics()
+    conn = metrics.wrap_connection(connect())
+    for lidas, df in metrics.iterate('leitura', read_source(...), count=lambda item: item[0]):
+        with metrics.stage('transformacao', len(df)):
+            ...
+    metrics.print_summary()
+    relatorio['desempenho'] = metrics.as_dict()
+
+Com um RunProfiler (run_profiler.py), stage() e iterate() também perfilam
+cada etapa separadamente.
+
+add(), latency() e as contagens das conexões envelopadas podem ser chamados
+de várias threads (escritores do pipeline, async_pipeline.py); o perfilamento
+não, e só vale para execuções sequenciais.
+"""
+
+import sys
+import time
+import threading
+from contextlib import contextmanager
+
+from query_budget import QueryLog
+from run_profiler import profile_stage
+
+# Etapa cujos registros são a entrada (base das consultas por registro)
+INPUT_STAGE = 'leitura'
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def percentile(values, p):
+    """Percentil p (0-100) com interpolação linear; None se não há valores."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * p / 100
+    low = int(pos)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (pos - low)
+
+
+def peak_rss_mb():
+    """Pico de memória residente do processo, em MB (None se indisponível)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB; macOS em bytes
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+class CountingCursor:
+    """Cursor que conta as idas ao banco (e o tempo por forma de SQL em queries)
+    e repassa o resto ao cursor original."""
+
+    def __init__(self, cursor, counts=None, queries=None, lock=None):
+        self._cursor = cursor
+        self._counts = counts
+        self._queries = queries
+        self._lock = lock or threading.Lock()
+
+    def _call(self, metodo, sql, args, kwargs):
+        inicio = time.perf_counter()
+        try:
+            return getattr(self._cursor, metodo)(sql, *args, **kwargs)
+        finally:
+            segundos = time.perf_counter() - inicio
+            with self._lock:
+                if self._counts is not None:
+                    self._counts[metodo] += 1
+                if self._queries is not None:
+                    self._queries.record(sql, segundos, many=metodo == 'executemany')
+
+    def execute(self, sql, *args, **kwargs):
+        return self._call('execute', sql, args, kwargs)
+
+    def executemany(self, sql, *args, **kwargs):
+        return self._call('executemany', sql, args, kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class CountingConnection:
+    """Conexão cujos cursores e commits são contados em counts (e queries)."""
+
+    def __init__(self, conn, counts=None, queries=None, lock=None):
+        self._conn = conn
+        self._counts = counts
+        self._queries = queries
+        self._lock = lock or threading.Lock()
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._conn.cursor(*args, **kwargs), self._counts, self._queries, self._lock)
+
+    def commit(self):
+        if self._counts is not None:
+            with self._lock:
+                self._counts['commit'] += 1
+        return self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class RunMetrics:
+    """Tempos por etapa, latências e idas ao banco de uma execução."""
+
+    def __init__(self, profiler=None):
+        self.profiler = profiler
+        self.stages = {}
+        self.latencies = {}
+        self.round_trips = {'execute': 0, 'executemany': 0, 'commit': 0}
+        self.queries = QueryLog()
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+
+    def add(self, nome, segundos, registros=0):
+        with self._lock:
+            etapa = self.stages.setdefault(nome, {'segundos': 0.0, 'registros': 0, 'chamadas': 0})
+            etapa['segundos'] += segundos
+            etapa['registros'] += registros
+            etapa['chamadas'] += 1
+
+    @contextmanager
+    def stage(self, nome, registros=0):
+        """Mede o bloco como uma chamada da etapa nome."""
+        inicio = time.perf_counter()
+        try:
+            with profile_stage(self.profiler, nome):
+                yield
+        finally:
+            self.add(nome, time.perf_counter() - inicio, registros)
+
+    def iterate(self, nome, iterable, count=None):
+        """Repassa os itens de iterable medindo o tempo gasto para produzi-los.
+
+        count(item) dá o número de registros de cada item (padrão: 1).
+        """
+        iterator = iter(iterable)
+        while True:
+            inicio = time.perf_counter()
+            try:
+                with profile_stage(self.profiler, nome):
+                    item = next(iterator)
+            except StopIteration:
+                self.add(nome, time.perf_counter() - inicio)
+                return
+            self.add(nome, time.perf_counter() - inicio, count(item) if count else 1)
+            yield item
+
+    def latency(self, serie, segundos):
+        with self._lock:
+            self.latencies.setdefault(serie, []).append(segundos)
+
+    def wrap_connection(self, conn):
+        """Envelopa conn para contar execute/executemany/commit e as formas de SQL."""
+        return CountingConnection(conn, self.round_trips, self.queries, self._lock)
+
+    @property
+    def input_rows(self):
+        return self.stages.get(INPUT_STAGE, {}).get('registros') or None
+
+    def as_dict(self):
+        duracao = time.perf_counter() - self._start
+        etapas = {}
+        for nome, etapa in self.stages.items():
+            etapas[nome] = {
+                'segundos': round(etapa['segundos'], 4),
+                'registros': etapa['registros'],
+                'chamadas': etapa['chamadas'],
+                'registros_s': round(etapa['registros'] / etapa['segundos'], 1)
+                if etapa['segundos'] > 0 and etapa['registros'] else None,
+                'percentual': round(etapa['segundos'] / duracao * 100, 1) if duracao > 0 else None,
+            }
+
+        latencias = {}
+        for serie, valores in self.latencies.items():
+            latencias[serie] = {
+                'quantidade': len(valores),
+                **{f'p{p}_ms': round(percentile(valores, p) * 1000, 2) for p in (50, 95, 99)},
+                'max_ms': round(max(valores) * 1000, 2),
+            }
+
+        rss = peak_rss_mb()
+        return {
+            'duracao_s': round(duracao, 3),
+            'fora_das_etapas_s': round(duracao - sum(e['segundos'] for e in self.stages.values()), 3),
+            'etapas': etapas,
+            'latencias': latencias,
+            'pico_rss_mb': round(rss, 1) if rss is not None else None,
+            'idas_ao_banco': {**self.round_trips, 'total': sum(self.round_trips.values())},
+            'consultas': self.queries.as_dict(self.input_rows),
+        }
+
+    def print_summary(self):
+        dados = self.as_dict()
+        print('⏱️  DESEMPENHO POR ETAPA')
+        for nome, etapa in dados['etapas'].items():
+            taxa = f"{etapa['registros_s']:>10,.0f} reg/s" if etapa['registros_s'] else ' ' * 16
+            print(f"   {nome:<16} {etapa['segundos']:>9.2f}s {etapa['percentual'] or 0:>5.1f}% {taxa}")
+        # Negativo quando as etapas correm em paralelo (--pipeline)
+        fora = '(fora)' if dados['fora_das_etapas_s'] >= 0 else '(sobreposto)'
+        print(f"   {fora:<16} {dados['fora_das_etapas_s']:>9.2f}s")
+        for serie, lat in dados['latencias'].items():
+            print(f"   Latência por {serie} ({lat['quantidade']:,}): p50 {lat['p50_ms']:.1f} ms | "
+                  f"p95 {lat['p95_ms']:.1f} ms | p99 {lat['p99_ms']:.1f} ms | máx {lat['max_ms']:.1f} ms")
+        idas = dados['idas_ao_banco']
+        print(f"   Idas ao banco: {idas['total']:,} (execute {idas['execute']:,}, "
+              f"executemany {idas['executemany']:,}, commit {idas['commit']:,})")
+        self.queries.print_summary(self.input_rows)
+        if dados['pico_rss_mb'] is not None:
+            print(f"   Pico de memória: {dados['pico_rss_mb']:,.0f} MB")
+        print()
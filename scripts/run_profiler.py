@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Perfilamento (--profile) dos scripts de migração e deduplicação
+
+Com --profile, os scripts gravam ao lado do relatório:
+
+  <base>_profile_<etapa>.prof   estatísticas cProfile de cada etapa
+                                (python3 -m pstats ARQUIVO, snakeviz, ...)
+  <base>_profile.txt            resumo: funções mais caras por etapa e os
+                                pontos de maior alocação de memória (tracemalloc)
+  <base>_profile.collapsed      pilhas amostradas no formato "a;b;c N"
+                                (flamegraph.pl, speedscope), com --profile-stacks
+
+O código fora das etapas marcadas entra na etapa 'geral'. Só o processo
+principal é perfilado: trabalho feito em processos filhos (--workers) aparece
+como espera.
+
+Uso:
+    profiler = RunProfiler('data/migration_report', stacks=True)
+    profiler.start()
+    with profile_stage(profiler, 'transformacao'):
+        ...
+    profiler.stop()          # grava os arquivos e imprime o resumo
+"""
+
+import io
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+TOP_N = 15
+TRACEMALLOC_FRAMES = 10
+SAMPLE_INTERVAL = 0.005
+GENERAL_STAGE = 'geral'
+
+
+def profile_stage(profiler, nome):
+    """Contexto da etapa nome no profiler (nada se profiler é None)."""
+    return profiler.stage(nome) if profiler else nullcontext()
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Amostra periodicamente a pilha de uma thread (formato collapsed)."""
+
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(name='gorgen-stack-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class RunProfiler:
+    """cProfile por etapa, tracemalloc e (opcional) pilhas amostradas."""
+
+    def __init__(self, base_path, stacks=False, top=TOP_N):
+        self.base_path = base_path
+        self.stacks = stacks
+        self.top = top
+        self.profiles = {}
+        self.seconds = Counter()
+        self._stack = []
+        self._sampler = None
+        self._start = None
+
+    def _profile(self, nome):
+        profile = self.profiles.get(nome)
+        if profile is None:
+            profile = self.profiles[nome] = cProfile.Profile()
+        return profile
+
+    def _switch(self, nome):
+        """Desliga o cProfile atual e liga o da etapa nome."""
+        agora = time.perf_counter()
+        if self._stack:
+            atual, inicio = self._stack[-1]
+            self.profiles[atual].disable()
+            self.seconds[atual] += agora - inicio
+        if nome is not None:
+            self._profile(nome).enable()
+
+    def start(self):
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        if self.stacks:
+            self._sampler = StackSampler(threading.get_ident())
+            self._sampler.start()
+        self._start = time.perf_counter()
+        self._switch(GENERAL_STAGE)
+        self._stack.append((GENERAL_STAGE, time.perf_counter()))
+
+    @contextmanager
+    def stage(self, nome):
+        """Perfila o bloco na etapa nome (etapas aninhadas suspendem a externa)."""
+        self._switch(nome)
+        self._stack.append((nome, time.perf_counter()))
+        try:
+            yield
+        finally:
+            self._switch(None)
+            self._stack.pop()
+            if self._stack:
+                anterior, _ = self._stack.pop()
+                self._profile(anterior).enable()
+                self._stack.append((anterior, time.perf_counter()))
+
+    def stop(self):
+        """Encerra o perfilamento, grava os arquivos e imprime o resumo. Retorna os caminhos."""
+        self._switch(None)
+        self._stack.clear()
+        snapshot = tracemalloc.take_snapshot()
+        _, pico_traced = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        if self._sampler:
+            self._sampler.stop()
+
+        os.makedirs(os.path.dirname(os.path.abspath(self.base_path)), exist_ok=True)
+        caminhos = []
+        for nome, profile in self.profiles.items():
+            path = f"{self.base_path}_profile_{nome}.prof"
+            profile.dump_stats(path)
+            caminhos.append(path)
+
+        resumo = self._summary(snapshot, pico_traced)
+        path = f"{self.base_path}_profile.txt"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(resumo)
+        caminhos.append(path)
+
+        if self._sampler:
+            path = f"{self.base_path}_profile.collapsed"
+            self._sampler.write(path)
+            caminhos.append(path)
+
+        self._print_summary(snapshot)
+        print(f"   Arquivos de perfil: {', '.join(os.path.basename(p) for p in caminhos)}")
+        print(f"   Diretório: {os.path.dirname(os.path.abspath(self.base_path))}")
+        print()
+        return caminhos
+
+    def _stats(self, nome):
+        profile = self.profiles[nome]
+        # pstats.Stats falha em perfil sem nenhuma chamada registrada
+        profile.create_stats()
+        if not profile.stats:
+            return None
+        return pstats.Stats(profile, stream=io.StringIO())
+
+    def _summary(self, snapshot, pico_traced):
+        total = time.perf_counter() - self._start
+        out = io.StringIO()
+        out.write(f"Perfil de execução - {time.strftime('%d/%m/%Y %H:%M')}\n")
+        out.write(f"Duração total: {total:.2f}s | Pico de memória rastreada: {pico_traced / 1e6:.1f} MB\n\n")
+
+        for nome in sorted(self.profiles, key=lambda n: -self.seconds[n]):
+            out.write("=" * 80 + "\n")
+            out.write(f"ETAPA {nome}: {self.seconds[nome]:.2f}s\n")
+            out.write("=" * 80 + "\n")
+            stats = self._stats(nome)
+            if stats is None:
+                out.write("(sem chamadas registradas)\n\n")
+                continue
+            stats.stream = out
+            stats.sort_stats('tottime').print_stats(self.top)
+
+        out.write("=" * 80 + "\n")
+        out.write(f"MAIORES ALOCAÇÕES EM USO AO FINAL (tracemalloc, top {self.top})\n")
+        out.write("=" * 80 + "\n")
+        for stat in snapshot.statistics('traceback')[:self.top]:
+            out.write(f"{stat.size / 1024:,.1f} KiB em {stat.count:,} blocos\n")
+            for linha in stat.traceback.format(limit=TRACEMALLOC_FRAMES):
+                out.write(f"    {linha}\n")
+        return out.getvalue()
+
+    def _print_summary(self, snapshot, n=5):
+        print('🔬 PERFIL')
+        for nome in sorted(self.profiles, key=lambda e: -self.seconds[e]):
+            stats = self._stats(nome)
+            print(f"   {nome}: {self.seconds[nome]:.2f}s")
+            if stats is None:
+                continue
+            linhas = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:n]
+            for (arquivo, linha, funcao), (_, ncalls, tottime, cumtime, _) in linhas:
+                print(f"      {tottime:>8.3f}s próprio {cumtime:>8.3f}s acum. {ncalls:>10,}x "
+                      f"{funcao} ({os.path.basename(arquivo)}:{linha})")
+        print('   Alocações (tracemalloc):')
+        for stat in snapshot.statistics('lineno')[:n]:
+            frame = stat.traceback[0]
+            print(f"      {stat.size / 1024:>10,.1f} KiB  {os.path.basename(frame.filename)}:{frame.lineno}")
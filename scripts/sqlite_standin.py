@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Banco SQLite no lugar do MySQL/TiDB para benchmarks e simulações
+
+Imita a parte da API do mysql.connector usada pelos scripts (cursor com
+dictionary/prepared, execute/executemany, fetchone/fetchmany/fetchall, rowcount,
+lastrowid, commit/rollback) sobre um arquivo SQLite ou banco em memória,
+com as tabelas pacientes e atendimentos e os mesmos índices do schema
+(drizzle/schema.ts), restritos às colunas que os scripts usam.
+
+O SQL dos scripts é traduzido na execução:
+  - placeholders %s -> ?
+  - col COLLATE utf8mb4_general_ci LIKE %s -> GENERAL_CI(col) LIKE GENERAL_CI(?)
+    (sem acentos nem maiúsculas, como a collation); nos demais casos o
+    COLLATE é removido (LOWER/LIKE já tratam maiúsculas)
+  - ON DUPLICATE KEY UPDATE c = VALUES(c) -> ON CONFLICT DO UPDATE SET c = excluded.c
+  - LOWER() com Unicode completo (o LOWER do SQLite só trata ASCII) e YEAR()
+  - CRC32(), CONCAT_WS() e o agregado BIT_XOR() (checksums da reconciliação)
+
+Uso:
+    from sqlite_standin import connect
+    conn = connect(':memory:')            # já com o schema criado
+    stmts = PreparedStatements(conn, dictionary=True)
+"""
+
+import re
+import zlib
+import sqlite3
+import unicodedata
+from datetime import date, datetime
+from functools import lru_cache
+
+_PLACEHOLDER = re.compile(r'%s')
+_COLLATE_LIKE = re.compile(r'([\w.]+)\s+COLLATE\s+utf8mb4_general_ci\s+LIKE\s+(%s)', re.IGNORECASE)
+_COLLATE = re.compile(r'\s+COLLATE\s+\w+', re.IGNORECASE)
+_ON_DUPLICATE = re.compile(r'ON\s+DUPLICATE\s+KEY\s+UPDATE', re.IGNORECASE)
+_VALUES_FN = re.compile(r'VALUES\((\w+)\)', re.IGNORECASE)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pacientes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant_id INTEGER NOT NULL DEFAULT 1,
+    id_paciente TEXT NOT NULL,
+    codigo_legado TEXT,
+    nome TEXT NOT NULL,
+    nome_normalizado TEXT,
+    nome_fonetico TEXT,
+    data_nascimento TEXT,
+    sexo TEXT,
+    cpf TEXT,
+    cpf_hash TEXT,
+    nome_mae TEXT,
+    email TEXT,
+    email_hash TEXT,
+    telefone TEXT,
+    telefone_hash TEXT,
+    endereco TEXT,
+    bairro TEXT,
+    cep TEXT,
+    cidade TEXT,
+    uf TEXT,
+    pais TEXT DEFAULT 'Brasil',
+    operadora_1 TEXT,
+    plano_modalidade_1 TEXT,
+    matricula_convenio_1 TEXT,
+    vigente_1 TEXT,
+    privativo_1 TEXT,
+    operadora_2 TEXT,
+    plano_modalidade_2 TEXT,
+    matricula_convenio_2 TEXT,
+    vigente_2 TEXT,
+    privativo_2 TEXT,
+    obito_perda TEXT,
+    status_caso TEXT DEFAULT 'Ativo',
+    deleted_at TEXT,
+    deleted_by INTEGER,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_pacientes_tenant ON pacientes (tenant_id);
+CREATE INDEX IF NOT EXISTS idx_pacientes_tenant_id_paciente ON pacientes (tenant_id, id_paciente);
+CREATE INDEX IF NOT EXISTS idx_pacientes_tenant_nome ON pacientes (tenant_id, nome);
+CREATE INDEX IF NOT EXISTS idx_pacientes_tenant_nome_normalizado ON pacientes (tenant_id, nome_normalizado);
+CREATE INDEX IF NOT EXISTS idx_pacientes_tenant_nome_fonetico ON pacientes (tenant_id, nome_fonetico);
+CREATE INDEX IF NOT EXISTS idx_pacientes_tenant_cpf ON pacientes (tenant_id, cpf);
+
+CREATE TABLE IF NOT EXISTS atendimentos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant_id INTEGER NOT NULL DEFAULT 1,
+    atendimento TEXT NOT NULL,
+    paciente_id INTEGER NOT NULL,
+    data_atendimento TEXT,
+    semana INTEGER,
+    tipo_atendimento TEXT,
+    procedimento TEXT,
+    nome_paciente TEXT,
+    local TEXT,
+    convenio TEXT,
+    plano_convenio TEXT,
+    pagamento_efetivado INTEGER DEFAULT 0,
+    data_envio_faturamento TEXT,
+    data_esperada_pagamento TEXT,
+    faturamento_previsto TEXT,
+    registro_manual_valor_hm TEXT,
+    faturamento_previsto_final TEXT,
+    data_pagamento TEXT,
+    nota_fiscal_correspondente TEXT,
+    observacoes TEXT,
+    faturamento_leticia TEXT,
+    faturamento_ag_lu TEXT,
+    mes INTEGER,
+    ano INTEGER,
+    trimestre TEXT,
+    trimestre_ano TEXT,
+    deleted_at TEXT,
+    deleted_by INTEGER,
+    created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_atendimentos_tenant ON atendimentos (tenant_id);
+CREATE INDEX IF NOT EXISTS idx_atendimentos_tenant_atendimento ON atendimentos (tenant_id, atendimento);
+CREATE INDEX IF NOT EXISTS idx_atendimentos_tenant_paciente ON atendimentos (tenant_id, paciente_id);
+CREATE INDEX IF NOT EXISTS idx_atendimentos_tenant_data ON atendimentos (tenant_id, data_atendimento);
+"""
+
+
+@lru_cache(maxsize=256)
+def translate_sql(sql):
+    """Traduz o dialeto MySQL usado pelos scripts para SQLite."""
+    sql = _COLLATE_LIKE.sub(r'GENERAL_CI(\1) LIKE GENERAL_CI(\2)', sql)
+    sql = _COLLATE.sub('', sql)
+    match = _ON_DUPLICATE.search(sql)
+    if match:
+        update = _VALUES_FN.sub(r'excluded.\1', sql[match.end():])
+        sql = sql[:match.start()] + 'ON CONFLICT DO UPDATE SET' + update
+    return _PLACEHOLDER.sub('?', sql)
+
+
+def _adapt(value):
+    """Converte parâmetros para tipos aceitos pelo sqlite3."""
+    if isinstance(value, datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (str, int, float, bytes)) or value is None:
+        return value
+    # Decimal, numpy etc.
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def _year(value):
+    if not value:
+        return None
+    try:
+        return int(str(value)[:4])
+    except ValueError:
+        return None
+
+
+def _general_ci(value):
+    """Texto comparável como na utf8mb4_general_ci: sem acentos e em minúsculas."""
+    if not isinstance(value, str):
+        return value
+    decomposto = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c)).lower()
+
+
+def _crc32(value):
+    if value is None:
+        return None
+    return zlib.crc32(str(value).encode('utf-8'))
+
+
+def _concat_ws(separador, *valores):
+    if separador is None:
+        return None
+    return separador.join(str(v) for v in valores if v is not None)
+
+
+class _BitXor:
+    """BIT_XOR do MySQL: 0 sem linhas."""
+
+    def __init__(self):
+        self.valor = 0
+
+    def step(self, value):
+        if value is not None:
+            self.valor ^= int(value)
+
+    def finalize(self):
+        return self.valor
+
+
+class StandInCursor:
+    """Cursor com a interface do mysql.connector sobre sqlite3."""
+
+    def __init__(self, conn, dictionary=False):
+        self._conn = conn
+        self._cursor = conn._db.cursor()
+        self.dictionary = dictionary
+
+    def execute(self, sql, params=()):
+        self._conn.round_trips += 1
+        self._cursor.execute(translate_sql(sql), tuple(_adapt(v) for v in params or ()))
+        return self
+
+    def executemany(self, sql, seq_params):
+        self._conn.round_trips += 1
+        self._cursor.executemany(
+            translate_sql(sql),
+            (tuple(_adapt(v) for v in params) for params in seq_params),
+        )
+        return self
+
+    def _row(self, row):
+        if row is None or not self.dictionary:
+            return row
+        return {desc[0]: value for desc, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class StandInConnection:
+    """Conexão com a interface do mysql.connector sobre sqlite3.
+
+    round_trips conta as chamadas execute/executemany (o equivalente às idas
+    ao servidor no MySQL).
+    """
+
+    def __init__(self, path=':memory:'):
+        # Os escritores do pipeline usam cada conexão em uma thread própria;
+        # timeout espera o lock de escrita de outra conexão ao mesmo arquivo
+        self._db = sqlite3.connect(path, check_same_thread=False, timeout=60)
+        self._db.create_function('LOWER', 1, lambda v: v.lower() if isinstance(v, str) else v, deterministic=True)
+        self._db.create_function('YEAR', 1, _year, deterministic=True)
+        self._db.create_function('GENERAL_CI', 1, _general_ci, deterministic=True)
+        self._db.create_function('CRC32', 1, _crc32, deterministic=True)
+        self._db.create_function('CONCAT_WS', -1, _concat_ws, deterministic=True)
+        self._db.create_aggregate('BIT_XOR', 1, _BitXor)
+        self._db.execute('PRAGMA journal_mode = WAL')
+        self._db.execute('PRAGMA synchronous = NORMAL')
+        self.round_trips = 0
+
+    def cursor(self, dictionary=False, prepared=False, buffered=None):
+        # prepared: o sqlite3 já reaproveita statements compilados (cache interno)
+        return StandInCursor(self, dictionary=bool(dictionary))
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        self._db.close()
+
+
+def create_schema(conn):
+    conn._db.executescript(SCHEMA)
+
+
+def connect(path=':memory:', schema=True):
+    """Abre o banco SQLite (criando as tabelas se schema=True)."""
+    conn = StandInConnection(path)
+    if schema:
+        create_schema(conn)
+    return conn
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Testes de batch_writer.AdaptiveBatchWriter com uma conexão falsa (sem banco).
+
+Uso:
+    python3 -m pytest scripts/test_batch_writer.py
+    python3 -m unittest scripts/test_batch_writer.py
+"""
+
+import unittest
+
+import pandas as pd
+from mysql.connector import Error
+
+from batch_writer import AdaptiveBatchWriter
+
+
+class FakeConnection:
+    """Conta transações (commit/rollback); o cursor não faz nada."""
+
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return self
+
+    def close(self):
+        pass
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+def failing_write(erro, linhas_invalidas=None):
+    """write_batch que levanta erro se o lote tem alguma linha inválida (None: todas)."""
+    def write_batch(cursor, lote):
+        write_batch.chamadas += 1
+        if linhas_invalidas is None or lote['id'].isin(linhas_invalidas).any():
+            raise erro
+        return len(lote)
+    write_batch.chamadas = 0
+    return write_batch
+
+
+class AdaptiveBatchWriterErrorsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = FakeConnection()
+        self.df = pd.DataFrame({'id': range(2000), 'nome': ['Paciente'] * 2000})
+
+    def writer(self, write_batch):
+        return AdaptiveBatchWriter(self.conn, write_batch, initial=500, adaptive=False,
+                                   sleep=lambda _: None)
+
+    def test_row_error_isolates_invalid_rows(self):
+        erro = Error(msg="Data too long for column 'nome' at row 1", errno=1406)
+        writer = self.writer(failing_write(erro, linhas_invalidas=[7, 1500]))
+
+        self.assertEqual(writer.write(self.df), 1998)
+        self.assertEqual(sorted(r['indice'] for r in writer.rejeitados), [7, 1500])
+        self.assertEqual({r['codigo'] for r in writer.rejeitados}, {1406})
+
+    def test_schema_error_aborts_without_splitting(self):
+        erro = Error(msg="Unknown column 'nome_fonetico' in 'field list'", errno=1054)
+        write_batch = failing_write(erro)
+        writer = self.writer(write_batch)
+
+        with self.assertRaises(Error) as ctx:
+            writer.write(self.df)
+
+        self.assertEqual(ctx.exception.errno, 1054)
+        self.assertEqual(writer.rejeitados, [])
+        self.assertEqual(writer.gravados, 0)
+        self.assertEqual(self.conn.commits, 0)
+        # Uma tentativa só: o lote não é dividido
+        self.assertEqual(write_batch.chamadas, 1)
+
+    def test_permission_error_aborts(self):
+        erro = Error(msg="INSERT command denied to user 'gorgen'@'%' for table 'pacientes'", errno=1142)
+        writer = self.writer(failing_write(erro))
+
+        with self.assertRaises(Error):
+            writer.write(self.df)
+        self.assertEqual(writer.rejeitados, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
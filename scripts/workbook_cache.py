@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+GORGEN - Cache colunar das planilhas de origem
+
+A primeira leitura de cada aba de uma planilha .xlsx a converte para Feather
+(Arrow IPC, sem compressão) com colunas tipadas; as leituras seguintes abrem os
+arquivos por memory-map em fração de segundo. A chave do cache é o hash do
+conteúdo da planilha: qualquer alteração no arquivo gera uma nova entrada e a
+antiga é descartada. As entradas levam o nome e um hash curto do caminho da
+planilha, de modo que arquivos homônimos em pastas diferentes não se
+descartam mutuamente.
+
+Uso como biblioteca:
+    from workbook_cache import read_excel_cached
+    df = read_excel_cached('data/22kpacientes.xlsx', nrows=1000)
+
+Uso pela linha de comando (pré-aquecer ou limpar):
+    python3 scripts/workbook_cache.py data/22kpacientes.xlsx [...]
+    python3 scripts/workbook_cache.py --limpar data/22kpacientes.xlsx
+
+Sem pyarrow instalado, read_excel_cached cai para pd.read_excel.
+Colunas com tipos mistos (ex.: datas e textos na mesma coluna) não têm tipo
+Arrow: ficam no mesmo Feather como struct<tipo, valor> (código do tipo
+Python + valor em texto, 'colunas_mistas' no meta) e são decodificadas na
+leitura para os valores exatos que o pd.read_excel devolve. Só o trecho lido
+(colunas pedidas, nrows) é decodificado, mas essa decodificação é feita valor
+a valor: ao contrário das colunas tipadas, não é sem cópia. Valores de tipos
+fora de _CODECS (não gerados pelo openpyxl) levam a coluna para um arquivo
+pickle ao lado do Feather ('colunas_pickle'), lido inteiro a cada leitura.
+"""
+
+import os
+import sys
+import json
+import pickle
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime, date, time, timedelta
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    feather = None
+
+# Diretório do cache: GORGEN_CACHE_DIR ou '.cache' ao lado da planilha
+CACHE_DIR_ENV = 'GORGEN_CACHE_DIR'
+META_FILE = 'meta.json'
+HASH_CHUNK = 1 << 20
+# Formato das entradas (nome do diretório): entradas de outro formato são descartadas
+CACHE_VERSION = 2
+
+# Valores das colunas de tipos mistos, pelo tipo exato: (tipo, texto -> valor, valor -> texto)
+_CODECS = (
+    (str, str, str),
+    (int, int, str),
+    (float, float, repr),
+    (bool, lambda s: s == '1', lambda v: '1' if v else '0'),
+    (datetime, datetime.fromisoformat, datetime.isoformat),
+    (date, date.fromisoformat, date.isoformat),
+    (time, time.fromisoformat, time.isoformat),
+    (timedelta, lambda s: timedelta(microseconds=int(s)), lambda v: str(v // timedelta(microseconds=1))),
+    (type(None), lambda s: None, lambda v: None),
+)
+_CODE = {tipo: i for i, (tipo, _, _) in enumerate(_CODECS)}
+_DECODERS = [decode for _, decode, _ in _CODECS]
+
+
+def file_hash(path):
+    """Hash (blake2b) do conteúdo do arquivo."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def cache_root(path):
+    return os.environ.get(CACHE_DIR_ENV) or os.path.join(os.path.dirname(os.path.abspath(path)), '.cache')
+
+
+def _entry_prefix(path):
+    """Prefixo das entradas da planilha: nome do arquivo + hash curto do caminho absoluto.
+
+    Planilhas com o mesmo nome em pastas diferentes (GORGEN_CACHE_DIR
+    compartilhado) têm entradas separadas e não descartam as uma da outra.
+    """
+    caminho = hashlib.blake2b(os.path.abspath(path).encode('utf-8'), digest_size=4).hexdigest()
+    return f"{os.path.basename(path)}-{caminho}-"
+
+
+def _entry_dir(path, digest):
+    return os.path.join(cache_root(path), f"{_entry_prefix(path)}{digest}-v{CACHE_VERSION}")
+
+
+def _encode_mixed(serie):
+    """Coluna de tipos mistos como struct<tipo int8, valor string> (None se há tipo fora de _CODECS)."""
+    tipos, valores = [], []
+    for valor in serie:
+        codigo = _CODE.get(type(valor))
+        if codigo is None:
+            return None
+        tipos.append(codigo)
+        valores.append(_CODECS[codigo][2](valor))
+    return pa.StructArray.from_arrays([pa.array(tipos, pa.int8()), pa.array(valores, pa.string())],
+                                      names=['tipo', 'valor'])
+
+
+def _decode_mixed(coluna):
+    """Valores Python de uma coluna gravada por _encode_mixed."""
+    coluna = coluna.combine_chunks()
+    tipos = coluna.field('tipo').to_pylist()
+    valores = coluna.field('valor').to_pylist()
+    return pd.Series([_DECODERS[t](v) for t, v in zip(tipos, valores)], dtype=object)
+
+
+def _split_mixed(df):
+    """Separa as colunas sem tipo Arrow.
+
+    Retorna (df_tipado, {coluna: struct codificado}, df_pickle).
+    """
+    df = df.copy()
+    df.columns = [str(c) for c in df.columns]
+    codificadas = {}
+    pickle_cols = []
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        try:
+            pa.Array.from_pandas(df[col])
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            struct = _encode_mixed(df[col])
+            if struct is None:
+                pickle_cols.append(col)
+            else:
+                codificadas[col] = struct
+    return df.drop(columns=list(codificadas) + pickle_cols), codificadas, df[pickle_cols]
+
+
+def _write_atomic(dir_, name, write):
+    """Grava via arquivo temporário + rename (seguro com vários processos)."""
+    fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=dir_)
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, os.path.join(dir_, name))
+    except Exception:
+        os.unlink(tmp)
+        raise
+
+
+def _write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _load_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def get_entry(path):
+    """Meta da entrada do conteúdo atual da planilha (cria se não existir).
+
+    A entrada guarda a lista de abas; cada aba é convertida só quando lida
+    pela primeira vez (cache_sheet), de modo que processos diferentes podem
+    converter abas diferentes da mesma planilha ao mesmo tempo.
+    """
+    digest = file_hash(path)
+    entry = _entry_dir(path, digest)
+    meta = _load_json(os.path.join(entry, META_FILE))
+    if meta is None:
+        os.makedirs(entry, exist_ok=True)
+        meta = {
+            'arquivo': os.path.abspath(path),
+            'hash': digest,
+            'gerado_em': datetime.now().isoformat(),
+            'abas': pd.ExcelFile(path).sheet_names,
+        }
+        _write_atomic(entry, META_FILE, lambda tmp: _write_json(tmp, meta))
+        _drop_stale(path, digest)
+    meta['_dir'] = entry
+    return meta
+
+
+def _sheet_index(meta, sheet_name):
+    if isinstance(sheet_name, int):
+        if not -len(meta['abas']) <= sheet_name < len(meta['abas']):
+            raise IndexError(f"Worksheet index {sheet_name} is invalid, {len(meta['abas'])} worksheets found")
+        return sheet_name % len(meta['abas'])
+    if sheet_name not in meta['abas']:
+        raise ValueError(f"Worksheet named '{sheet_name}' not found")
+    return meta['abas'].index(sheet_name)
+
+
+def cache_sheet(path, meta, index):
+    """Converte uma aba para Feather (se ainda não convertida). Retorna o meta da aba."""
+    entry = meta['_dir']
+    sheet_meta_file = f'aba_{index}.json'
+    aba = _load_json(os.path.join(entry, sheet_meta_file))
+    if aba is not None:
+        return aba
+
+    df = pd.read_excel(path, sheet_name=meta['abas'][index])
+    tipado, codificadas, misto = _split_mixed(df)
+    aba = {
+        'nome': meta['abas'][index],
+        'arquivo': f'aba_{index}.feather',
+        'mistas': f'aba_{index}_mistas.pkl' if len(misto.columns) else None,
+        'linhas': len(df),
+        'colunas': [str(c) for c in df.columns],
+        'colunas_mistas': list(codificadas),
+        'colunas_pickle': list(misto.columns),
+    }
+
+    table = pa.Table.from_pandas(tipado, preserve_index=False)
+    if codificadas:
+        # from_arrays: com todas as colunas mistas, a tabela tipada não tem linhas
+        table = pa.Table.from_arrays(
+            table.columns + list(codificadas.values()), names=table.column_names + list(codificadas)
+        ).replace_schema_metadata(table.schema.metadata)
+    _write_atomic(entry, aba['arquivo'],
+                  lambda tmp: feather.write_feather(table, tmp, compression='uncompressed'))
+    if aba['mistas']:
+        def dump(tmp):
+            with open(tmp, 'wb') as f:
+                pickle.dump(misto, f, protocol=pickle.HIGHEST_PROTOCOL)
+        _write_atomic(entry, aba['mistas'], dump)
+    # O meta da aba é gravado por último: sua presença marca a aba como pronta
+    _write_atomic(entry, sheet_meta_file, lambda tmp: _write_json(tmp, aba))
+    return aba
+
+
+def build_cache(path):
+    """Converte todas as abas da planilha. Retorna o meta com as abas convertidas."""
+    meta = get_entry(path)
+    meta['abas'] = [cache_sheet(path, meta, i) for i in range(len(meta['abas']))]
+    return meta
+
+
+def _drop_stale(path, digest):
+    """Remove entradas de versões anteriores da mesma planilha."""
+    root = cache_root(path)
+    prefix = _entry_prefix(path)
+    atual = os.path.basename(_entry_dir(path, digest))
+    for nome in os.listdir(root):
+        if nome.startswith(prefix) and nome != atual:
+            shutil.rmtree(os.path.join(root, nome), ignore_errors=True)
+
+
+def _read_sheet(meta, aba, nrows, columns=None):
+    colunas = aba['colunas'] if columns is None else [c for c in aba['colunas'] if c in columns]
+    mistas = [c for c in aba['colunas_mistas'] if c in colunas]
+    pickle_cols = [c for c in aba['colunas_pickle'] if c in colunas]
+    # Projeção: com memory-map, só as colunas pedidas são materializadas
+    tipadas = [c for c in colunas if c not in mistas and c not in pickle_cols]
+    table = feather.read_table(os.path.join(meta['_dir'], aba['arquivo']), columns=tipadas + mistas,
+                               memory_map=True)
+    if nrows is not None:
+        table = table.slice(0, nrows)
+    df = table.select(tipadas).to_pandas()
+    partes = [df] + [_decode_mixed(table.column(c)).rename(c) for c in mistas]
+    if pickle_cols:
+        with open(os.path.join(meta['_dir'], aba['mistas']), 'rb') as f:
+            misto = pickle.load(f)[pickle_cols]
+        if nrows is not None:
+            misto = misto.head(nrows)
+        partes.append(misto)
+    if len(partes) > 1:
+        df = pd.concat(partes, axis=1)[colunas]
+    return df
+
+
+def sheet_names(path):
+    """Nomes das abas, na ordem da planilha."""
+    if feather is None:
+        return pd.ExcelFile(path).sheet_names
+    return list(get_entry(path)['abas'])
+
+
+def read_excel_cached(path, sheet_name=0, nrows=None, columns=None):
+    """Equivalente a pd.read_excel(path, sheet_name=..., nrows=...) servido do cache.
+
+    sheet_name: índice ou nome de uma aba (DataFrame), ou None para todas (dict).
+    columns: só essas colunas (as ausentes na aba são ignoradas), como usecols.
+    """
+    if feather is None:
+        usecols = None if columns is None else (lambda c: c in columns)
+        return pd.read_excel(path, sheet_name=sheet_name, nrows=nrows, usecols=usecols)
+
+    meta = get_entry(path)
+    if sheet_name is None:
+        return {
+            nome: _read_sheet(meta, cache_sheet(path, meta, i), nrows, columns)
+            for i, nome in enumerate(meta['abas'])
+        }
+    return _read_sheet(meta, cache_sheet(path, meta, _sheet_index(meta, sheet_name)), nrows, columns)
+
+
+def clear_cache(path):
+    """Remove todas as entradas da planilha."""
+    root = cache_root(path)
+    if not os.path.isdir(root):
+        return 0
+    prefix = _entry_prefix(path)
+    removidas = 0
+    for nome in os.listdir(root):
+        if nome.startswith(prefix):
+            shutil.rmtree(os.path.join(root, nome), ignore_errors=True)
+            removidas += 1
+    return removidas
+
+
+def main():
+    args = sys.argv[1:]
+    limpar = '--limpar' in args
+    paths = [a for a in args if not a.startswith('--')]
+    if not paths:
+        print(__doc__)
+        sys.exit(1)
+
+    if feather is None and not limpar:
+        print("❌ pyarrow não instalado: cache indisponível (pip install pyarrow)")
+        sys.exit(1)
+
+    for path in paths:
+        if limpar:
+            print(f"🗑️  {path}: {clear_cache(path)} entrada(s) removida(s)")
+            continue
+        inicio = datetime.now()
+        meta = build_cache(path)
+        duracao = (datetime.now() - inicio).total_seconds()
+        print(f"📦 {path} ({meta['hash'][:12]}) em {duracao:.2f}s")
+        for aba in meta['abas']:
+            todas = aba['colunas_mistas'] + aba['colunas_pickle']
+            mistas = f" | tipos mistos: {', '.join(todas)}" if todas else ''
+            print(f"   • {aba['nome']}: {aba['linhas']:,} linhas{mistas}")
+
+
+if __name__ == '__main__':
+    main()